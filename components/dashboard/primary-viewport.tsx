@@ -8,7 +8,7 @@ export function PrimaryViewport() {
   const [frameCount, setFrameCount] = useState(0)
 
   // Connect to Webots camera stream
-  const { frame, connected, fps, victimDetected, aiStatus, aiResponse } = useWebotsCamera({
+  const { frame, connected, fps, victimDetected, aiStatus, aiResponse, streamSettings } = useWebotsCamera({
     url: "ws://localhost:8765",
     reconnectDelay: 2000,
   })
@@ -133,6 +133,14 @@ export function PrimaryViewport() {
             {fps} FPS
           </span>
         )}
+        {connected && streamSettings && (
+          <span
+            className="font-mono text-[10px] tabular-nums text-muted-foreground"
+            title={streamSettings.adaptive ? `Adaptive stream (${streamSettings.reason ?? "default"})` : "Fixed stream settings"}
+          >
+            {`Q${streamSettings.quality} ${Math.round(streamSettings.scale * 100)}% 1/${streamSettings.every_n_steps}${streamSettings.adaptive ? " AUTO" : ""}`}
+          </span>
+        )}
         <span className="font-mono text-[10px] tabular-nums text-muted-foreground">
           {`FRM ${String(frameCount % 9999).padStart(4, "0")}`}
         </span>
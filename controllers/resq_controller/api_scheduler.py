@@ -0,0 +1,324 @@
+"""
+ResQ Gemini Request Scheduler
+=============================
+Paces model requests against a requests-per-minute / requests-per-day budget
+instead of waiting for the API to answer 429.
+
+    minute bucket  - token bucket holding up to RPM tokens, refilled at RPM/60 per second
+    pace bucket    - spreads the daily budget over DAILY_SPREAD_HOURS so routine scans
+                     can't use it up in the first hour of an exercise
+    daily counter  - hard RPD limit, reset at midnight Pacific time like the Gemini quota
+
+Priorities: a candidate confirmation may use the last minute-bucket token and
+the last 10% of the daily budget, and skips the pace bucket; early and routine
+scans leave those reserves to it. A rate-limit error starts a cooldown with
+jittered exponential backoff, honouring the server's retryDelay when it gives
+one. Transient server errors are retried with jitter. The daily count, pace
+level and cooldown are saved to a small JSON file, so restarting the
+controller does not reset the budget.
+
+The clock, sleep and random source can be injected (see FakeClock).
+"""
+
+import json
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+
+# --- Configuration ---
+REQUESTS_PER_MINUTE = 10
+REQUESTS_PER_DAY = 250
+DAILY_SPREAD_HOURS = 8.0        # Routine scans pace the daily budget over this long
+PACE_BURST = 5                  # Routine requests that may go back-to-back
+CONFIRM_RESERVE = 1             # Minute-bucket tokens kept back for confirmations
+CONFIRM_DAILY_RESERVE = 0.1     # Fraction of the daily budget only confirmations may use
+BASE_BACKOFF = 60               # Seconds; doubles per consecutive rate-limit error
+MAX_BACKOFF = 600
+BACKOFF_JITTER = 0.2            # +/- fraction applied to every backoff
+MAX_RETRIES = 2                 # Retries for transient (5xx / network) errors
+RETRY_DELAY = 1.0               # Seconds before the first retry, doubled per retry
+QUOTA_TIMEZONE = "America/Los_Angeles"   # Where the provider's daily quota resets
+
+# --- Priorities (lower = more important) ---
+PRIORITY_CONFIRM = 0            # A local detector flagged a possible person
+PRIORITY_EARLY = 1              # Scene changed a lot
+PRIORITY_ROUTINE = 2            # Periodic scan
+
+_RETRY_DELAY = re.compile(r"retryDelay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s")
+
+
+class RequestDeferred(Exception):
+    """No budget for this request right now; `wait` is the best guess in seconds."""
+
+    def __init__(self, reason, wait):
+        super().__init__(f"{reason} ({wait:.0f}s)")
+        self.reason = reason
+        self.wait = wait
+
+
+class RateLimited(Exception):
+    """The API rejected a request for rate or quota reasons; a cooldown was started."""
+
+    def __init__(self, backoff, consecutive):
+        super().__init__(f"rate limited, backing off {backoff:.0f}s")
+        self.backoff = backoff
+        self.consecutive = consecutive
+
+
+def is_rate_limit_error(error):
+    """True for HTTP 429 / RESOURCE_EXHAUSTED errors from the genai SDK (or look-alikes)."""
+    if getattr(error, "code", None) == 429 or getattr(error, "status", None) == "RESOURCE_EXHAUSTED":
+        return True
+    text = str(error)
+    return "429" in text or "RESOURCE_EXHAUSTED" in text or "quota" in text.lower()
+
+
+def is_transient_error(error):
+    """True for errors worth retrying right away (server side or network)."""
+    code = getattr(error, "code", None)
+    if isinstance(code, int) and 500 <= code < 600:
+        return True
+    return isinstance(error, (TimeoutError, ConnectionError))
+
+
+def retry_delay_hint(error):
+    """The server's suggested retry delay in seconds, if the error carries one."""
+    match = _RETRY_DELAY.search(str(getattr(error, "details", None) or error))
+    return float(match.group(1)) if match else None
+
+
+class TokenBucket:
+    """Classic token bucket; refills continuously up to `capacity`."""
+
+    def __init__(self, capacity, refill_per_sec, now, tokens=None):
+        self.capacity = float(capacity)
+        self.refill_per_sec = refill_per_sec
+        self.tokens = self.capacity if tokens is None else min(float(tokens), self.capacity)
+        self.updated = now
+
+    def refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_sec)
+        self.updated = now
+
+    def wait_for(self, amount):
+        """Seconds until `amount` tokens are available (after refill)."""
+        missing = amount - self.tokens
+        if missing <= 0:
+            return 0.0
+        return missing / self.refill_per_sec if self.refill_per_sec > 0 else float("inf")
+
+
+class ApiScheduler:
+    """Decides when a model request may go out, and reacts to how it went."""
+
+    def __init__(self, rpm=REQUESTS_PER_MINUTE, rpd=REQUESTS_PER_DAY, spread_hours=DAILY_SPREAD_HOURS,
+                 state_path=None, clock=time.time, sleep=time.sleep, rng=random.random):
+        self.rpm = rpm
+        self.rpd = rpd
+        self.state_path = state_path
+        self._clock = clock
+        self._sleep = sleep
+        self._rng = rng
+        self._lock = threading.Lock()
+        now = clock()
+        self._minute = TokenBucket(rpm, rpm / 60.0, now)
+        self._pace = TokenBucket(PACE_BURST, rpd / (spread_hours * 3600.0), now)
+        self.day = self._day(now)
+        self.used_today = 0
+        self.cooldown_until = 0.0
+        self.consecutive_fails = 0
+        self.granted = 0
+        self.deferred = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self._load()
+
+    # --- Budget ---
+
+    def _day(self, now):
+        return datetime.fromtimestamp(now, _quota_tz()).strftime("%Y-%m-%d")
+
+    def _refresh(self, now):
+        day = self._day(now)
+        if day != self.day:
+            self.day = day
+            self.used_today = 0
+        self._minute.refill(now)
+        self._pace.refill(now)
+
+    def _check(self, priority, now):
+        """Return (reason, wait) blocking a request at `priority`, or None if it may go."""
+        if now < self.cooldown_until:
+            return "cooldown", self.cooldown_until - now
+        if self.used_today >= self.rpd:
+            return "daily quota used", _seconds_to_midnight(now)
+        if priority > PRIORITY_CONFIRM and self.used_today >= self.rpd * (1.0 - CONFIRM_DAILY_RESERVE):
+            return "daily quota reserved for confirmations", _seconds_to_midnight(now)
+        needed = 1 if priority <= PRIORITY_CONFIRM else 1 + CONFIRM_RESERVE
+        if self._minute.tokens < needed:
+            return "minute budget", self._minute.wait_for(needed)
+        if priority > PRIORITY_CONFIRM and self._pace.tokens < 1:
+            return "daily pacing", self._pace.wait_for(1)
+        return None
+
+    def ready(self, priority=PRIORITY_ROUTINE):
+        """True if a request at `priority` would be granted now (consumes nothing)."""
+        with self._lock:
+            now = self._clock()
+            self._refresh(now)
+            return self._check(priority, now) is None
+
+    def cooldown_remaining(self):
+        return max(0.0, self.cooldown_until - self._clock())
+
+    def acquire(self, priority=PRIORITY_ROUTINE):
+        """Take budget for one request or raise RequestDeferred."""
+        with self._lock:
+            now = self._clock()
+            self._refresh(now)
+            blocked = self._check(priority, now)
+            if blocked is not None:
+                self.deferred += 1
+                raise RequestDeferred(*blocked)
+            self._minute.tokens -= 1
+            if priority > PRIORITY_CONFIRM:
+                self._pace.tokens -= 1
+            self.used_today += 1
+            self.granted += 1
+            self._save()
+
+    # --- Outcomes ---
+
+    def record_success(self):
+        with self._lock:
+            if self.consecutive_fails:
+                self.consecutive_fails = 0
+                self._save()
+
+    def record_rate_limited(self, retry_after=None):
+        """Start a jittered exponential cooldown. Returns its length in seconds."""
+        with self._lock:
+            self.rate_limited += 1
+            self.consecutive_fails += 1
+            backoff = min(BASE_BACKOFF * 2 ** self.consecutive_fails, MAX_BACKOFF)
+            if retry_after is not None:
+                backoff = max(backoff, retry_after)
+            backoff *= 1.0 + BACKOFF_JITTER * (2.0 * self._rng() - 1.0)
+            self.cooldown_until = self._clock() + backoff
+            self._save()
+            return backoff
+
+    def call(self, fn, priority=PRIORITY_ROUTINE):
+        """
+        Run `fn()` under the budget. Raises RequestDeferred if there is no budget,
+        RateLimited on 429/quota errors (after starting a cooldown), or the error
+        itself once transient-error retries are exhausted.
+        """
+        attempt = 0
+        while True:
+            self.acquire(priority)
+            try:
+                result = fn()
+            except Exception as e:
+                if is_rate_limit_error(e):
+                    backoff = self.record_rate_limited(retry_delay_hint(e))
+                    raise RateLimited(backoff, self.consecutive_fails) from e
+                if attempt >= MAX_RETRIES or not is_transient_error(e):
+                    raise
+                delay = RETRY_DELAY * 2 ** attempt * (0.5 + self._rng())
+                attempt += 1
+                self.retries += 1
+                self._sleep(delay)
+                continue
+            self.record_success()
+            return result
+
+    def stats(self):
+        with self._lock:
+            now = self._clock()
+            self._refresh(now)
+            return {
+                "used_today": self.used_today,
+                "daily_limit": self.rpd,
+                "minute_tokens": round(self._minute.tokens, 2),
+                "pace_tokens": round(self._pace.tokens, 2),
+                "cooldown_s": round(max(0.0, self.cooldown_until - now), 1),
+                "granted": self.granted,
+                "deferred": self.deferred,
+                "rate_limited": self.rate_limited,
+                "retries": self.retries,
+            }
+
+    # --- Persistence ---
+
+    def _load(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Ignoring unreadable API quota state {self.state_path}: {e}")
+            return
+        now = self._clock()
+        if state.get("day") == self.day:
+            self.used_today = int(state.get("used_today", 0))
+        self.cooldown_until = float(state.get("cooldown_until", 0.0))
+        self.consecutive_fails = int(state.get("consecutive_fails", 0))
+        if "pace_tokens" in state:
+            self._pace.tokens = min(float(state["pace_tokens"]), self._pace.capacity)
+            self._pace.updated = min(float(state.get("pace_updated", now)), now)
+            self._pace.refill(now)
+
+    def _save(self):
+        if not self.state_path:
+            return
+        state = {
+            "day": self.day,
+            "used_today": self.used_today,
+            "cooldown_until": self.cooldown_until,
+            "consecutive_fails": self.consecutive_fails,
+            "pace_tokens": self._pace.tokens,
+            "pace_updated": self._pace.updated,
+        }
+        tmp = self.state_path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp, self.state_path)
+        except OSError as e:
+            print(f"⚠️ Could not save API quota state: {e}")
+
+
+def _quota_tz():
+    try:
+        from zoneinfo import ZoneInfo
+        return ZoneInfo(QUOTA_TIMEZONE)
+    except Exception:   # no tz database: fall back to local time
+        return None
+
+
+def _seconds_to_midnight(now):
+    current = datetime.fromtimestamp(now, _quota_tz())
+    midnight = (current + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (midnight - current).total_seconds()
+
+
+class FakeClock:
+    """Manually advanced clock for tests: pass `clock=fake`, `sleep=fake.sleep`."""
+
+    def __init__(self, start=1_700_000_000.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    def advance(self, seconds):
+        self.now += seconds
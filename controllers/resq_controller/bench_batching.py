@@ -0,0 +1,78 @@
+"""
+ResQ Batched Detection Benchmark
+================================
+Offline check of GeminiDetector.detect_batch against detection_worker.FakeClient:
+frames judged per request, request payload size and wall time for single,
+multi-image and mosaic modes, and that a victim in a batch is attributed to
+the right frame.
+
+    python bench_batching.py --frames 24 --batch 4 --delay 0.5
+"""
+
+import argparse
+import time
+
+from bench_stream_protocol import SyntheticCamera
+from detection_worker import FakeClient
+from detectors import BATCH_MODE_MOSAIC, BATCH_MODE_MULTI, GeminiDetector, mosaic_jpeg, parse_batch_answer
+from frame_buffer import FrameBuffer
+from frame_encoder import detector_jpeg
+
+
+def run(mode, frames, batch, delay):
+    client = FakeClient(delay=delay)
+    detector = GeminiDetector(client, "fake-model")
+    size = 1 if mode == "single" else batch
+    judged, payload = 0, 0
+    start = time.perf_counter()
+    for i in range(0, len(frames), size):
+        chunk = frames[i:i + size]
+        if mode == "single":
+            verdicts = [detector.detect(chunk[0])]
+            payload += len(detector_jpeg(chunk[0]))
+        else:
+            verdicts = detector.detect_batch(chunk, mode)
+            if mode == BATCH_MODE_MOSAIC:
+                payload += len(mosaic_jpeg(chunk))
+            else:
+                payload += sum(len(detector_jpeg(f)) for f in chunk)
+        judged += sum(v is not None for v in verdicts)
+    return client.calls, judged, payload, time.perf_counter() - start
+
+
+def check_attribution(frames, batch):
+    """A victim on the last frame of the 2nd call must be reported on exactly that frame."""
+    client = FakeClient(delay=0.0, victim_after=2)
+    detector = GeminiDetector(client, "fake-model")
+    detector.detect_batch(frames[:batch])
+    verdicts = detector.detect_batch(frames[batch:2 * batch])
+    flagged = [i for i, v in enumerate(verdicts) if v is not None and v.victim]
+    return flagged == [batch - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=24)
+    parser.add_argument("--batch", type=int, default=4)
+    parser.add_argument("--delay", type=float, default=0.5, help="fake model latency (s)")
+    parser.add_argument("--size", default="640x480")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split("x"))
+    camera = SyntheticCamera(width, height)
+    buffer = FrameBuffer()
+    frames = [buffer.capture(camera) for _ in range(args.frames)]
+
+    print(f"{args.frames} frames at {width}x{height}, batch {args.batch}, model delay {args.delay:.2f}s")
+    print(f"{'mode':<7} {'calls':>6} {'judged':>7} {'frames/call':>12} {'KB sent':>8} {'wall s':>7}")
+    for mode in ("single", BATCH_MODE_MULTI, BATCH_MODE_MOSAIC):
+        calls, judged, payload, wall = run(mode, frames, args.batch, args.delay)
+        print(f"{mode:<7} {calls:>6} {judged:>7} {judged / calls:>12.1f} {payload / 1024:>8.0f} {wall:>7.2f}")
+
+    parsed = parse_batch_answer("1: NO\n**2: YES** person lying down\nImage 3 - no\n", 4)
+    assert [v.victim if v is not None else None for v in parsed] == [False, True, False, None], parsed
+    print(f"victim attributed to the right frame: {check_attribution(frames, args.batch)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+ResQ Detection Step-Rate Benchmark
+==================================
+Measures how steady the control loop stays while a slow model is being called.
+Runs entirely offline against `detection_worker.FakeClient`.
+
+    python bench_detection.py --delay 2.0 --steps 400 --interval 40
+"""
+
+import argparse
+import statistics
+import time
+
+from detection_worker import DetectionWorker, FakeClient
+
+TIME_STEP = 64  # ms, same as resq_controller
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_loop(mode, steps, interval, delay, step_ms):
+    """Simulate `robot.step()` pacing and return per-step wall times in ms."""
+    client = FakeClient(delay=delay)
+
+    def analyze(frame):
+        response = client.models.generate_content(model="fake-model", contents=["prompt", frame])
+        return "YES" in response.text.upper()
+
+    worker = None
+    if mode == "async":
+        worker = DetectionWorker(analyze)
+        worker.start()
+
+    durations = []
+    deadline = time.perf_counter()
+    for step in range(1, steps + 1):
+        start = time.perf_counter()
+
+        if step % interval == 0:
+            frame = b"frame-%d" % step
+            if worker is None:
+                analyze(frame)
+            elif not worker.busy:
+                worker.submit(frame)
+        if worker is not None:
+            worker.poll()
+
+        # Sleep out the rest of the simulation step, like Webots in real-time mode
+        deadline += step_ms / 1000.0
+        remaining = deadline - time.perf_counter()
+        if remaining > 0:
+            time.sleep(remaining)
+        else:
+            deadline = time.perf_counter()
+        durations.append((time.perf_counter() - start) * 1000.0)
+
+    if worker is not None:
+        worker.stop()
+    return durations, client.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--delay", type=float, default=2.0, help="fake model latency (s)")
+    parser.add_argument("--steps", type=int, default=300, help="control steps per mode")
+    parser.add_argument("--interval", type=int, default=40, help="steps between detection requests")
+    parser.add_argument("--step-ms", type=float, default=TIME_STEP, help="step budget (ms)")
+    parser.add_argument("--mode", choices=["sync", "async", "both"], default="both")
+    args = parser.parse_args()
+
+    modes = ["sync", "async"] if args.mode == "both" else [args.mode]
+    print(f"Step budget {args.step_ms:.0f} ms, model delay {args.delay:.2f}s, "
+          f"request every {args.interval} steps")
+    print(f"{'mode':<6} {'steps':>6} {'calls':>6} {'mean ms':>8} {'p99 ms':>8} {'max ms':>8} {'over budget':>12}")
+    for mode in modes:
+        durations, calls = run_loop(mode, args.steps, args.interval, args.delay, args.step_ms)
+        over = sum(1 for d in durations if d > args.step_ms * 1.5)
+        print(f"{mode:<6} {len(durations):>6} {calls:>6} {statistics.mean(durations):>8.1f} "
+              f"{_percentile(durations, 99):>8.1f} {max(durations):>8.1f} {over:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+ResQ Local Detector Benchmark
+=============================
+Measures how many frames/sec each local detector screens on this CPU at a few
+camera resolutions, and how often it would escalate a frame to Gemini on a
+person-free synthetic scene (false-positive rate -> wasted cloud calls).
+
+    python bench_detectors.py --frames 100 --sizes 320x240,640x480
+"""
+
+import argparse
+import time
+
+from bench_stream_protocol import SyntheticCamera
+from detectors import LOCAL_DETECTORS, create_local_detector
+from frame_buffer import FrameBuffer
+
+
+def bench(detector, camera, frames):
+    buffer = FrameBuffer()
+    captured = [buffer.capture(camera) for _ in range(frames)]
+    detector.detect(captured[0])                     # warm-up
+    hits = 0
+    start = time.perf_counter()
+    for frame in captured:
+        hits += bool(detector.detect(frame))
+    elapsed = time.perf_counter() - start
+    return frames / elapsed, elapsed / frames * 1e3, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--sizes", default="320x240,640x480,1280x720")
+    parser.add_argument("--detectors", default=",".join(LOCAL_DETECTORS))
+    args = parser.parse_args()
+
+    sizes = [tuple(int(v) for v in s.split("x")) for s in args.sizes.split(",")]
+    for name in args.detectors.split(","):
+        detector = create_local_detector(name)
+        if detector is None:
+            continue
+        print(f"{name}:")
+        for width, height in sizes:
+            fps, ms, hits = bench(detector, SyntheticCamera(width, height), args.frames)
+            print(f"  {width:4d}x{height:<4d}  {fps:7.1f} frames/s  {ms:7.2f} ms/frame  "
+                  f"escalations {hits}/{args.frames}")
+
+
+if __name__ == "__main__":
+    main()
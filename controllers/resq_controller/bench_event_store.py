@@ -0,0 +1,150 @@
+"""
+ResQ Event Store Benchmark
+==========================
+How much recording a detection costs the thread that calls it, whether the
+writer keeps up, and how fast the indexed queries are:
+
+    producer    record_detection() time per call, p50/p99 (us), at a given
+                rate (default one row per 1 ms step, far above the ~10/s a
+                mission produces), next to a synchronous INSERT + COMMIT per
+                row on the calling thread
+    writer      rows/s the batching writer sustains flat out, and rows dropped
+    queries     "positives in the last N minutes" and "detections near step X"
+                (of the latest mission) on a table of --rows rows from
+                missions of --mission-steps steps each, with the store's
+                indexes and without any
+
+    python bench_event_store.py [--rows 1000000] [--mission-steps 20000] [--rate 1000] [--seconds 5]
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+import event_store
+from event_store import EventQuery, EventStore, connect
+
+
+def _percentiles_us(values):
+    values = np.asarray(values) * 1e6
+    return np.percentile(values, 50), np.percentile(values, 99)
+
+
+def bench_producer(path, rate, seconds):
+    """record_detection() at `rate` per second from this thread while the writer runs."""
+    store = EventStore(path, robot="bench").start()
+    period = 1.0 / rate
+    calls = []
+    next_call = time.perf_counter()
+    for step in range(int(rate * seconds)):
+        start = time.perf_counter()
+        store.record_detection(step, "hog", "clear", score=0.1, latency=0.02, state="PATROL", pose=(1.0, 2.0, 0.3))
+        calls.append(time.perf_counter() - start)
+        next_call += period
+        time.sleep(max(0.0, next_call - time.perf_counter()))
+    store.close()
+    return calls, store.stats()
+
+
+def bench_sync(path, rate, seconds):
+    """The same rows inserted and committed one by one on the calling thread."""
+    conn = connect(path)
+    with conn:
+        conn.executescript(event_store.SCHEMA)
+    sql = event_store._INSERT_DETECTION
+    period = 1.0 / rate
+    calls = []
+    next_call = time.perf_counter()
+    for step in range(int(rate * seconds)):
+        start = time.perf_counter()
+        with conn:
+            conn.execute(sql, ("sync", "bench", time.time(), step, "PATROL", 1.0, 2.0, 0.3, "hog", "clear", 0,
+                               0.1, 0.02, None, None, None, None, None, None))
+        calls.append(time.perf_counter() - start)
+        next_call += period
+        time.sleep(max(0.0, next_call - time.perf_counter()))
+    conn.close()
+    return calls
+
+
+def bench_writer(path, rows):
+    """Rows/s the writer sustains when fed as fast as possible."""
+    store = EventStore(path, robot="bench", max_pending=rows + 1).start()
+    start = time.perf_counter()
+    for step in range(rows):
+        store.record_detection(step, "hog", "clear", score=0.1, latency=0.02, state="PATROL")
+    store.close(timeout=120)
+    return rows / (time.perf_counter() - start), store.stats()
+
+
+def fill(path, rows, mission_steps, indexed):
+    """A table of `rows` detections over the last day, ~1% positive, one per step; steps restart every mission."""
+    conn = connect(path)
+    schema = event_store.SCHEMA
+    if not indexed:
+        schema = "\n".join(line for line in schema.splitlines() if not line.startswith("CREATE INDEX"))
+    with conn:
+        conn.executescript(schema)
+    rng = np.random.default_rng(0)
+    now = time.time()
+    t = np.sort(now - rng.uniform(0, 86400, rows))
+    victim = rng.random(rows) < 0.01
+    with conn:
+        conn.executemany(event_store._INSERT_DETECTION, (
+            (f"m{i // mission_steps}", "bench", float(t[i]), i % mission_steps, "PATROL", None, None, None, "hog", "candidate" if victim[i] else "clear",
+             int(victim[i]), 0.5, 0.02, i, None, None, None, None, None) for i in range(rows)))
+    conn.close()
+
+
+def time_query(fn, repeat=20):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000.0, len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="table size for the query benchmark")
+    parser.add_argument("--mission-steps", type=int, default=20_000, help="steps (rows) per mission in that table")
+    parser.add_argument("--rate", type=float, default=1000.0, help="producer calls per second")
+    parser.add_argument("--seconds", type=float, default=5.0, help="producer run length")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="resq-events-")
+    try:
+        calls, stats = bench_producer(os.path.join(root, "producer.db"), args.rate, args.seconds)
+        sync = bench_sync(os.path.join(root, "sync.db"), args.rate, args.seconds)
+        p50, p99 = _percentiles_us(calls)
+        s50, s99 = _percentiles_us(sync)
+        print(f"producer at {args.rate:g}/s for {args.seconds:g}s:")
+        print(f"  record_detection()       p50 {p50:7.1f} us  p99 {p99:7.1f} us  "
+              f"({stats['written']} written in {stats['batches']} batches, {stats['dropped']} dropped)")
+        print(f"  INSERT + COMMIT per row  p50 {s50:7.1f} us  p99 {s99:7.1f} us")
+
+        rate, stats = bench_writer(os.path.join(root, "writer.db"), 200_000)
+        print(f"writer flat out: {rate:,.0f} rows/s ({stats['batches']} batches, {stats['write_ms']:.1f} ms each)")
+
+        missions = -(-args.rows // args.mission_steps)
+        print(f"queries on {args.rows:,} rows ({missions} missions):")
+        for indexed in (True, False):
+            path = os.path.join(root, f"query_{indexed}.db")
+            fill(path, args.rows, args.mission_steps, indexed)
+            query = EventQuery(path)
+            recent, n_recent = time_query(lambda: query.recent_detections(10))
+            near, n_near = time_query(lambda: query.detections_near(args.mission_steps // 2, 50))
+            query.close()
+            label = "indexed" if indexed else "no index"
+            print(f"  {label:<9} positives in last 10 min {recent:8.3f} ms ({n_recent} rows)   "
+                  f"near step {near:8.3f} ms ({n_near} rows)")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
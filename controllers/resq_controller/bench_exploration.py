@@ -0,0 +1,86 @@
+"""
+ResQ Exploration Benchmark
+==========================
+Frontier exploration vs the random-wander patrol in the headless simulator:
+mean coverage over time and simulated minutes to reach each coverage level,
+over the same random worlds for both modes. Episodes run on a process pool.
+Each mode runs with its own sonar thresholds unless --param sets them for both.
+
+    python bench_exploration.py --episodes 8 --steps 20000
+    python bench_exploration.py --param obstacle_threshold=600 --param close_threshold=800
+"""
+
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from engine import TIME_STEP, NavConfig, ResQController
+from exploration import NAV_MODES, create_explorer
+from sim_world import ARENA_SIZE, OBSTACLE_DENSITY, GridWorld, run_headless
+from sweep import parse_param
+
+TRACE_EVERY = 100               # Steps between coverage samples
+LEVELS = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+
+def run_episode(task):
+    nav, params, seed, steps, size, density = task
+    world = GridWorld.random(size=size, density=density, rng=random.Random(seed))
+    controller = ResQController(NavConfig(**params), rng=random.Random(seed + 1), verbose=False,
+                                explorer=create_explorer(nav))
+    stats = run_headless(controller, world, steps, coverage_every=TRACE_EVERY)
+    return nav, stats
+
+
+def minutes_to(trace, level):
+    """Simulated minutes until coverage first reaches `level`, or None."""
+    reached = np.flatnonzero(np.asarray(trace) >= level)
+    return reached[0] * TRACE_EVERY * TIME_STEP / 60000.0 if len(reached) else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--episodes", type=int, default=8)
+    parser.add_argument("--steps", type=int, default=20000)
+    parser.add_argument("--param", action="append", type=parse_param, default=[],
+                        help="NavConfig field=value for both modes (repeatable)")
+    parser.add_argument("--arena", default=f"{ARENA_SIZE[0]:g}x{ARENA_SIZE[1]:g}")
+    parser.add_argument("--density", type=float, default=OBSTACLE_DENSITY)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    params = {name: values[0] for name, values in args.param}
+    size = tuple(float(v) for v in args.arena.split("x"))
+    tasks = [(nav, params, 1000 + e * 7919, args.steps, size, args.density)
+             for nav in NAV_MODES for e in range(args.episodes)]
+    print(f"{args.episodes} worlds x {args.steps} steps ({args.steps * TIME_STEP / 60000:.0f} simulated min), "
+          f"{size[0]:g}x{size[1]:g} m arena, params {params or 'default'}")
+
+    traces = {nav: [] for nav in NAV_MODES}
+    speed = {nav: [] for nav in NAV_MODES}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers or os.cpu_count()) as pool:
+        for nav, stats in pool.map(run_episode, tasks):
+            traces[nav].append(stats["coverage_trace"])
+            speed[nav].append(stats["steps_per_second"])
+    print(f"done in {time.perf_counter() - start:.0f}s")
+
+    print(f"{'mode':<8} {'steps/s':>8} {'final':>6} " + " ".join(f"{'t' + format(l, '.0%'):>7}" for l in LEVELS))
+    for nav in NAV_MODES:
+        final = np.mean([t[-1] for t in traces[nav]])
+        cells = []
+        for level in LEVELS:
+            times = [minutes_to(t, level) for t in traces[nav]]
+            reached = [m for m in times if m is not None]
+            # Mean over the worlds where the level was reached, and in how many it was
+            cells.append(f"{np.mean(reached):>4.0f}m{len(reached)}" if reached else f"{'-':>7}")
+        print(f"{nav:<8} {np.mean(speed[nav]):>8.0f} {final:>6.1%} " + " ".join(f"{c:>7}" for c in cells))
+    print(f"(tNN% = mean simulated minutes to that coverage, followed by the number of worlds that reached it)")
+
+
+if __name__ == "__main__":
+    main()
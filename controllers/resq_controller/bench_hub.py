@@ -0,0 +1,137 @@
+"""
+ResQ Stream Hub Load Benchmark
+==============================
+Runs stream_hub.StreamHub against synthetic publishers (no Webots) and
+reports ingest/fan-out throughput, drops, hub CPU and publish-to-fanout
+latency.
+
+Publishers run in separate processes and speak the real TCP wire format.
+Dashboards are in-process stand-ins using protocol v3, so the numbers cover
+hub routing and fan-out but not WebSocket framing.
+
+    python bench_hub.py --robots 40 --fps 10 --viewers 8 --seconds 10
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import statistics
+import struct
+import time
+
+from stream_fanout import StreamClient
+from stream_hub import MSG_FRAME, MSG_STATUS, PROTOCOL_MULTI_BINARY, StreamHub, pack_message
+
+_STAMP = struct.Struct("!d")
+
+
+# =============================================
+# SYNTHETIC PUBLISHERS (child processes)
+# =============================================
+
+async def _publish(robot_id, port, fps, frame_bytes, seconds):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = os.urandom(frame_bytes - _STAMP.size)
+    status = json.dumps({"type": "status", "ai_status": "scanning", "victim": False}).encode('utf-8')
+    writer.write(pack_message(MSG_STATUS, robot_id, status))
+    interval = 1.0 / fps
+    deadline = time.monotonic() + seconds
+    next_send = time.monotonic()
+    while time.monotonic() < deadline:
+        writer.write(pack_message(MSG_FRAME, robot_id, _STAMP.pack(time.time()) + body))
+        await writer.drain()
+        next_send += interval
+        await asyncio.sleep(max(0.0, next_send - time.monotonic()))
+    writer.close()
+
+
+def _publisher_process(robot_ids, port, fps, frame_bytes, seconds):
+    async def run_all():
+        await asyncio.gather(*(_publish(r, port, fps, frame_bytes, seconds) for r in robot_ids))
+    asyncio.run(run_all())
+
+
+# =============================================
+# STAND-IN DASHBOARDS (hub process)
+# =============================================
+
+class StandInDashboard:
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+        self.latencies = []
+
+    async def send(self, message):
+        self.bytes += len(message)
+        if isinstance(message, (bytes, bytearray)):
+            self.frames += 1
+            offset = 1 + message[0]
+            sent_at = _STAMP.unpack_from(message, offset)[0]
+            self.latencies.append((time.time() - sent_at) * 1000.0)
+
+
+async def run(args):
+    hub = StreamHub(verbose=False)
+    server = await asyncio.start_server(hub.handle_publisher, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    dashboards = []
+    all_robots = [f"robot{i:03d}" for i in range(args.robots)]
+    for i in range(args.viewers):
+        dashboard = StandInDashboard()
+        client = StreamClient(dashboard, max_queue=hub.client_queue_depth)
+        hub.add_client(dashboard, client)
+        client.start()
+        # Half the viewers watch everything, the rest a single robot each
+        watch = None if i % 2 == 0 else [all_robots[i % len(all_robots)]]
+        hub.apply_hello(client, {"type": "hello", "protocol": PROTOCOL_MULTI_BINARY, "robots": watch})
+        dashboards.append(dashboard)
+
+    groups = [all_robots[i::args.procs] for i in range(args.procs)]
+    procs = [
+        multiprocessing.Process(target=_publisher_process,
+                                args=(g, port, args.fps, args.frame_bytes, args.seconds))
+        for g in groups if g
+    ]
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for p in procs:
+        p.start()
+    while any(p.is_alive() for p in procs):
+        await asyncio.sleep(0.1)
+    await asyncio.sleep(0.2)  # let the last frames drain
+    cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+
+    server.close()
+    stats = hub.stats()
+    clients = stats["clients"]
+    latencies = sorted(l for d in dashboards for l in d.latencies)
+    out_frames = sum(d.frames for d in dashboards)
+
+    print(f"robots={args.robots} fps={args.fps} frame={args.frame_bytes // 1024}KB "
+          f"viewers={args.viewers} duration={wall:.1f}s")
+    print(f"  ingest:   {stats['frames_in'] / wall:8.1f} frames/s  {stats['bytes_in'] / wall / 1e6:7.2f} MB/s")
+    print(f"  fan-out:  {out_frames / wall:8.1f} frames/s  "
+          f"{sum(d.bytes for d in dashboards) / wall / 1e6:7.2f} MB/s  "
+          f"dropped {sum(c['dropped'] for c in clients)}")
+    print(f"  hub CPU:  {cpu / wall:8.1%} of one core")
+    if latencies:
+        print(f"  latency:  p50 {statistics.median(latencies):.2f} ms  "
+              f"p99 {latencies[int(0.99 * (len(latencies) - 1))]:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--robots", type=int, default=24)
+    parser.add_argument("--fps", type=float, default=10.0, help="frames/s per robot")
+    parser.add_argument("--frame-bytes", type=int, default=20000)
+    parser.add_argument("--viewers", type=int, default=6)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--procs", type=int, default=max(1, min(4, (os.cpu_count() or 2) // 2)),
+                        help="publisher processes")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+ResQ Metrics Overhead Benchmark
+===============================
+Cost of recording each kind of metric, and of everything the controller
+records per step (step timing, overrun check, state dwell check), in µs.
+
+    python bench_metrics.py --n 200000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import metrics
+
+
+def _us(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=200000)
+    args = parser.parse_args()
+    n = args.n
+
+    registry = metrics.Registry()
+    count = registry.counter("bench_total", "counter")
+    hist = registry.histogram("bench_seconds", "histogram")
+    labelled = registry.counter("bench_labelled_total", "labelled counter", ("outcome",))
+    dwell = registry.histogram("bench_dwell_seconds", "labelled histogram", metrics.DWELL_BUCKETS, ("state",))
+    ring = metrics.RingLog(os.path.join(tempfile.mkdtemp(), "ring.log"), records=1024)
+
+    # What resq_controller does every step: two perf_counter reads, two observes,
+    # an overrun compare and the dwell-state compare (no state change)
+    state = [0, 0.0, time.perf_counter()]
+    step_budget = 0.064
+
+    def per_step():
+        called = time.perf_counter()
+        work = called - state[2]
+        hist.observe(work)
+        if work > step_budget:
+            count.inc()
+        now = time.perf_counter()
+        hist.observe(now - state[2])
+        state[2] = now
+        if state[0] != state[1]:
+            dwell.labels("PATROL").observe(0.1)
+
+    rows = [
+        ("counter.inc()", _us(count.inc, n)),
+        ("histogram.observe()", _us(lambda: hist.observe(0.0042), n)),
+        ("labels(x).inc()", _us(lambda: labelled.labels("clear").inc(), n)),
+        ("ring log write", _us(lambda: ring.write("state", left="PATROL", entered="AVOID", dwell=1.25, step=1), n // 10)),
+        ("controller per-step total", _us(per_step, n)),
+    ]
+    start = time.perf_counter()
+    for _ in range(100):
+        registry.render()
+    rows.append(("render (scrape)", (time.perf_counter() - start) / 100 * 1e6))
+    ring.close()
+
+    for name, us in rows:
+        print(f"  {name:<28} {us:8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+ResQ Sonar Processing Microbenchmark
+====================================
+Compares the original per-sensor Python obstacle checks with sonar.py's
+NumPy pass, per step and in batched mode (many timesteps x many robots).
+
+    python bench_sonar.py --steps 20000 --robots 64
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from sonar import CLOSE_THRESHOLD, OBSTACLE_THRESHOLD, SonarProcessor, process_batch
+
+
+class FakeSensor:
+    def __init__(self, values):
+        self._values = values
+        self._i = 0
+
+    def getValue(self):
+        self._i = (self._i + 1) % len(self._values)
+        return self._values[self._i]
+
+
+def python_pass(sv):
+    """The controller's original per-sensor logic."""
+    def has_obstacle(value):
+        return value > OBSTACLE_THRESHOLD
+
+    def is_close(value):
+        return value > CLOSE_THRESHOLD
+
+    obstacle_left = has_obstacle(sv[0]) or has_obstacle(sv[1])
+    obstacle_front_left = has_obstacle(sv[2]) or has_obstacle(sv[3])
+    obstacle_front_right = has_obstacle(sv[4]) or has_obstacle(sv[5])
+    obstacle_right = has_obstacle(sv[6]) or has_obstacle(sv[7])
+    obstacle_front = obstacle_front_left or obstacle_front_right
+    close_front = is_close(sv[2]) or is_close(sv[3]) or is_close(sv[4]) or is_close(sv[5])
+    left_blocked = sv[0] + sv[1] + sv[2] + sv[3]
+    right_blocked = sv[4] + sv[5] + sv[6] + sv[7]
+    return obstacle_left, obstacle_right, obstacle_front, close_front, left_blocked, right_blocked
+
+
+def _timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=20000)
+    parser.add_argument("--robots", type=int, default=64)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    trace = rng.uniform(0, 500, size=(args.steps, args.robots, 8))
+    sensors = [FakeSensor(trace[:, 0, i].tolist()) for i in range(8)]
+
+    # --- Single robot, one step at a time (what the controller does) ---
+    py_us = _timed(lambda: python_pass([s.getValue() for s in sensors]), args.steps)
+    processor = SonarProcessor(sensors)
+    np_us = _timed(processor.read, args.steps)
+    smooth = SonarProcessor(sensors, smoothing=0.5)
+    np_smooth_us = _timed(smooth.read, args.steps)
+
+    # --- Batched: all steps x all robots ---
+    flat = trace.tolist()
+    start = time.perf_counter()
+    for step in flat:
+        for sv in step:
+            python_pass(sv)
+    py_batch = time.perf_counter() - start
+    start = time.perf_counter()
+    process_batch(trace)
+    np_batch = time.perf_counter() - start
+    start = time.perf_counter()
+    process_batch(trace, smoothing=0.5)
+    np_batch_smooth = time.perf_counter() - start
+
+    samples = args.steps * args.robots
+    print(f"Per step, 1 robot (incl. sensor reads), {args.steps} steps:")
+    print(f"  python per-sensor      {py_us:8.2f} us/step")
+    print(f"  sonar.SonarProcessor   {np_us:8.2f} us/step")
+    print(f"  ... with smoothing     {np_smooth_us:8.2f} us/step")
+    print(f"Batched, {args.steps} steps x {args.robots} robots ({samples} readings):")
+    print(f"  python per-sensor      {py_batch * 1e3:8.1f} ms  ({samples / py_batch / 1e6:6.2f} M readings/s)")
+    print(f"  sonar.process_batch    {np_batch * 1e3:8.1f} ms  ({samples / np_batch / 1e6:6.2f} M readings/s)")
+    print(f"  ... with smoothing     {np_batch_smooth * 1e3:8.1f} ms  ({samples / np_batch_smooth / 1e6:6.2f} M readings/s)")
+
+
+if __name__ == "__main__":
+    main()
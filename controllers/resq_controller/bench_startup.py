@@ -0,0 +1,239 @@
+"""
+ResQ Controller Startup Benchmark
+=================================
+Measures how long a (re)started controller takes to become useful, with a
+stub `controller` module instead of Webots:
+
+    first step      process start -> first robot.step() (imports, device and
+                    AI setup, stream server start)
+    first capture   process start -> first camera.getImage()
+    listening       process start -> a dashboard can connect
+    first frame     process start -> a connected dashboard receives a frame
+
+Each run is a fresh Python process running resq_controller.py in offline
+test mode (fake model, no metrics endpoint), as Webots would start it. This
+script polls the stream port as a dashboard would, then stops the child.
+
+    python bench_startup.py --runs 5 [--json]
+"""
+
+import argparse
+import json
+import os
+import runpy
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import types
+
+CONTROLLER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resq_controller.py")
+TIME_STEP = 64
+MARK = "@@startup"
+PHASES = ("first_step", "first_capture", "listening", "first_frame")
+
+
+# =============================================
+# CHILD: the controller on a stub robot
+# =============================================
+
+class _StubDevice:
+    """Motor, sonar or encoder: accepts everything, reads 0."""
+
+    def __init__(self):
+        self.velocity = 0.0
+
+    def enable(self, time_step):
+        pass
+
+    def setPosition(self, position):
+        pass
+
+    def setVelocity(self, velocity):
+        self.velocity = velocity
+
+    def getVelocity(self):
+        return self.velocity
+
+    def getValue(self):
+        return 0.0
+
+
+class _StubCamera:
+    """Fixed-size BGRA camera whose image changes every call (no PIL, so it adds no imports)."""
+
+    def __init__(self, width, height, on_first):
+        self.width = width
+        self.height = height
+        self._row = bytes(range(256)) * (width * 4 // 256 + 1)
+        self._calls = 0
+        self._on_first = on_first
+
+    def enable(self, time_step):
+        pass
+
+    def getWidth(self):
+        return self.width
+
+    def getHeight(self):
+        return self.height
+
+    def getImage(self):
+        if self._calls == 0:
+            self._on_first()
+        self._calls += 1
+        shift = (self._calls * 4) % 256
+        row = self._row[shift:shift + self.width * 4]
+        return row * self.height
+
+    def saveImage(self, path, quality):
+        return 0
+
+
+class _StubRobot:
+    def __init__(self, seconds):
+        self.camera = _StubCamera(320, 240, lambda: _mark("first_capture"))
+        self._steps_left = int(seconds * 1000 / TIME_STEP)
+        self._stepped = False
+
+    def getName(self):
+        return "bench"
+
+    def getDevice(self, name):
+        return self.camera if name == "camera" else _StubDevice()
+
+    def step(self, time_step):
+        if not self._stepped:
+            self._stepped = True
+            _mark("first_step")
+        time.sleep(time_step / 1000.0)  # Webots in real-time mode
+        self._steps_left -= 1
+        return -1 if self._steps_left <= 0 else 0
+
+
+def _mark(phase):
+    print(f"{MARK} {phase} {time.time():.6f}", flush=True)
+
+
+def run_child(seconds):
+    robot = _StubRobot(seconds)
+    module = types.ModuleType("controller")
+    module.Robot = lambda: robot
+    module.Camera = _StubCamera
+    module.Motor = _StubDevice
+    sys.modules["controller"] = module
+    sys.path.insert(0, os.path.dirname(CONTROLLER_SCRIPT))
+    controller = runpy.run_path(CONTROLLER_SCRIPT, run_name="__main__")
+    for worker in (controller.get("detector"), controller.get("screener")):
+        if worker is not None:
+            worker.stop()
+
+
+# =============================================
+# PARENT: start the controller, watch it like a dashboard
+# =============================================
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _watch_stream(port, started, times, done, deadline):
+    """Connect as a v1 dashboard as soon as the port accepts; note when the first frame arrives."""
+    from websockets.sync.client import connect
+    while not done.is_set() and time.time() < deadline:
+        try:
+            ws = connect(f"ws://127.0.0.1:{port}", open_timeout=1.0)
+        except Exception:  # not listening yet
+            time.sleep(0.005)
+            continue
+        times["listening"] = time.time() - started
+        with ws:
+            while time.time() < deadline:
+                try:
+                    message = ws.recv(timeout=max(0.01, deadline - time.time()))
+                except TimeoutError:
+                    break
+                if isinstance(message, str) and '"frame": "' in message and '"frame": ""' not in message:
+                    times["first_frame"] = time.time() - started
+                    break
+        return
+
+
+def run_once(seconds, timeout):
+    port = _free_port()
+    env = dict(os.environ)
+    env.update({"RESQ_WS_PORT": str(port), "RESQ_FAKE_MODEL_DELAY": "0", "RESQ_METRICS_PORT": "0",
+                "RESQ_METRICS_LOG": "", "RESQ_EVENTS": "", "PYTHONUNBUFFERED": "1"})
+    env.setdefault("RESQ_LOCAL_DETECTOR", "none")
+    env.pop("RESQ_RECORD", None)
+    env.pop("RESQ_HUB", None)
+
+    times = {}
+    done = threading.Event()
+    started = time.time()
+    child = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--child", "--seconds", str(seconds)],
+                             stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, env=env)
+    watcher = threading.Thread(target=_watch_stream, args=(port, started, times, done, started + timeout), daemon=True)
+    watcher.start()
+    output = []
+
+    def read_child():
+        for line in child.stdout:
+            output.append(line)
+            if line.startswith(MARK):
+                _, phase, stamp = line.split()
+                times[phase] = float(stamp) - started
+
+    reader = threading.Thread(target=read_child, daemon=True)
+    reader.start()
+    watcher.join(timeout)
+    done.set()
+    child.terminate()
+    try:
+        child.wait(5)
+    except subprocess.TimeoutExpired:
+        child.kill()
+        child.wait()
+    reader.join(1)
+    missing = [p for p in PHASES if p not in times]
+    if missing:
+        sys.stderr.write("".join(output[-20:]))
+        raise RuntimeError(f"controller never reached: {', '.join(missing)}")
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--seconds", type=float, default=10.0, help="max stub mission length per run")
+    parser.add_argument("--timeout", type=float, default=20.0, help="give up on a run after this long")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.seconds)
+        return
+
+    runs = []
+    for i in range(args.runs):
+        runs.append(run_once(args.seconds, args.timeout))
+        if not args.json:
+            print(f"  run {i + 1}: " + ", ".join(f"{p} {runs[-1][p] * 1000:.0f} ms" for p in PHASES))
+
+    summary = {p: {"median_ms": statistics.median(r[p] for r in runs) * 1000.0,
+                   "min_ms": min(r[p] for r in runs) * 1000.0} for p in PHASES}
+    if args.json:
+        print(json.dumps({"runs": [{p: r[p] * 1000.0 for p in PHASES} for r in runs], "summary": summary}, indent=1))
+        return
+    print(f"{'phase':<14} {'median':>9} {'min':>9}")
+    for phase in PHASES:
+        print(f"{phase:<14} {summary[phase]['median_ms']:>7.0f}ms {summary[phase]['min_ms']:>7.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
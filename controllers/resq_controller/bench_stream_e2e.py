@@ -0,0 +1,331 @@
+"""
+ResQ End-to-End Streaming Benchmark
+===================================
+Measures the live camera stream the way a dashboard sees it: a controller
+loop calls camera_streamer.update_frame() with a synthetic camera at a fixed
+step rate, and N real WebSocket clients in a separate process receive the
+frames over localhost.
+
+Per configuration it reports:
+
+    latency     capture -> received by a client, p50/p99 (ms)
+    fps         frames delivered per client per second (min/mean/max)
+    bytes/s     per client and in total
+    encode      stream encode time per frame (JPEG or video), p50/p99 (ms)
+    cpu         CPU used by this process (controller loop, encode, server)
+                as a share of one core
+    overhead    time update_frame() takes on the controller thread per step,
+                p50/p99 (ms), and the share of steps that overran the step
+
+JPEG frames are matched to their capture time by CRC-32 of the JPEG bytes,
+video frames (--codec h264/vp8, clients ask for it in their hello) by the
+frame seq in the message header, so nothing is added to what the server
+sends. With --verify the clients also decode every video message with PyAV
+and count the frames that failed. Each configuration appends one JSON line
+(settings, results, git revision) to the results file, so runs can be
+compared across changes to camera_streamer.py.
+
+    python bench_stream_e2e.py --clients 1,8,32 --width 640 --height 480 \\
+        --step-ms 64 --seconds 10 [--protocol 1] [--codec h264 [--verify]]
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import time
+import zlib
+
+import numpy as np
+
+import camera_streamer
+import video_stream
+from bench_stream_protocol import SyntheticCamera
+from frame_buffer import capture_frame
+from video_stream import unpack_video
+
+RESULTS_PATH = "bench_stream_e2e.jsonl"
+
+
+# =============================================
+# CLIENTS (child process)
+# =============================================
+
+class _VideoCheck:
+    """Decodes a client's video messages with PyAV; counts frames that fail."""
+
+    def __init__(self, codec):
+        import av
+        self._decoder = av.CodecContext.create(codec, "r")
+        self.decoded = 0
+        self.errors = 0
+
+    def feed(self, packets):
+        import av
+        for packet in packets:
+            try:
+                self.decoded += len(self._decoder.decode(av.Packet(packet)))
+            except av.error.FFmpegError:
+                self.errors += 1
+
+
+async def _client(port, protocol, codec, verify, seconds, connected, go):
+    """One dashboard: (frame id, received_at) per frame, total bytes received, decode errors."""
+    from websockets.asyncio.client import connect
+    frames = []
+    received = 0
+    check = _VideoCheck(codec) if codec and verify else None
+    async with connect(f"ws://127.0.0.1:{port}", max_size=None, compression=None) as ws:
+        if protocol >= camera_streamer.PROTOCOL_BINARY:
+            hello = {"type": "hello", "protocol": protocol}
+            if codec:
+                hello["codecs"] = [codec]
+            await ws.send(json.dumps(hello))
+        connected()
+        await go.wait()
+        deadline = time.time() + seconds
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                message = await asyncio.wait_for(ws.recv(), remaining)
+            except asyncio.TimeoutError:
+                break
+            now = time.time()
+            received += len(message)
+            if isinstance(message, bytes):
+                video = unpack_video(message)
+                if video is None:
+                    frames.append((zlib.crc32(message), now))
+                else:
+                    frames.append((("seq", video[1]), now))
+                    if check is not None:
+                        check.feed(video[2])
+            else:
+                data = json.loads(message)
+                if data.get("frame"):
+                    frames.append((zlib.crc32(base64.b64decode(data["frame"])), now))
+    return frames, received, check.errors if check is not None else None
+
+
+def _client_process(port, protocol, codec, verify, count, seconds, ready, start, results):
+    async def run_all():
+        go = asyncio.Event()
+        pending = [count]
+
+        def connected():
+            pending[0] -= 1
+            if pending[0] == 0:
+                ready.set()
+
+        async def wait_start():
+            await asyncio.get_running_loop().run_in_executor(None, start.wait)
+            go.set()
+
+        waiter = asyncio.ensure_future(wait_start())
+        out = await asyncio.gather(*(_client(port, protocol, codec, verify, seconds, connected, go)
+                                     for _ in range(count)))
+        await waiter
+        return out
+
+    results.put(asyncio.run(run_all()))
+
+
+# =============================================
+# CONTROLLER SIDE (this process)
+# =============================================
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentiles(values_ms):
+    if not len(values_ms):
+        return {"p50": None, "p99": None, "mean": None}
+    values = np.asarray(values_ms)
+    return {"p50": round(float(np.percentile(values, 50)), 3), "p99": round(float(np.percentile(values, 99)), 3),
+            "mean": round(float(values.mean()), 3)}
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_config(port, clients, width, height, step_ms, seconds, protocol, every_n, codec=None, verify=False):
+    camera = SyntheticCamera(width, height)
+    camera_streamer.STREAM_EVERY_N_STEPS = every_n
+
+    # Time the stream encodes without changing what they produce
+    encode_ms = []
+    original_jpeg = camera_streamer.stream_jpeg
+    original_video = video_stream.VideoEncoder.encode
+
+    def timed_jpeg(frame, quality, scale=1.0):
+        start = time.perf_counter()
+        jpeg = original_jpeg(frame, quality, scale)
+        encode_ms.append((time.perf_counter() - start) * 1000.0)
+        return jpeg
+
+    def timed_video(self, frame, seq):
+        start = time.perf_counter()
+        message = original_video(self, frame, seq)
+        encode_ms.append((time.perf_counter() - start) * 1000.0)
+        return message
+
+    camera_streamer.stream_jpeg = timed_jpeg
+    video_stream.VideoEncoder.encode = timed_video
+
+    ctx = multiprocessing.get_context("spawn")
+    ready, start, results = ctx.Event(), ctx.Event(), ctx.Queue()
+    process = ctx.Process(target=_client_process,
+                          args=(port, protocol, codec, verify, clients, seconds, ready, start, results))
+    process.start()
+    if not ready.wait(30):
+        process.terminate()
+        raise RuntimeError("clients did not connect")
+    while len(camera_streamer._clients) < clients:
+        time.sleep(0.01)
+
+    captured = {}                   # crc or ("seq", n) -> capture times (a panning camera repeats frames)
+    overhead_ms = []
+    overruns = 0
+    step = step_ms / 1000.0
+    last_seq = camera_streamer._frame_seq
+    start.set()
+    began = time.time()
+    cpu_began = time.process_time()
+    next_step = time.perf_counter()
+    steps = int(seconds / step)
+    for _ in range(steps):
+        captured_at = time.time()
+        tick = time.perf_counter()
+        frame = capture_frame(camera)
+        camera_streamer.update_frame(camera, frame)
+        elapsed = time.perf_counter() - tick
+        overhead_ms.append(elapsed * 1000.0)
+        if elapsed > step:
+            overruns += 1
+        if camera_streamer._frame_seq != last_seq:
+            last_seq = camera_streamer._frame_seq
+            captured[("seq", last_seq)] = [captured_at]
+            snapshot = camera_streamer._snapshot
+            if snapshot is not None and snapshot[0] == last_seq:
+                captured.setdefault(zlib.crc32(snapshot[1]), []).append(captured_at)
+        next_step += step
+        time.sleep(max(0.0, next_step - time.perf_counter()))
+    duration = time.time() - began
+    cpu = time.process_time() - cpu_began
+
+    per_client = results.get(timeout=seconds + 30)
+    process.join(10)
+    camera_streamer.stream_jpeg = original_jpeg
+    video_stream.VideoEncoder.encode = original_video
+    while camera_streamer._clients:
+        time.sleep(0.01)
+
+    latencies, fps, rates = [], [], []
+    decode_errors = [errors for _, _, errors in per_client if errors is not None]
+    for frames, received, _ in per_client:
+        fps.append(len(frames) / duration)
+        rates.append(received / duration)
+        for crc, received_at in frames:
+            times = captured.get(crc)
+            if not times:
+                continue
+            # The latest capture of this image before it arrived
+            earlier = [t for t in times if t <= received_at]
+            if earlier:
+                latencies.append((received_at - earlier[-1]) * 1000.0)
+
+    return {
+        "latency_ms": _percentiles(latencies),
+        "fps_per_client": {"min": round(min(fps), 2), "mean": round(float(np.mean(fps)), 2), "max": round(max(fps), 2)},
+        "offered_fps": round(1000.0 / (step_ms * every_n), 2),
+        "bytes_per_s_per_client": round(float(np.mean(rates))),
+        "bytes_per_s_total": round(float(np.sum(rates))),
+        "encode_ms": _percentiles(encode_ms),
+        "cpu_percent": round(100.0 * cpu / duration, 1),
+        "decode_errors": sum(decode_errors) if decode_errors else None,
+        "update_frame_ms": _percentiles(overhead_ms),
+        "step_overruns": round(overruns / max(1, steps), 4),
+        "frames_published": len(encode_ms),
+        "frames_matched": len(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", default="1,8", help="comma-separated client counts, one run each")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--step-ms", type=float, default=64.0, help="controller step period (TIME_STEP)")
+    parser.add_argument("--every-n", type=int, default=camera_streamer.STREAM_EVERY_N_STEPS,
+                        help="stream every Nth step")
+    parser.add_argument("--seconds", type=float, default=10.0, help="measured time per run")
+    parser.add_argument("--protocol", type=int, choices=(camera_streamer.PROTOCOL_JSON, camera_streamer.PROTOCOL_BINARY),
+                        default=camera_streamer.PROTOCOL_BINARY)
+    parser.add_argument("--codec", choices=sorted(video_stream.CODECS), help="clients ask for video (v2 only)")
+    parser.add_argument("--verify", action="store_true", help="clients decode the video and count errors")
+    parser.add_argument("--out", default=RESULTS_PATH, help="JSON lines file to append results to ('' = don't)")
+    args = parser.parse_args()
+
+    port = _free_port()
+    if args.codec:
+        if args.protocol < camera_streamer.PROTOCOL_BINARY:
+            parser.error("--codec needs --protocol 2")
+        camera_streamer.STREAM_CODEC = args.codec
+    camera_streamer.WS_PORT = port
+    camera_streamer.HTTP_PORT = 0
+    if not camera_streamer.start_streaming().wait():
+        raise SystemExit("stream server did not start")
+    if args.codec:
+        deadline = time.time() + 10
+        while args.codec not in camera_streamer._video_codecs and time.time() < deadline:
+            time.sleep(0.05)
+        if args.codec not in camera_streamer._video_codecs:
+            raise SystemExit(f"{args.codec} encoding unavailable (pip install av)")
+
+    revision = _git_revision()
+    print(f"{args.width}x{args.height}, step {args.step_ms:g} ms, every {args.every_n} step(s), "
+          f"protocol v{args.protocol}, {args.codec or 'jpeg'}, {args.seconds:g}s per run")
+    print(f"{'clients':>7} {'lat p50':>8} {'lat p99':>8} {'fps min/mean':>13} {'KB/s/client':>11} "
+          f"{'enc p50':>8} {'cpu':>6} {'upd p50':>8} {'upd p99':>8} {'overrun':>8}")
+    for clients in (int(c) for c in args.clients.split(",")):
+        result = run_config(port, clients, args.width, args.height, args.step_ms, args.seconds,
+                            args.protocol, args.every_n, args.codec, args.verify)
+        lat, enc, upd = result["latency_ms"], result["encode_ms"], result["update_frame_ms"]
+        print(f"{clients:>7} {lat['p50']:>6.1f}ms {lat['p99']:>6.1f}ms "
+              f"{result['fps_per_client']['min']:>6.1f}/{result['fps_per_client']['mean']:<6.1f} "
+              f"{result['bytes_per_s_per_client'] / 1024:>11.1f} {enc['p50']:>6.2f}ms "
+              f"{result['cpu_percent']:>5.1f}% {upd['p50']:>6.2f}ms {upd['p99']:>6.2f}ms "
+              f"{result['step_overruns']:>8.1%}")
+        if result["decode_errors"] is not None:
+            print(f"{'':>7} decode errors: {result['decode_errors']}")
+        if args.out:
+            record = {
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "revision": revision,
+                "config": {"clients": clients, "width": args.width, "height": args.height,
+                           "step_ms": args.step_ms, "every_n": args.every_n, "seconds": args.seconds,
+                           "protocol": args.protocol, "codec": args.codec or "jpeg", "cpus": os.cpu_count()},
+                "results": result,
+            }
+            with open(args.out, "a") as f:
+                f.write(json.dumps(record) + "\n")
+    if args.out:
+        print(f"📄 Results appended to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+ResQ Stream Protocol Benchmark
+==============================
+Compares bytes on the wire and server-side send cost of the v1 (base64 JSON)
+and v2 (binary JPEG + status-on-change) protocols, and of an HTTP MJPEG
+viewer (stream_http.py). Uses local stand-in clients, so no network or
+browser is needed.
+
+    python bench_stream_protocol.py --frames 200 --width 640 --height 480
+"""
+
+import argparse
+import asyncio
+import time
+
+import PIL.Image
+
+import camera_streamer
+from stream_fanout import StreamClient
+from stream_http import MjpegViewer
+
+
+class StandInClient:
+    """Counts what the server would put on the wire for one dashboard."""
+
+    def __init__(self):
+        self.text_bytes = 0
+        self.binary_bytes = 0
+        self.messages = 0
+
+    async def send(self, message):
+        self.messages += 1
+        if isinstance(message, str):
+            self.text_bytes += len(message.encode('utf-8'))
+        else:
+            self.binary_bytes += len(message)
+
+
+class StandInWriter:
+    """asyncio.StreamWriter stand-in for an MJPEG viewer; counts multipart bytes."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def get_extra_info(self, name):
+        return None
+
+    def write(self, data):
+        self.client.binary_bytes += len(data)
+
+    async def drain(self):
+        pass
+
+
+class SyntheticCamera:
+    """Camera stand-in producing a slowly panning, mildly noisy BGRA scene."""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        base = PIL.Image.linear_gradient('L').resize((width * 2, height))
+        noise = PIL.Image.effect_noise((width * 2, height), 24)
+        alpha = PIL.Image.new('L', (width * 2, height), 255)
+        self._scene = PIL.Image.merge('RGBA', (base, noise, base.transpose(PIL.Image.FLIP_LEFT_RIGHT), alpha))
+        self._offset = 0
+
+    def getImage(self):
+        self._offset = (self._offset + 4) % self.width
+        view = self._scene.crop((self._offset, 0, self._offset + self.width, self.height))
+        return view.tobytes('raw', 'BGRA')
+
+    def getWidth(self):
+        return self.width
+
+    def getHeight(self):
+        return self.height
+
+
+async def run(protocol, frames, camera, status_every):
+    client = StandInClient()
+    if protocol == camera_streamer.PROTOCOL_MJPEG:
+        wire = MjpegViewer(StandInWriter(client))
+    else:
+        wire = client
+    slot = StreamClient(wire, protocol)
+    slot.start()
+    camera_streamer._clients.clear()
+    camera_streamer._clients[wire] = slot
+    camera_streamer.STREAM_EVERY_N_STEPS = 1
+
+    send_time = 0.0
+    last_status_seq = None
+    for i in range(frames):
+        if status_every and i % status_every == 0:
+            camera_streamer.set_ai_status("scanning", response=f"scan #{i}")
+        status_seq = camera_streamer._status_seq
+        camera_streamer.update_frame(camera)
+        start = time.perf_counter()
+        camera_streamer._broadcast(True, status_seq != last_status_seq)
+        while not slot.idle:
+            await asyncio.sleep(0)
+        send_time += time.perf_counter() - start
+        last_status_seq = status_seq
+
+    client.messages = slot.sent
+    slot.stop()
+    camera_streamer._clients.clear()
+    return client, send_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--status-every", type=int, default=50, help="frames between AI status changes")
+    args = parser.parse_args()
+
+    camera = SyntheticCamera(args.width, args.height)
+    print(f"{args.frames} frames at {args.width}x{args.height}, JPEG q{camera_streamer.JPEG_QUALITY}")
+    print(f"{'protocol':<10} {'messages':>9} {'text KB':>9} {'binary KB':>10} {'total KB':>9} {'send ms/frame':>14}")
+    results = {}
+    names = {camera_streamer.PROTOCOL_JSON: "v1", camera_streamer.PROTOCOL_BINARY: "v2",
+             camera_streamer.PROTOCOL_MJPEG: "mjpeg"}
+    for protocol in names:
+        client, send_time = asyncio.run(run(protocol, args.frames, camera, args.status_every))
+        total = client.text_bytes + client.binary_bytes
+        results[protocol] = total
+        print(f"{names[protocol]:<10} {client.messages:>9} {client.text_bytes / 1024:>9.1f} "
+              f"{client.binary_bytes / 1024:>10.1f} {total / 1024:>9.1f} "
+              f"{send_time * 1000 / args.frames:>14.3f}")
+    saved = 1 - results[camera_streamer.PROTOCOL_BINARY] / results[camera_streamer.PROTOCOL_JSON]
+    print(f"v2 saves {saved:.1%} of bytes on the wire")
+    saved = 1 - results[camera_streamer.PROTOCOL_MJPEG] / results[camera_streamer.PROTOCOL_JSON]
+    print(f"MJPEG saves {saved:.1%} (same JPEG bytes plus ~80 bytes of part headers per frame)")
+
+
+if __name__ == "__main__":
+    main()
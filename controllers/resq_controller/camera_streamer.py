@@ -2,86 +2,530 @@
 Webots Camera Streamer - WebSocket Server
 ==========================================
 Streams your Webots camera feed + AI detection status to the browser dashboard.
+Clients negotiate a protocol version: JSON with base64 frames (v1, default)
+or raw binary JPEG frames with status-only JSON (v2).
+
+With RESQ_HUB=host:port set, frames are published to a shared stream_hub.py
+process instead of serving dashboards from this controller.
+
+With RESQ_STREAM_PROCESS=1 set, encoding and serving run in a separate
+process (this file run as a script) fed through a shared-memory frame ring,
+so the controller only copies raw frames.
+
+Next to the WebSocket server, plain HTTP on HTTP_PORT serves the same JPEG
+bytes as an MJPEG stream (/stream.mjpg) and a snapshot (/snapshot.jpg,
+with ETag/If-None-Match) for viewers that are not the dashboard.
+
+With RESQ_STREAM_CODEC=h264 (or vp8) and PyAV installed, v2 dashboards
+whose hello lists the codec ({"type": "hello", "protocol": 2, "codecs":
+["h264"]}) get inter-frame video messages (see video_stream.py) instead of
+JPEGs, at a fraction of the bandwidth. Each frame is encoded once for all of
+them; late joiners and viewers that fell behind get the GOP since the last
+keyframe so their decoder can start at once. Everyone else keeps JPEG.
 """
 
 import asyncio
-import base64
-import io
+import atexit
 import json
+import os
+import subprocess
+import sys
 import threading
 import time
-import PIL.Image
+from frame_buffer import capture_frame
+from frame_encoder import stream_b64, stream_jpeg
+from stream_fanout import StreamClient
+from stream_tuner import StreamTuner
+from stream_hub import MSG_FRAME, MSG_STATUS, pack_message
+from stream_http import MJPEG_HEAD, MjpegViewer, etag_matches, read_request, response_head
+import metrics
 
 # --- Configuration ---
-WS_PORT = 8765
+STREAM_ENABLED = os.environ.get("RESQ_STREAM", "1") != "0"  # RESQ_STREAM=0: no servers, no encoding (replay, CI)
+WS_PORT = int(os.environ.get("RESQ_WS_PORT", "8765"))
 JPEG_QUALITY = 70
 STREAM_EVERY_N_STEPS = 2
+CLIENT_QUEUE_DEPTH = 1       # Frames buffered per viewer before its oldest is dropped
+ADAPTIVE_STREAM = os.environ.get("RESQ_ADAPTIVE_STREAM") == "1"  # Tune quality/resolution/frame skip to the network (stream_tuner.py)
+
+# --- Inter-frame video for capable dashboards (optional, needs PyAV) ---
+STREAM_CODEC = os.environ.get("RESQ_STREAM_CODEC", "jpeg")  # "jpeg", "h264" or "vp8"
+VIDEO_FPS = 8.0              # Nominal stream frame rate for the video rate control (64 ms steps, every 2nd)
+
+# --- Multi-robot hub (optional) ---
+HUB_ADDRESS = os.environ.get("RESQ_HUB")             # "host:port" of stream_hub.py's publish port
+ROBOT_ID = os.environ.get("RESQ_ROBOT_ID", "robot")  # name this robot publishes under
+HUB_RECONNECT_DELAY = 2.0
+READY_TIMEOUT = 5.0          # Default StreamReadiness.wait() timeout (seconds)
+
+# --- Plain-HTTP endpoints (MJPEG + snapshot; 0 = off) ---
+HTTP_PORT = int(os.environ.get("RESQ_HTTP_PORT", "8767"))  # not 8766: stream_hub.py publish port
+SNAPSHOT_DEMAND_SECONDS = 5.0  # Keep encoding this long after a snapshot request, even with no viewers
+SNAPSHOT_MAX_AGE = 1.0       # A snapshot older than this when nobody was watching waits for a fresh frame...
+SNAPSHOT_WAIT = 1.0          # ...for at most this long
+
+# --- Out-of-process streaming (optional) ---
+STREAM_PROCESS = os.environ.get("RESQ_STREAM_PROCESS") == "1"
+RING_POLL_INTERVAL = 0.002   # Streamer process: seconds between checks for a new frame
+
+# --- Metrics endpoint (0 = off) ---
+METRICS_PORT = int(os.environ.get("RESQ_METRICS_PORT", metrics.METRICS_PORT))
+
+# --- Protocol ---
+# v1 (default): one JSON text message per frame: {"frame": <base64 JPEG>, "victim", "ai_status", "ai_response"}
+# v2 (client sends {"type": "hello", "protocol": 2}): raw JPEG bytes as binary messages,
+#     plus a small {"type": "status", ...} JSON text message only when the AI status changes.
+PROTOCOL_JSON = 1
+PROTOCOL_BINARY = 2
+LATEST_PROTOCOL = PROTOCOL_BINARY
+PROTOCOL_MJPEG = 0           # HTTP MJPEG viewers: frames only (never negotiated over WebSocket)
 
 # --- Internal State ---
-_latest_frame_b64 = None
-_clients = set()
+_latest_frame = None         # frame_buffer.Frame of the last streamed frame
+_latest_jpeg = None          # its encoded JPEG bytes
+_latest_encoding = (JPEG_QUALITY, 1.0)  # (quality, scale) _latest_jpeg was encoded with
+_encode_ms = None            # smoothed stream encode time
+_tuner = None                # StreamTuner, created on first use when ADAPTIVE_STREAM is on
+_frame_seq = 0               # bumped on every new streamed frame
+_snapshot = None             # (frame seq, JPEG bytes, perf_counter() published), replaced as one tuple
+_snapshot_demand = 0.0       # monotonic() until which snapshot pollers want frames encoded
+_BOOT_ID = f"{os.getpid():x}{int(time.time()):x}"  # ETags from a previous run never match
+_clients = {}                # websocket -> stream_fanout.StreamClient
 _step_count = 0
 _server_started = False
+_readiness = None            # StreamReadiness handed out by start_streaming()
+_loop = None                 # event loop of the server thread
+_wakeup = None               # asyncio.Event set whenever there is something new to send
+_frames_coalesced = 0        # frames replaced by a newer one before they could be sent
+_ring = None                 # FrameRing to the streamer process (STREAM_PROCESS only)
+_video = None                # video_stream.VideoEncoder, created for the first video viewer
+_video_codecs = ()           # codecs PyAV can encode here (checked once the server is up)
+_encoder_warm = False        # _warm_up_encoder() has run
+_ring_process = None
+
+# --- Metrics (see metrics.py) ---
+_ENCODE_SECONDS = metrics.histogram("resq_stream_encode_seconds", "JPEG encode time per streamed frame")
+_FANOUT_SECONDS = metrics.histogram(
+    "resq_stream_fanout_seconds", "Time from publishing a frame until it is queued for every client")
+_VIDEO_ENCODE_SECONDS = metrics.histogram(
+    "resq_stream_video_encode_seconds", "Video (STREAM_CODEC) encode time per streamed frame")
+_FRAMES_TOTAL = metrics.counter("resq_stream_frames_total", "Frames encoded for streaming")
+_CLIENTS = metrics.gauge("resq_stream_clients", "Connected dashboards")
+_CLIENT_BYTES = metrics.counter("resq_stream_client_bytes_total", "Bytes sent to each dashboard", ("client",))
+_CLIENT_SENT = metrics.counter("resq_stream_client_messages_total", "Messages sent to each dashboard", ("client",))
+_CLIENT_DROPPED = metrics.counter("resq_stream_client_dropped_total", "Frames dropped for each dashboard", ("client",))
+_COALESCED = metrics.counter("resq_stream_frames_coalesced_total", "Frames superseded before the broadcaster ran")
+_published_at = 0.0          # perf_counter() when the latest frame was published
+
+
+def _collect_metrics():
+    """Scrape-time copy of per-client stats into counters and gauges."""
+    clients = [c.stats() for c in list(_clients.values())]
+    _CLIENTS.set(len(clients))
+    _COALESCED.set_total(_frames_coalesced)
+    for metric in (_CLIENT_BYTES, _CLIENT_SENT, _CLIENT_DROPPED):
+        metric.clear()
+    for c in clients:
+        _CLIENT_BYTES.labels(c["address"]).set_total(c["bytes"])
+        _CLIENT_SENT.labels(c["address"]).set_total(c["sent"])
+        _CLIENT_DROPPED.labels(c["address"]).set_total(c["dropped"])
+
+
+metrics.add_collector(_collect_metrics)
 
 # --- AI Detection State (shared with controller) ---
 _ai_status = "idle"          # "idle", "scanning", "detected", "cooldown"
 _victim_detected = False
 _ai_response = ""
+_status_seq = 0              # bumped whenever the AI status actually changes
 
 
 def set_ai_status(status, victim=False, response=""):
     """Called by the controller to update AI status for the dashboard."""
-    global _ai_status, _victim_detected, _ai_response
+    global _ai_status, _victim_detected, _ai_response, _status_seq
+    if (status, victim, response) == (_ai_status, _victim_detected, _ai_response):
+        return
     _ai_status = status
     _victim_detected = victim
     _ai_response = response
+    _status_seq += 1
+    if _ring is not None:
+        _ring.write_status(_ring_status())
+    _notify()
+
+
+def _ring_status():
+    return json.dumps({"ai_status": _ai_status, "victim": _victim_detected, "ai_response": _ai_response}).encode('utf-8')
+
+
+def _notify():
+    """Wake the broadcast loop from any thread (no-op until the server is running)."""
+    loop = _loop
+    if loop is None:
+        return
+    try:
+        loop.call_soon_threadsafe(_wakeup.set)
+    except RuntimeError:
+        pass  # loop already closed
+
+
+def stream_stats():
+    """Counters for the dashboard/logs: frames published/coalesced and per-client stats."""
+    return {
+        "frames": _frame_seq,
+        "frames_coalesced": _frames_coalesced,
+        "encode_ms": round(_encode_ms, 3) if _encode_ms is not None else None,
+        "video": _video.stats() if _video is not None else None,
+        "settings": stream_settings(),
+        "clients": [client.stats() for client in list(_clients.values())],
+    }
+
+
+def _get_tuner():
+    global _tuner
+    if _tuner is None:
+        _tuner = StreamTuner(JPEG_QUALITY, STREAM_EVERY_N_STEPS, max_quality=JPEG_QUALITY)
+    return _tuner
+
+
+def stream_settings():
+    """Current stream encoding settings (fixed constants unless ADAPTIVE_STREAM is on)."""
+    if ADAPTIVE_STREAM:
+        return _get_tuner().settings()
+    return {"adaptive": False, "quality": JPEG_QUALITY, "scale": 1.0, "every_n_steps": STREAM_EVERY_N_STEPS}
+
+
+def _adapt_stream():
+    """Let the tuner react to the slowest client. Returns True if settings changed."""
+    if not ADAPTIVE_STREAM:
+        return False
+    clients = list(_clients.values())
+    if not clients:
+        return False
+    send_ms = max((c.send_ms or 0.0) for c in clients)
+    backlog = max(c.backlog for c in clients)
+    dropped = sum(c.dropped for c in clients)
+    return _get_tuner().update(send_ms, backlog, dropped, _encode_ms)
+
+
+def _status_message(protocol, codec=None):
+    return json.dumps({
+        "type": "status",
+        "protocol": protocol,
+        "codec": codec or "jpeg",
+        "victim": _victim_detected,
+        "ai_status": _ai_status,
+        "ai_response": _ai_response,
+        "stream": stream_settings(),
+    })
+
+
+def _legacy_message():
+    """v1 message: frame + AI status in one JSON document."""
+    quality, scale = _latest_encoding
+    return json.dumps({
+        "frame": stream_b64(_latest_frame, quality, scale),
+        "victim": _victim_detected,
+        "ai_status": _ai_status,
+        "ai_response": _ai_response,
+        "stream": stream_settings(),
+    })
+
+
+def _negotiate(message):
+    """
+    Return (protocol, codec) for a hello message, or None if it is not one.
+    The protocol is capped to what we speak; codec is STREAM_CODEC if the
+    client can decode it and we can encode it, else None (JPEG frames).
+    """
+    if not isinstance(message, str):
+        return None
+    try:
+        data = json.loads(message)
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or data.get("type") != "hello":
+        return None
+    try:
+        requested = int(data.get("protocol", PROTOCOL_JSON))
+    except (TypeError, ValueError):
+        return PROTOCOL_JSON, None
+    protocol = max(PROTOCOL_JSON, min(requested, LATEST_PROTOCOL))
+    codecs = data.get("codecs")
+    if protocol >= PROTOCOL_BINARY and isinstance(codecs, list) and STREAM_CODEC in codecs \
+            and STREAM_CODEC in _video_codecs:
+        return protocol, STREAM_CODEC
+    return protocol, None
 
 
 async def _ws_handler(websocket):
     """Handle new WebSocket connections."""
-    _clients.add(websocket)
+    client = StreamClient(websocket, PROTOCOL_JSON, max_queue=CLIENT_QUEUE_DEPTH)
+    _clients[websocket] = client
+    client.start()
     try:
         print(f"📡 Dashboard connected! ({len(_clients)} client(s))")
-        async for _ in websocket:
-            pass
+        async for message in websocket:
+            hello = _negotiate(message)
+            if hello is None:
+                continue
+            client.protocol, client.codec = hello
+            client.video_index = None
+            if client.protocol >= PROTOCOL_BINARY:
+                client.push_status(_status_message(client.protocol, client.codec))
+                # Late joiners see a frame right away (video: the GOP so far)
+                if client.codec:
+                    _push_video(client)
+                elif _latest_jpeg:
+                    client.push_frame(_latest_jpeg)
     except Exception:
         pass
     finally:
-        _clients.discard(websocket)
+        client.stop()
+        _clients.pop(websocket, None)
         print(f"📡 Dashboard disconnected. ({len(_clients)} client(s))")
 
 
+def _push_video(client):
+    """
+    Queue the newest video frame for a video client. If it would not follow
+    what the client already has (it joined late, a frame was coalesced, or
+    its previous frame is still queued), send the whole GOP instead: its
+    decoder cannot skip a delta frame the way a JPEG viewer skips a JPEG.
+    """
+    video = _video
+    if video is None:
+        return
+    index, message = video.latest()
+    if message is None or index == client.video_index:
+        return
+    if client.video_index != index - 1 or client.pending_frames:
+        index, message = video.catch_up()
+        if message is None:
+            return
+    client.push_frame(message, key="video")  # replaces a queued one
+    client.video_index = index
+
+
+def _broadcast(new_frame, new_status):
+    """Queue one update for every client in its negotiated protocol. Never blocks."""
+    legacy = None
+    for websocket, client in list(_clients.items()):
+        if client.closed:
+            _clients.pop(websocket, None)
+            continue
+        if client.protocol >= PROTOCOL_BINARY:
+            if new_status:
+                client.push_status(_status_message(client.protocol, client.codec))
+            if new_frame:
+                if client.codec:
+                    _push_video(client)
+                elif _latest_jpeg is not None:
+                    client.push_frame(_latest_jpeg)
+        elif client.protocol == PROTOCOL_MJPEG:
+            if new_frame and _latest_jpeg is not None:
+                client.push_frame(_latest_jpeg)
+        elif _latest_frame is not None:
+            if legacy is None:
+                legacy = _legacy_message()
+            client.push_frame(legacy)
+
+
 async def _broadcast_loop():
-    """Continuously broadcast the latest frame + AI status to all clients."""
-    global _latest_frame_b64
-    last_sent = None
+    """Broadcast whenever update_frame() or set_ai_status() signals new data."""
+    global _loop, _wakeup, _frames_coalesced
+    _wakeup = asyncio.Event()
+    _loop = asyncio.get_running_loop()
+    last_frame_seq = _frame_seq
+    last_status_seq = _status_seq
     while True:
+        await _wakeup.wait()
+        _wakeup.clear()
         try:
-            if _latest_frame_b64 and _clients:
-                # Build JSON message with frame + AI status
-                message = json.dumps({
-                    "frame": _latest_frame_b64,
-                    "victim": _victim_detected,
-                    "ai_status": _ai_status,
-                    "ai_response": _ai_response,
-                })
-                
-                if _latest_frame_b64 != last_sent or _victim_detected:
-                    last_sent = _latest_frame_b64
-                    dead = set()
-                    for client in _clients.copy():
-                        try:
-                            await client.send(message)
-                        except Exception:
-                            dead.add(client)
-                    _clients.difference_update(dead)
+            frame_seq, status_seq = _frame_seq, _status_seq
+            new_frame = frame_seq != last_frame_seq
+            new_status = status_seq != last_status_seq
+            if new_frame and frame_seq - last_frame_seq > 1:
+                _frames_coalesced += frame_seq - last_frame_seq - 1
+            last_frame_seq, last_status_seq = frame_seq, status_seq
+            if _adapt_stream():
+                new_status = True  # push the new settings to v2 dashboards
+            if _clients and (new_frame or new_status):
+                _broadcast(new_frame, new_status)
+                if new_frame:
+                    _FANOUT_SECONDS.observe(time.perf_counter() - _published_at)
         except Exception as e:
             print(f"⚠️ Broadcast error: {e}")
-        await asyncio.sleep(0.05)
+
+
+class StreamReadiness:
+    """
+    Handle returned by start_streaming(). Set once dashboards can connect (the
+    WebSocket server is listening, or the hub link is up) or starting failed,
+    so callers wait exactly as long as needed instead of a fixed sleep.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.address = None
+        self.error = None
+
+    @property
+    def ready(self):
+        return self._event.is_set() and self.error is None
+
+    def wait(self, timeout=READY_TIMEOUT):
+        """Block until ready or failed, at most `timeout` seconds. Returns `ready`."""
+        self._event.wait(timeout)
+        return self.ready
+
+    def _set(self, address=None, error=None):
+        self.address = address
+        self.error = error
+        self._event.set()
+
+
+def _signal_ready(address=None, error=None):
+    if _readiness is not None:
+        _readiness._set(address, error)
+
+
+# =============================================
+# PLAIN-HTTP ENDPOINTS (MJPEG + snapshot)
+# =============================================
+
+def _wanted():
+    """True while anyone wants frames encoded: connected viewers or recent snapshot pollers."""
+    return bool(_clients) or time.monotonic() < _snapshot_demand
+
+
+def _jpeg_wanted():
+    """True while anyone needs the JPEG of each frame (not only video viewers)."""
+    return time.monotonic() < _snapshot_demand or any(not c.codec for c in list(_clients.values()))
+
+
+def _etag(seq):
+    return f'"{_BOOT_ID}-{seq}"'
+
+
+async def _serve_snapshot(request, writer):
+    global _snapshot_demand
+    flowing = _wanted()
+    _snapshot_demand = time.monotonic() + SNAPSHOT_DEMAND_SECONDS
+    snapshot = _snapshot
+    if not flowing:
+        # Nobody was watching, so the last frame may be old: give the controller a moment to publish one
+        deadline = time.perf_counter() + SNAPSHOT_WAIT
+        while (snapshot is None or time.perf_counter() - snapshot[2] > SNAPSHOT_MAX_AGE) \
+                and time.perf_counter() < deadline:
+            await asyncio.sleep(0.02)
+            snapshot = _snapshot
+    if snapshot is None:
+        writer.write(response_head(503, [("Retry-After", "1"), ("Content-Length", "0")], request.keep_alive))
+        return
+    seq, jpeg, _ = snapshot
+    etag = _etag(seq)
+    headers = [("ETag", etag), ("Cache-Control", "no-cache")]
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        writer.write(response_head(304, headers, request.keep_alive))
+        return
+    headers += [("Content-Type", "image/jpeg"), ("Content-Length", str(len(jpeg)))]
+    writer.write(response_head(200, headers, request.keep_alive))
+    if request.method != "HEAD":
+        writer.write(jpeg)
+    await writer.drain()
+
+
+async def _serve_mjpeg(request, reader, writer):
+    writer.write(response_head(200, MJPEG_HEAD))
+    if request.method == "HEAD":
+        return
+    viewer = MjpegViewer(writer)
+    client = StreamClient(viewer, PROTOCOL_MJPEG, max_queue=CLIENT_QUEUE_DEPTH)
+    _clients[viewer] = client
+    client.start()
+    snapshot = _snapshot
+    # Late joiners see a frame right away, unless it is the one they already have
+    if snapshot and not etag_matches(request.headers.get("if-none-match"), _etag(snapshot[0])):
+        client.push_frame(snapshot[1])
+    print(f"📺 MJPEG viewer connected ({len(_clients)} client(s))")
+    try:
+        while not client.closed:
+            try:
+                if not await asyncio.wait_for(reader.read(1024), 1.0):
+                    break  # viewer hung up
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        client.stop()
+        _clients.pop(viewer, None)
+        print(f"📺 MJPEG viewer disconnected ({len(_clients)} client(s))")
+
+
+async def _http_handler(reader, writer):
+    """One HTTP connection: snapshots (keep-alive) or one MJPEG stream."""
+    try:
+        while True:
+            request = await read_request(reader)
+            if request is None:
+                break
+            if request.method not in ("GET", "HEAD"):
+                writer.write(response_head(405, [("Allow", "GET, HEAD"), ("Content-Length", "0")]))
+                break
+            if request.path == "/snapshot.jpg":
+                await _serve_snapshot(request, writer)
+            elif request.path in ("/stream.mjpg", "/mjpeg"):
+                await _serve_mjpeg(request, reader, writer)
+                break
+            else:
+                writer.write(response_head(404, [("Content-Length", "0")], request.keep_alive))
+            if not request.keep_alive:
+                break
+        await writer.drain()
+    except Exception:
+        pass
+    finally:
+        writer.close()
+
+
+async def _start_http_server():
+    if not HTTP_PORT:
+        return None
+    try:
+        server = await asyncio.start_server(_http_handler, "0.0.0.0", HTTP_PORT)
+    except OSError as e:
+        print(f"⚠️ MJPEG/snapshot endpoints not started on port {HTTP_PORT}: {e}")
+        return None
+    print(f"📺 MJPEG at http://localhost:{HTTP_PORT}/stream.mjpg, snapshot at /snapshot.jpg")
+    return server
+
+
+def _warm_up_encoder():
+    """
+    Load the JPEG (and video) encoder here, before the first viewer, rather than on the control thread.
+    Runs once: when the server falls back to the legacy API it may already have run.
+    """
+    global _video_codecs, _encoder_warm
+    if _encoder_warm:
+        return
+    _encoder_warm = True
+    try:
+        import PIL.Image
+        PIL.Image.preinit()  # the JPEG plugin
+    except Exception as e:
+        print(f"⚠️ Could not preload the JPEG encoder: {e}")
+    if STREAM_CODEC != "jpeg":
+        from video_stream import available_codecs
+        _video_codecs = tuple(available_codecs())
+        if STREAM_CODEC in _video_codecs:
+            print(f"🎞️ {STREAM_CODEC} video offered to dashboards that can decode it")
+        else:
+            print(f"⚠️ {STREAM_CODEC} video unavailable (pip install av); streaming JPEG only")
 
 
 async def _run_server():
     """Start WebSocket server and broadcast loop."""
+    # Imported here, on the server thread, so the controller's first step doesn't wait for it
     try:
         from websockets.asyncio.server import serve
     except ImportError:
@@ -90,6 +534,7 @@ async def _run_server():
             serve = websockets.serve
         except ImportError:
             print("❌ 'websockets' not installed! Run: pip install websockets")
+            _signal_ready(error="websockets not installed")
             return
 
     print(f"🌐 Starting camera stream on ws://localhost:{WS_PORT} ...")
@@ -97,6 +542,9 @@ async def _run_server():
     try:
         async with serve(_ws_handler, "0.0.0.0", WS_PORT) as server:
             print(f"✅ Camera stream server READY on ws://localhost:{WS_PORT}")
+            _signal_ready(("0.0.0.0", WS_PORT))
+            _warm_up_encoder()
+            await _start_http_server()
             await _broadcast_loop()
     except Exception as e:
         print(f"⚠️ Trying legacy websockets API... ({e})")
@@ -104,59 +552,310 @@ async def _run_server():
             import websockets
             server = await websockets.serve(_ws_handler, "0.0.0.0", WS_PORT)
             print(f"✅ Camera stream server READY on ws://localhost:{WS_PORT}")
+            _signal_ready(("0.0.0.0", WS_PORT))
+            _warm_up_encoder()
+            await _start_http_server()
             await _broadcast_loop()
         except Exception as e2:
             print(f"❌ WebSocket server failed to start: {e2}")
+            _signal_ready(error=str(e2))
+
+
+class _HubLink:
+    """Looks like a v2 WebSocket client to the fan-out, but writes to the hub's TCP socket."""
+
+    def __init__(self, writer, robot_id, address):
+        self._writer = writer
+        self._robot_id = robot_id
+        self.remote_address = address
+
+    async def send(self, message):
+        if isinstance(message, str):
+            record = pack_message(MSG_STATUS, self._robot_id, message.encode('utf-8'))
+        else:
+            record = pack_message(MSG_FRAME, self._robot_id, message)
+        self._writer.write(record)
+        await self._writer.drain()
+
+
+async def _run_hub_link():
+    """Publish frames + status to a stream hub, reconnecting when it goes away."""
+    host, _, port = HUB_ADDRESS.rpartition(":")
+    host, port = host or "127.0.0.1", int(port)
+    broadcaster = asyncio.ensure_future(_broadcast_loop())
+    await asyncio.sleep(0)  # let the broadcast loop set up _loop/_wakeup
+    while not broadcaster.done():
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+        except OSError as e:
+            print(f"⚠️ Stream hub {host}:{port} unreachable ({e}), retrying...")
+            await asyncio.sleep(HUB_RECONNECT_DELAY)
+            continue
+
+        link = _HubLink(writer, ROBOT_ID, (host, port))
+        client = StreamClient(link, PROTOCOL_BINARY, max_queue=CLIENT_QUEUE_DEPTH)
+        _clients[link] = client
+        client.start()
+        client.push_status(_status_message(PROTOCOL_BINARY))
+        if _latest_jpeg:
+            client.push_frame(_latest_jpeg)
+        print(f"✅ Publishing '{ROBOT_ID}' to stream hub at {host}:{port}")
+        _signal_ready((host, port))
+        try:
+            await reader.read()  # the hub never sends; returns on disconnect
+        except Exception:
+            pass
+        finally:
+            client.stop()
+            _clients.pop(link, None)
+            writer.close()
+        print(f"⚠️ Lost connection to stream hub, reconnecting...")
+        await asyncio.sleep(HUB_RECONNECT_DELAY)
 
 
 def _start_ws_thread():
-    """Run the WebSocket server in a background thread."""
+    """Run the WebSocket server (or the hub publisher) in a background thread."""
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
     try:
-        loop.run_until_complete(_run_server())
+        loop.run_until_complete(_run_hub_link() if HUB_ADDRESS else _run_server())
     except Exception as e:
         print(f"❌ Camera stream thread error: {e}")
+        _signal_ready(error=str(e))
 
 
-def start_streaming():
-    """Call this once at the start of your controller."""
-    global _server_started
+def start_streaming(robot_id=None):
+    """
+    Call this once at the start of your controller. Returns at once with a
+    StreamReadiness; the server comes up in the background, and frames
+    published before then are simply not sent to anyone.
+    `robot_id` names this robot on a stream hub (RESQ_ROBOT_ID takes precedence).
+    With RESQ_STREAM_PROCESS=1 the server lives in a child process started
+    with the first frame, and the handle is set once the child is listening.
+    """
+    global _server_started, _readiness, ROBOT_ID
     if _server_started:
-        return
+        return _readiness
     _server_started = True
+    _readiness = StreamReadiness()
+    if robot_id and "RESQ_ROBOT_ID" not in os.environ:
+        ROBOT_ID = robot_id
+
+    if not STREAM_ENABLED:
+        print("🎥 Camera streamer off (RESQ_STREAM=0)")
+        _signal_ready(error="streaming disabled")
+        return _readiness
 
-    ws_thread = threading.Thread(target=_start_ws_thread, daemon=True)
+    if STREAM_PROCESS:
+        print("🎥 Camera streamer will run in its own process (starts with the first frame)")
+        return _readiness
+
+    ws_thread = threading.Thread(target=_start_ws_thread, name="resq-stream", daemon=True)
     ws_thread.start()
-    print("🎥 Camera streamer initialized - waiting for server to start...")
-    time.sleep(1)
+    print("🎥 Camera streamer starting in the background")
+    return _readiness
+
+
+def _stream_params():
+    """(quality, scale, every_n_steps) to use for the next frame."""
+    if ADAPTIVE_STREAM:
+        tuner = _get_tuner()
+        return tuner.quality, tuner.scale, tuner.every_n
+    return JPEG_QUALITY, 1.0, STREAM_EVERY_N_STEPS
+
+
+def _video_encoder(frame):
+    """The VideoEncoder for this frame size, or None if video can't be encoded (viewers fall back to JPEG)."""
+    global _video, _video_codecs
+    if _video is not None and (_video.width, _video.height) == (frame.width, frame.height):
+        return _video
+    try:
+        from video_stream import VideoEncoder
+        _video = VideoEncoder(STREAM_CODEC, frame.width, frame.height, VIDEO_FPS)
+    except Exception as e:
+        print(f"⚠️ {STREAM_CODEC} encoder unavailable ({e}); streaming JPEG only")
+        _video, _video_codecs = None, ()
+        for client in list(_clients.values()):
+            client.codec = None
+        return None
+    return _video
+
+
+def _publish_frame(frame, quality, scale):
+    """Encode a frame once per format someone is watching in, and wake the broadcaster."""
+    global _latest_frame, _latest_jpeg, _latest_encoding, _encode_ms, _frame_seq, _published_at, _snapshot
+    seq = _frame_seq + 1
+    start = time.perf_counter()
+    if any(c.codec for c in list(_clients.values())):
+        video = _video_encoder(frame)
+        if video is not None:
+            video.encode(frame, seq)
+            _VIDEO_ENCODE_SECONDS.observe(time.perf_counter() - start)
+    jpeg = None
+    if _jpeg_wanted():
+        jpeg_start = time.perf_counter()
+        jpeg = stream_jpeg(frame, quality, scale)
+        _ENCODE_SECONDS.observe(time.perf_counter() - jpeg_start)
+    _published_at = time.perf_counter()
+    _FRAMES_TOTAL.inc()
+    elapsed = (_published_at - start) * 1000.0
+    _encode_ms = elapsed if _encode_ms is None else 0.8 * _encode_ms + 0.2 * elapsed
+    _latest_jpeg = jpeg
+    _latest_encoding = (quality, scale)
+    _latest_frame = frame
+    _frame_seq = seq
+    if jpeg is not None:
+        _snapshot = (seq, jpeg, _published_at)
+    _notify()
 
 
-def update_frame(camera):
-    """Call this every timestep in your main loop."""
-    global _latest_frame_b64, _step_count
+def update_frame(camera, frame=None):
+    """
+    Call this every timestep in your main loop.
+    Pass the step's `frame_buffer.Frame` to reuse it; otherwise the camera is read here.
+    """
+    global _step_count
+
+    if not STREAM_ENABLED:
+        return
+
+    if STREAM_PROCESS:
+        _write_ring(camera, frame)
+        return
+
+    quality, scale, every_n = _stream_params()
 
     _step_count += 1
-    if _step_count % STREAM_EVERY_N_STEPS != 0:
+    if _step_count % every_n != 0:
         return
 
-    if not _clients:
+    if not _wanted():
         return
 
     try:
-        image_data = camera.getImage()
-        if not image_data:
+        if frame is None:
+            frame = capture_frame(camera)
+        if frame is None:
             return
+        _publish_frame(frame, quality, scale)
 
-        width = camera.getWidth()
-        height = camera.getHeight()
+    except Exception as e:
+        print(f"⚠️ Frame capture error: {e}")
 
-        img = PIL.Image.frombytes('RGBA', (width, height), image_data)
-        img = img.convert('RGB')
 
-        buffer = io.BytesIO()
-        img.save(buffer, format='JPEG', quality=JPEG_QUALITY)
-        _latest_frame_b64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+# =============================================
+# OUT-OF-PROCESS STREAMING (shared-memory ring)
+# =============================================
 
+def _write_ring(camera, frame):
+    """Controller side: one memcpy of the raw frame into shared memory."""
+    try:
+        if frame is None:
+            frame = capture_frame(camera)
+        if frame is None:
+            return
+        if _ring is None:
+            _start_stream_process(len(frame.data))
+        if _ring.viewers:
+            _ring.write(frame.data, frame.width, frame.height)
     except Exception as e:
-        print(f"⚠️ Frame capture error: {e}")
+        print(f"⚠️ Frame ring error: {e}")
+
+
+def _start_stream_process(frame_bytes):
+    global _ring, _ring_process
+    from frame_ring import FrameRing  # multiprocessing.shared_memory is only needed in this mode
+    _ring = FrameRing.create(frame_bytes)
+    _ring.write_status(_ring_status())
+    # The child reports on this pipe once it is listening (or failed), which sets our StreamReadiness
+    ready_read, ready_write = os.pipe()
+    try:
+        _ring_process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--ring", _ring.name, "--robot-id", ROBOT_ID,
+             "--ready-fd", str(ready_write)],
+            pass_fds=(ready_write,),
+        )
+    except Exception:
+        os.close(ready_read)
+        raise
+    finally:
+        os.close(ready_write)
+    threading.Thread(target=_await_stream_process, args=(ready_read,), name="resq-stream-ready",
+                     daemon=True).start()
+    atexit.register(_stop_stream_process)
+    print(f"🎥 Camera streamer process started (pid {_ring_process.pid}, ring {_ring.name})")
+
+
+def _await_stream_process(ready_fd):
+    """Controller side: pass the child's readiness report on to our StreamReadiness."""
+    with os.fdopen(ready_fd, "r") as pipe:
+        line = pipe.readline()
+    if not line:
+        _signal_ready(error="camera streamer process exited before it was ready")
+        return
+    report = json.loads(line)
+    address = report["address"]
+    _signal_ready(tuple(address) if address else None, report["error"])
+
+
+def _report_ready(ready_fd):
+    """Streamer process: once the server is listening (or failed), tell the controller."""
+    _readiness.wait(None)
+    with os.fdopen(ready_fd, "w") as pipe:
+        pipe.write(json.dumps({"address": _readiness.address, "error": _readiness.error}) + "\n")
+
+
+def _stop_stream_process():
+    global _ring
+    if _ring is not None:
+        _ring.close()
+        _ring = None
+    if _ring_process is not None and _ring_process.poll() is None:
+        _ring_process.terminate()
+
+
+def _serve_from_ring(ring_name, ready_fd=None):
+    """Streamer process: read frames from the ring, encode and serve them."""
+    global _readiness
+    from frame_ring import FrameRing
+    ring = FrameRing.attach(ring_name)
+    _readiness = StreamReadiness()
+    if ready_fd is not None:
+        threading.Thread(target=_report_ready, args=(ready_fd,), daemon=True).start()
+    parent = os.getppid()
+    if METRICS_PORT:
+        metrics.start_http_server(METRICS_PORT + 1)   # the controller serves METRICS_PORT
+    threading.Thread(target=_start_ws_thread, daemon=True).start()
+
+    last_seq = last_published = 0
+    while not ring.closed and os.getppid() == parent:
+        ring.set_viewers(max(len(_clients), int(_wanted())))  # snapshot pollers count too
+        status = ring.read_status()
+        if status:
+            data = json.loads(status)
+            set_ai_status(data["ai_status"], victim=data["victim"], response=data["ai_response"])
+
+        frame = ring.read_latest(last_seq)
+        if frame is None:
+            time.sleep(RING_POLL_INTERVAL)
+            continue
+        last_seq = frame.seq
+        quality, scale, every_n = _stream_params()
+        if _wanted() and frame.seq - last_published >= every_n:
+            last_published = frame.seq
+            try:
+                _publish_frame(frame, quality, scale)
+            except Exception as e:
+                print(f"⚠️ Frame encode error: {e}")
+    print("🎥 Controller gone, camera streamer process exiting")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="ResQ camera streamer process (started by the controller)")
+    parser.add_argument("--ring", required=True, help="shared-memory frame ring name")
+    parser.add_argument("--robot-id", default=ROBOT_ID)
+    parser.add_argument("--ready-fd", type=int, default=None, help="pipe to report readiness on")
+    args = parser.parse_args()
+    ROBOT_ID = args.robot_id
+    _serve_from_ring(args.ring, args.ready_fd)
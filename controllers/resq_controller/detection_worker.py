@@ -0,0 +1,183 @@
+"""
+ResQ Detection Worker
+=====================
+Runs victim detection off the Webots control loop.
+
+The controller submits frames into a small bounded queue and keeps stepping.
+A background thread runs inference on them and hands verdicts back, either
+through a callback or by the controller polling once per step.
+"""
+
+import queue
+import re
+import threading
+import time
+
+# --- Configuration ---
+MAX_PENDING_FRAMES = 1       # Frames waiting for inference (oldest dropped)
+
+
+class DetectionResult:
+    """
+    One finished inference: what was analyzed, the verdict, and timing.
+    `verdict` is whatever analyze_fn returned (e.g. a detectors.Verdict);
+    `victim` is its truth value.
+    """
+
+    __slots__ = ("frame", "victim", "verdict", "error", "submitted_at", "finished_at")
+
+    def __init__(self, frame, verdict, error, submitted_at, finished_at):
+        self.frame = frame
+        self.victim = bool(verdict)
+        self.verdict = verdict
+        self.error = error
+        self.submitted_at = submitted_at
+        self.finished_at = finished_at
+
+    @property
+    def latency(self):
+        return self.finished_at - self.submitted_at
+
+
+class DetectionWorker:
+    """Background thread that runs `analyze_fn(frame)` on queued frames."""
+
+    def __init__(self, analyze_fn, max_pending=MAX_PENDING_FRAMES, on_result=None, name="resq-detector"):
+        self._analyze_fn = analyze_fn
+        self.name = name
+        self._on_result = on_result
+        self._frames = queue.Queue(maxsize=max_pending)
+        self._results = queue.Queue()
+        self._lock = threading.Lock()
+        self._in_flight = 0           # submitted and neither finished nor dropped
+        self._stop = threading.Event()
+        self._thread = None
+        self.submitted = 0
+        self.dropped = 0
+        self.completed = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._stop.set()
+        try:
+            self._frames.put_nowait(None)
+        except queue.Full:
+            pass
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def busy(self):
+        """True while a frame is queued or being analyzed."""
+        return self._in_flight > 0
+
+    def submit(self, frame, **options):
+        """
+        Queue a frame without blocking. The oldest pending frame is dropped if full.
+        `options` are passed through as keyword arguments to analyze_fn.
+        """
+        item = (frame, options, time.perf_counter())
+        # Counted before it is queued, so the worker can never finish it first and leave us busy
+        with self._lock:
+            self._in_flight += 1
+        while True:
+            try:
+                self._frames.put_nowait(item)
+                self.submitted += 1
+                return
+            except queue.Full:
+                try:
+                    self._frames.get_nowait()
+                except queue.Empty:
+                    continue
+                self.dropped += 1
+                with self._lock:
+                    self._in_flight -= 1
+
+    def poll(self):
+        """Return every result finished since the last poll (never blocks)."""
+        done = []
+        while True:
+            try:
+                done.append(self._results.get_nowait())
+            except queue.Empty:
+                return done
+
+    def _run(self):
+        while not self._stop.is_set():
+            item = self._frames.get()
+            if item is None:
+                break
+            frame, options, submitted_at = item
+            verdict, error = False, None
+            try:
+                verdict = self._analyze_fn(frame, **options)
+            except Exception as e:
+                error = e
+            result = DetectionResult(frame, verdict, error, submitted_at, time.perf_counter())
+            self.completed += 1
+            self._results.put(result)
+            with self._lock:
+                self._in_flight -= 1
+            if self._on_result is not None:
+                try:
+                    self._on_result(result)
+                except Exception as e:
+                    print(f"⚠️ Detection callback error: {e}")
+
+
+# =============================================
+# TEST MODE: fake model (no network)
+# =============================================
+
+class _FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class _FakeModels:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def generate_content(self, model, contents, **kwargs):
+        owner = self._owner
+        owner.calls += 1
+        time.sleep(owner.delay)
+        batch = re.search(r"(\d+) numbered", contents[0]) if contents and isinstance(contents[0], str) else None
+        if batch:
+            return _FakeResponse(owner.batch_answer_for(owner.calls, int(batch.group(1))))
+        return _FakeResponse(owner.answer_for(owner.calls))
+
+
+class FakeClient:
+    """
+    Stand-in for `genai.Client` that sleeps `delay` seconds per call.
+    Answers "NO" until `victim_after` calls have been made (0 = never).
+    Batch prompts ("<n> numbered images/tiles") get one "<i>: YES/NO" line
+    per frame; on a victim call only the last frame is a YES.
+    """
+
+    def __init__(self, delay=2.0, victim_after=0):
+        self.delay = delay
+        self.victim_after = victim_after
+        self.calls = 0
+        self.models = _FakeModels(self)
+
+    def answer_for(self, call_number):
+        if self.victim_after and call_number >= self.victim_after:
+            return "YES - fake model reports a person in view."
+        return "NO - fake model sees no person."
+
+    def batch_answer_for(self, call_number, count):
+        victim = bool(self.victim_after and call_number >= self.victim_after)
+        return "\n".join(
+            f"{i}: YES - fake model reports a person in view." if victim and i == count
+            else f"{i}: NO - fake model sees no person."
+            for i in range(1, count + 1)
+        )
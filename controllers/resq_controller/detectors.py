@@ -0,0 +1,224 @@
+"""
+ResQ Victim Detectors
+=====================
+Pluggable person detectors behind one interface: `detect(frame) -> Verdict`.
+GeminiDetector can also judge several frames in one request
+(`detect_batch(frames) -> [Verdict, ...]`), either as separate images or
+tiled into one numbered mosaic.
+
+    GeminiDetector     - cloud VLM (accurate, slow, rate limited)
+    HogPersonDetector  - OpenCV HOG people detector (CPU only, cheap)
+
+The controller screens frames with a local detector and only escalates
+candidate frames to Gemini for confirmation. New local backends go in
+LOCAL_DETECTORS.
+"""
+
+import io
+import math
+import re
+
+from frame_encoder import DETECTOR_JPEG_QUALITY, DETECTOR_MAX_SIZE, detector_jpeg, rgb_image
+
+# --- Configuration ---
+HOG_WIDTH = 320                 # Frames are downscaled to this width before HOG
+HOG_SCORE_THRESHOLD = 0.5       # SVM score above which a window counts as a person
+
+GEMINI_PROMPT = (
+    "You are a rescue robot's vision system. "
+    "Look carefully at this image. "
+    "Is there ANY person or human figure visible ANYWHERE in the image? "
+    "This includes standing, sitting, lying down, partially hidden, or far away. "
+    "Even a small figure of a person counts. "
+    "Answer with ONLY 'YES' or 'NO', then a brief reason."
+)
+
+BATCH_MODE_MULTI = "multi"      # one request, N separate images
+BATCH_MODE_MOSAIC = "mosaic"    # one request, N frames tiled into one image
+
+GEMINI_BATCH_PROMPTS = {
+    BATCH_MODE_MULTI: (
+        "You are a rescue robot's vision system. "
+        "You will see {n} numbered images from the robot's camera, taken from different headings. "
+        "For EACH image, is there ANY person or human figure visible ANYWHERE in it? "
+        "This includes standing, sitting, lying down, partially hidden, or far away. "
+        "Answer with exactly one line per image, in order, formatted as "
+        "'<number>: YES' or '<number>: NO', then a brief reason."
+    ),
+    BATCH_MODE_MOSAIC: (
+        "You are a rescue robot's vision system. "
+        "This picture is a grid of {n} numbered camera views (numbered in the top-left corner "
+        "of each tile, left to right, top to bottom), taken from different headings. "
+        "For EACH tile, is there ANY person or human figure visible ANYWHERE in it? "
+        "This includes standing, sitting, lying down, partially hidden, or far away. "
+        "Answer with exactly one line per tile, in order, formatted as "
+        "'<number>: YES' or '<number>: NO', then a brief reason."
+    ),
+}
+
+_BATCH_LINE = re.compile(r"^\W*(?:image|tile|view)?\s*#?(\d+)\s*[:.)\-]\s*\**\s*(YES|NO)\b", re.I)
+
+
+class Verdict:
+    """Result of one detection. Truthy when a victim/candidate was found."""
+
+    __slots__ = ("victim", "score", "source", "text")
+
+    def __init__(self, victim, score, source, text=""):
+        self.victim = victim
+        self.score = score
+        self.source = source
+        self.text = text
+
+    def __bool__(self):
+        return self.victim
+
+    def __repr__(self):
+        return f"Verdict({self.source}: victim={self.victim}, score={self.score:.2f})"
+
+
+class Detector:
+    """Base class: subclasses set `name` and implement detect()."""
+
+    name = "detector"
+
+    def detect(self, frame):
+        raise NotImplementedError
+
+
+class GeminiDetector(Detector):
+    """Asks the Gemini VLM whether a person is visible. Raises on API errors."""
+
+    name = "gemini"
+
+    def __init__(self, client, model, prompt=GEMINI_PROMPT):
+        self.client = client
+        self.model = model
+        self.prompt = prompt
+
+    def detect(self, frame):
+        response = self.client.models.generate_content(
+            model=self.model,
+            contents=[self.prompt, _image_part(detector_jpeg(frame))]
+        )
+        text = (response.text or "").strip()
+        victim = "YES" in text.upper()
+        return Verdict(victim, 1.0 if victim else 0.0, self.name, text)
+
+    def detect_batch(self, frames, mode=BATCH_MODE_MULTI):
+        """
+        Judge several frames in one request. Returns one Verdict per frame;
+        frames the model gave no answer for come back as None.
+        """
+        if len(frames) == 1:
+            return [self.detect(frames[0])]
+        prompt = GEMINI_BATCH_PROMPTS[mode].format(n=len(frames))
+        if mode == BATCH_MODE_MOSAIC:
+            contents = [prompt, _image_part(mosaic_jpeg(frames))]
+        else:
+            contents = [prompt]
+            for i, frame in enumerate(frames, 1):
+                contents += [f"Image {i}:", _image_part(detector_jpeg(frame))]
+        response = self.client.models.generate_content(model=self.model, contents=contents)
+        return parse_batch_answer(response.text or "", len(frames), self.name)
+
+
+class HogPersonDetector(Detector):
+    """OpenCV's default HOG + linear SVM pedestrian detector. Requires opencv-python < 5."""
+
+    name = "hog"
+
+    def __init__(self, width=HOG_WIDTH, threshold=HOG_SCORE_THRESHOLD):
+        import cv2
+        import numpy as np
+        if not hasattr(cv2, "HOGDescriptor"):   # moved out of the main package in OpenCV 5
+            raise ImportError(f"OpenCV {cv2.__version__} has no HOGDescriptor (install opencv-python-headless<5)")
+        self._np = np
+        self._hog = cv2.HOGDescriptor()
+        self._hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+        self.width = width
+        self.threshold = threshold
+
+    def detect(self, frame):
+        import PIL.Image
+        gray = rgb_image(frame).convert('L')
+        if gray.width > self.width:
+            gray = gray.resize((self.width, max(1, gray.height * self.width // gray.width)), PIL.Image.BILINEAR)
+        # detectMultiScale crashes the process on images smaller than one detection window,
+        # so small frames (64x48, 80x60, ...) are upscaled until the window fits
+        win_w, win_h = self._hog.winSize
+        if gray.width < win_w or gray.height < win_h:
+            scale = max(win_w / gray.width, win_h / gray.height)
+            size = (max(win_w, math.ceil(gray.width * scale)), max(win_h, math.ceil(gray.height * scale)))
+            gray = gray.resize(size, PIL.Image.BILINEAR)
+        rects, weights = self._hog.detectMultiScale(
+            self._np.asarray(gray), winStride=(8, 8), padding=(8, 8), scale=1.05
+        )
+        score = float(max(weights)) if len(weights) else 0.0
+        return Verdict(score >= self.threshold, score, self.name,
+                       f"{len(rects)} person window(s), best score {score:.2f}")
+
+
+def parse_batch_answer(text, count, source="gemini"):
+    """Parse '<n>: YES/NO reason' lines into a list of `count` Verdicts (None = unanswered)."""
+    verdicts = [None] * count
+    for line in text.splitlines():
+        match = _BATCH_LINE.match(line.strip())
+        if not match:
+            continue
+        index = int(match.group(1)) - 1
+        if 0 <= index < count and verdicts[index] is None:
+            victim = match.group(2).upper() == "YES"
+            verdicts[index] = Verdict(victim, 1.0 if victim else 0.0, source, line.strip())
+    return verdicts
+
+
+def mosaic_jpeg(frames, max_size=DETECTOR_MAX_SIZE, quality=DETECTOR_JPEG_QUALITY):
+    """Tile frames into one numbered grid image that fits `max_size`."""
+    import PIL.Image
+    import PIL.ImageDraw
+    cols = math.ceil(math.sqrt(len(frames)))
+    rows = math.ceil(len(frames) / cols)
+    first = rgb_image(frames[0])
+    scale = min(max_size[0] / (cols * first.width), max_size[1] / (rows * first.height), 1.0)
+    tile_w, tile_h = max(1, int(first.width * scale)), max(1, int(first.height * scale))
+    mosaic = PIL.Image.new('RGB', (cols * tile_w, rows * tile_h))
+    draw = PIL.ImageDraw.Draw(mosaic)
+    for i, frame in enumerate(frames):
+        x, y = (i % cols) * tile_w, (i // cols) * tile_h
+        mosaic.paste(rgb_image(frame).resize((tile_w, tile_h), PIL.Image.BILINEAR), (x, y))
+        draw.rectangle((x, y, x + 22, y + 14), fill=(0, 0, 0))
+        draw.text((x + 4, y + 2), str(i + 1), fill=(255, 255, 0))
+        draw.rectangle((x, y, x + tile_w - 1, y + tile_h - 1), outline=(255, 255, 255))
+    out = io.BytesIO()
+    mosaic.save(out, format='JPEG', quality=quality)
+    return out.getvalue()
+
+
+LOCAL_DETECTORS = {
+    "hog": HogPersonDetector,
+}
+
+
+def create_local_detector(name):
+    """Build the named local detector, or None if disabled/unavailable."""
+    if not name:
+        return None
+    factory = LOCAL_DETECTORS.get(name)
+    if factory is None:
+        print(f"⚠️ Unknown local detector '{name}' (choices: {', '.join(LOCAL_DETECTORS)})")
+        return None
+    try:
+        return factory()
+    except ImportError as e:
+        print(f"⚠️ Local detector '{name}' unavailable ({e}) - using Gemini scans only")
+        return None
+
+
+def _image_part(jpeg):
+    """Wrap JPEG bytes for generate_content (plain bytes when the SDK isn't installed, e.g. tests)."""
+    try:
+        from google.genai import types
+    except ImportError:
+        return jpeg
+    return types.Part.from_bytes(data=jpeg, mime_type="image/jpeg")
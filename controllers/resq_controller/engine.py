@@ -0,0 +1,365 @@
+"""
+ResQ Controller Engine
+======================
+The per-step logic of the patrol robot, independent of Webots:
+
+    ResQController  - step(sensor_values, frame, wheel_travel) -> (left, right) wheel velocities.
+                      Navigation state machine (patrol / avoid / reverse / spin)
+                      plus victim handling; all mutable state is in a
+                      ControllerState, so any number of controllers can run side
+                      by side in one process.
+    ScanPlanner     - decides which frames go to the detection workers each step
+                      (local screening, candidate confirmation, routine and early
+                      Gemini scans). Optional: a headless controller has none.
+    NavConfig       - the tunable navigation parameters.
+
+With an exploration.FrontierExplorer the patrol steers toward unexplored
+space and recovery spins turn toward it; without one the patrol wanders at
+random as before.
+
+resq_controller.py wires these to the robot's devices; sim_world.py drives a
+controller headless against a simulated sonar at thousands of steps per second.
+"""
+
+import random
+import time
+from collections import deque
+
+import metrics
+from api_scheduler import PRIORITY_CONFIRM, PRIORITY_EARLY
+from sonar import CLOSE_THRESHOLD, OBSTACLE_THRESHOLD, SonarProcessor
+
+# --- Navigation configuration ---
+TIME_STEP = 64
+MAX_SPEED = 6.28
+PATROL_SPEED = 0.5
+SONAR_SMOOTHING = 0.0   # 0 = raw readings; e.g. 0.5 = EMA that damps sonar spikes
+AVOID_STUCK_LIMIT = 50
+REVERSE_DURATION = 25
+SPIN_DURATION = 30
+REPORT_EVERY_N_STEPS = 500
+
+# --- Scan configuration ---
+API_CALL_INTERVAL = 120               # Steps between routine Gemini scans (~8 seconds)
+LOCAL_SCREEN_EVERY_N_STEPS = 2        # Screen every other frame (~8 Hz)
+FALLBACK_SCAN_INTERVAL = API_CALL_INTERVAL * 10   # Routine Gemini scans when screening locally
+CANDIDATE_MIN_INTERVAL = 60           # Min steps between escalated candidates
+CANDIDATE_MAX_AGE = 10.0              # Seconds a candidate may wait for Gemini before it's stale
+GATE_CHECK_EVERY_N_STEPS = 8          # How often to hash the view looking for big changes
+EARLY_SCAN_MIN_INTERVAL = 60          # Min steps between Gemini scans triggered by scene change
+
+# --- Navigation states ---
+STATE_PATROL = 0
+STATE_AVOID = 1
+STATE_REVERSE = 2
+STATE_SPIN = 3
+STATE_NAMES = ['PATROL', 'AVOID', 'REVERSE', 'SPIN']
+
+STATE_DWELL_SECONDS = metrics.histogram(
+    "resq_state_dwell_seconds", "Time spent in a navigation state before leaving it", metrics.DWELL_BUCKETS, ("state",))
+
+
+def _quiet(*args, **kwargs):
+    pass
+
+
+class NavConfig:
+    """
+    Navigation parameters; keyword overrides, e.g. NavConfig(obstacle_threshold=120).
+    Sonar thresholds left at None are the patrol mode's own: the explorer's
+    (exploration.py) when there is one, sonar.py's otherwise.
+    """
+
+    __slots__ = (
+        "max_speed", "patrol_speed", "obstacle_threshold", "close_threshold", "sonar_smoothing",
+        "avoid_stuck_limit", "reverse_duration", "spin_duration",
+    )
+
+    def __init__(self, max_speed=MAX_SPEED, patrol_speed=PATROL_SPEED, obstacle_threshold=None,
+                 close_threshold=None, sonar_smoothing=SONAR_SMOOTHING,
+                 avoid_stuck_limit=AVOID_STUCK_LIMIT, reverse_duration=REVERSE_DURATION,
+                 spin_duration=SPIN_DURATION):
+        self.max_speed = max_speed
+        self.patrol_speed = patrol_speed
+        self.obstacle_threshold = obstacle_threshold
+        self.close_threshold = close_threshold
+        self.sonar_smoothing = sonar_smoothing
+        self.avoid_stuck_limit = avoid_stuck_limit
+        self.reverse_duration = reverse_duration
+        self.spin_duration = spin_duration
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ControllerState:
+    """Everything that changes from step to step."""
+
+    __slots__ = (
+        "step", "state", "state_timer", "avoid_counter", "spin_direction", "spin_retry_count",
+        "victim_found", "left", "right", "dwell_state", "dwell_since",
+    )
+
+    def __init__(self):
+        self.step = 0
+        self.state = STATE_PATROL
+        self.state_timer = 0
+        self.avoid_counter = 0
+        self.spin_direction = 1
+        self.spin_retry_count = 0
+        self.victim_found = False
+        self.left = 0.0
+        self.right = 0.0
+        self.dwell_state = STATE_PATROL
+        self.dwell_since = time.perf_counter()
+
+
+class ScanPlanner:
+    """
+    The AI side of the loop: polls the detection workers and submits frames to
+    them. `scheduler` and `frame_gate` are the ApiScheduler and FrameGate the
+    detector's analyze function uses.
+    """
+
+    def __init__(self, detector, scheduler, frame_gate, screener=None, scan_interval=None,
+                 batch_size=1, snapshot=None, log=print):
+        self.detector = detector
+        self.scheduler = scheduler
+        self.frame_gate = frame_gate
+        self.screener = screener
+        if scan_interval is None:
+            scan_interval = FALLBACK_SCAN_INTERVAL if screener else API_CALL_INTERVAL
+        self.scan_interval = scan_interval
+        self.batch_size = batch_size
+        self.batch_frames = deque(maxlen=batch_size)
+        self.batch_sample_interval = max(1, scan_interval // batch_size)
+        self.snapshot = snapshot
+        self.log = log
+        self.candidate = None            # Latest local-detector hit awaiting Gemini confirmation
+        self.last_escalation_step = -CANDIDATE_MIN_INTERVAL
+        self.last_scan_step = 0
+
+    def victim_found(self):
+        """Poll the Gemini worker; True once it has confirmed a victim."""
+        found = False
+        for result in self.detector.poll():
+            if result.error:
+                self.log(f"  Detection worker error: {result.error}")
+            elif result.victim:
+                found = True
+        return found
+
+    def update(self, step, frame, patrolling):
+        """Screen and submit this step's frame as the budget allows."""
+        # --- LOCAL SCREENING (every few frames, CPU only) ---
+        screener = self.screener
+        if screener:
+            for result in screener.poll():
+                if result.error:
+                    self.log(f"  Local detector error: {result.error}")
+                elif result.victim:
+                    self.candidate = result
+            if step % LOCAL_SCREEN_EVERY_N_STEPS == 0 and frame and not screener.busy:
+                screener.submit(frame)
+
+        # --- AI ANALYSIS (candidates + periodic safety net, non-blocking) ---
+        if self.batch_size > 1 and frame and step % self.batch_sample_interval == 0:
+            self.batch_frames.append(frame)
+        candidate = self.candidate
+        if candidate is not None and time.perf_counter() - candidate.finished_at > CANDIDATE_MAX_AGE:
+            candidate = self.candidate = None
+        if self.detector.busy:
+            return
+        if (candidate is not None and step - self.last_escalation_step >= CANDIDATE_MIN_INTERVAL
+                and self.scheduler.ready(PRIORITY_CONFIRM)):
+            self.log(f"👀 Local detector candidate (score {candidate.verdict.score:.2f}), asking Gemini to confirm...")
+            self.detector.submit(candidate.frame, priority=PRIORITY_CONFIRM)
+            self.candidate = None
+            self.last_escalation_step = self.last_scan_step = step
+        elif step % self.scan_interval == 0 and frame:
+            if self.snapshot:
+                self.snapshot()
+            self.detector.submit(list(self.batch_frames) if len(self.batch_frames) > 1 else frame)
+            self.batch_frames.clear()
+            self.last_scan_step = step
+        elif (patrolling and step % GATE_CHECK_EVERY_N_STEPS == 0 and frame
+                and step - self.last_scan_step >= EARLY_SCAN_MIN_INTERVAL
+                and self.scheduler.ready(PRIORITY_EARLY) and self.frame_gate.changed_a_lot(frame)):
+            self.log("🔀 Scene changed a lot, analyzing early...")
+            self.detector.submit(frame, priority=PRIORITY_EARLY)
+            self.last_scan_step = step
+
+    def report(self):
+        cache = self.frame_gate.cache.stats()
+        self.log(f"♻️ Verdict cache: {cache['hits']} hits / {cache['misses']} misses, {cache['entries']} entries")
+        quota = self.scheduler.stats()
+        self.log(f"🎫 API budget: {quota['used_today']}/{quota['daily_limit']} today, "
+                 f"{quota['deferred']} deferred, {quota['rate_limited']} rate limited")
+
+
+class ResQController:
+    """
+    One robot's controller. Feed it the 8 sonar values (and optionally the
+    step's frame_buffer.Frame and the radians each wheel turned since the last
+    step) each step; it returns the wheel velocities.
+    """
+
+    def __init__(self, config=None, rng=None, planner=None, on_victim=None, verbose=True, explorer=None):
+        self.config = config if config is not None else NavConfig()
+        self.rng = rng if rng is not None else random.Random()
+        self.planner = planner
+        self.explorer = explorer
+        self.on_victim = on_victim
+        self.log = print if verbose else _quiet
+        obstacle, close = self.config.obstacle_threshold, self.config.close_threshold
+        if obstacle is None:
+            obstacle = explorer.obstacle_threshold if explorer is not None else OBSTACLE_THRESHOLD
+        if close is None:
+            close = explorer.close_threshold if explorer is not None else CLOSE_THRESHOLD
+        self.sonar = SonarProcessor(None, obstacle, close, smoothing=self.config.sonar_smoothing)
+        self.state = ControllerState()
+
+    @property
+    def victim_found(self):
+        return self.state.victim_found
+
+    @property
+    def state_name(self):
+        return STATE_NAMES[self.state.state]
+
+    def _command(self, left, right):
+        s = self.state
+        s.left = left
+        s.right = right
+        return left, right
+
+    def step(self, sensor_values, frame=None, wheel_travel=None):
+        s = self.state
+        cfg = self.config
+
+        if s.state != s.dwell_state:
+            now = time.perf_counter()
+            STATE_DWELL_SECONDS.labels(STATE_NAMES[s.dwell_state]).observe(now - s.dwell_since)
+            metrics.log_event("state", left=STATE_NAMES[s.dwell_state], entered=STATE_NAMES[s.state],
+                              dwell=round(now - s.dwell_since, 3), step=s.step)
+            s.dwell_state, s.dwell_since = s.state, now
+
+        if s.victim_found:
+            return self._command(0.0, 0.0)
+
+        s.step += 1
+        planner = self.planner
+        if planner is not None:
+            # --- AI RESULTS (delivered by the detection worker) ---
+            if planner.victim_found():
+                s.victim_found = True
+                self.log("=" * 50)
+                self.log("🚨🚨🚨 VICTIM LOCATED! STOPPING ROBOT! 🚨🚨🚨")
+                self.log("=" * 50)
+                metrics.log_event("victim", step=s.step)
+                if self.on_victim:
+                    self.on_victim()
+                return s.left, s.right
+            planner.update(s.step, frame, s.state == STATE_PATROL)
+
+        # --- READ SENSORS ---
+        reading = self.sonar.update(sensor_values)  # see sonar.py
+        explorer = self.explorer
+        if explorer is not None:
+            explorer.update(sensor_values, s.left, s.right, TIME_STEP / 1000.0, wheel_travel)
+
+        if s.step % REPORT_EVERY_N_STEPS == 0:
+            readable = ', '.join(f'{v:.0f}' for v in reading.values)
+            self.log(f"📡 Sensors: [{readable}]  State: {STATE_NAMES[s.state]}  Step: {s.step}")
+            if planner is not None:
+                planner.report()
+
+        # =============================================
+        # STATE MACHINE
+        # =============================================
+        max_speed = cfg.max_speed
+
+        if s.state == STATE_PATROL:
+            if reading.front_all_clear and not reading.close_front:
+                if explorer is not None:
+                    # Steer toward the exploration target, but never into a side that's blocked
+                    wander = explorer.steer()
+                    if reading.obstacle_right:
+                        wander = min(wander, 0.0)
+                    if reading.obstacle_left:
+                        wander = max(wander, 0.0)
+                else:
+                    wander = self.rng.uniform(-0.05, 0.05)
+                s.avoid_counter = 0
+                return self._command(max_speed * (cfg.patrol_speed + wander), max_speed * (cfg.patrol_speed - wander))
+            elif reading.obstacle_front or reading.close_front:
+                s.state = STATE_AVOID
+                s.avoid_counter = 0
+                s.spin_direction = -1 if reading.left_blocked < reading.right_blocked else 1
+                return s.left, s.right
+            elif reading.obstacle_left and not reading.obstacle_right:
+                return self._command(max_speed * 0.5, max_speed * 0.3)
+            elif reading.obstacle_right and not reading.obstacle_left:
+                return self._command(max_speed * 0.3, max_speed * 0.5)
+            return self._command(max_speed * cfg.patrol_speed, max_speed * cfg.patrol_speed)
+
+        if s.state == STATE_AVOID:
+            s.avoid_counter += 1
+
+            if s.avoid_counter > cfg.avoid_stuck_limit:
+                self.log("🚧 Stuck! Reversing...")
+                s.state = STATE_REVERSE
+                s.state_timer = cfg.reverse_duration
+                toward = explorer.spin_direction() if explorer is not None else None
+                s.spin_direction = toward if toward is not None else self.rng.choice([-1, 1])
+                return s.left, s.right
+
+            if reading.front_all_clear and not reading.close_front:
+                s.state = STATE_PATROL
+                s.avoid_counter = 0
+                return s.left, s.right
+
+            if reading.close_front:
+                turn_speed = max_speed * 0.5
+                if s.spin_direction == 1:
+                    return self._command(turn_speed, -turn_speed)
+                return self._command(-turn_speed, turn_speed)
+            if s.spin_direction == 1:
+                return self._command(max_speed * 0.4, -max_speed * 0.1)
+            return self._command(-max_speed * 0.1, max_speed * 0.4)
+
+        if s.state == STATE_REVERSE:
+            s.state_timer -= 1
+            if s.state_timer <= 0:
+                self.log(f"🔄 Reversing done, spinning {'left' if s.spin_direction == -1 else 'right'}...")
+                s.state = STATE_SPIN
+                s.state_timer = cfg.spin_duration + self.rng.randint(0, 20)
+                s.spin_retry_count = 0
+            return self._command(-max_speed * 0.4, -max_speed * 0.4)
+
+        # STATE_SPIN
+        s.state_timer -= 1
+        spin_speed = max_speed * 0.5
+        if s.spin_direction == 1:
+            command = self._command(spin_speed, -spin_speed)
+        else:
+            command = self._command(-spin_speed, spin_speed)
+
+        if s.state_timer <= 0:
+            if reading.front_all_clear and not reading.close_front:
+                self.log("✅ Path clear, resuming patrol!")
+                s.state = STATE_PATROL
+                s.avoid_counter = 0
+                s.spin_retry_count = 0
+            else:
+                s.spin_retry_count += 1
+                if s.spin_retry_count > 3:
+                    self.log("⚡ Forcing patrol to escape spin loop!")
+                    s.state = STATE_PATROL
+                    s.avoid_counter = 0
+                    s.spin_retry_count = 0
+                else:
+                    s.spin_direction *= -1
+                    s.state_timer = cfg.spin_duration + self.rng.randint(0, 15)
+                    self.log(f"🔄 Still blocked, trying other direction... (retry {s.spin_retry_count}/3)")
+        return command
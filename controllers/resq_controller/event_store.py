@@ -0,0 +1,357 @@
+"""
+ResQ Mission Event Store
+========================
+An append-only SQLite database (WAL mode) of every detection attempt and
+mission event, kept across missions:
+
+    detections   one row per Gemini attempt (victim, clear, cached, deferred,
+                 rate limited, error, empty) and per local-detector screen:
+                 time, step, navigation state, pose, source, outcome, verdict,
+                 score, latency, frame seq, thumbnail path, response text
+    events       mission milestones (start, victim, end) with JSON details
+
+Producers (the control loop and the detection workers) only put a tuple on
+a bounded queue, so recording never waits on the disk; if the writer falls
+that far behind, rows are dropped and counted instead. A writer thread
+inserts them in batches, one transaction per batch. Thumbnails of positive
+detections are encoded and written by the writer thread too.
+
+Indexed for the dashboard and post-mission tooling:
+
+    recent_detections(minutes, victim=True)   positives in the last N minutes
+    detections_near(step, window)              what was seen around step X of a
+                                               mission (the latest by default;
+                                               steps restart every mission)
+
+WAL lets readers (EventQuery, `python event_store.py <db>`) run while the
+controller writes.
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# --- Configuration ---
+BATCH_ROWS = 256                 # Rows per insert transaction at most
+FLUSH_INTERVAL = 0.5             # Seconds a row may wait for its batch
+MAX_PENDING_ROWS = 10000         # Queued rows before new ones are dropped
+THUMBNAIL_DIR = "thumbnails"     # Next to the database; positive detections only
+BUSY_TIMEOUT_MS = 5000           # Another controller writing the same database
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS detections (
+    id INTEGER PRIMARY KEY,
+    mission TEXT NOT NULL,
+    robot TEXT,
+    t REAL NOT NULL,             -- unix time the verdict arrived
+    step INTEGER NOT NULL,       -- controller step when it arrived
+    state TEXT,                  -- navigation state
+    x REAL, y REAL, heading REAL,  -- odometry pose (explore mode only)
+    source TEXT NOT NULL,        -- gemini, hog, cache, ...
+    outcome TEXT NOT NULL,       -- victim, clear, cached, deferred, rate_limited, error, empty, candidate
+    victim INTEGER NOT NULL,
+    score REAL,
+    latency REAL,                -- seconds
+    frame_seq INTEGER,
+    frames INTEGER,              -- frames in the request (batched scans)
+    priority INTEGER,
+    thumbnail TEXT,              -- path relative to the database
+    text TEXT,
+    detail TEXT                  -- JSON: reason, error, backoff, ...
+);
+CREATE INDEX IF NOT EXISTS detections_t ON detections(t);
+CREATE INDEX IF NOT EXISTS detections_mission_step ON detections(mission, step);
+CREATE INDEX IF NOT EXISTS detections_victim ON detections(victim, t);
+
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    mission TEXT NOT NULL,
+    robot TEXT,
+    t REAL NOT NULL,
+    step INTEGER,
+    kind TEXT NOT NULL,
+    data TEXT                    -- JSON
+);
+CREATE INDEX IF NOT EXISTS events_t ON events(t);
+CREATE INDEX IF NOT EXISTS events_mission_step ON events(mission, step);
+
+-- Replaced by the indexes above (step alone matches every mission)
+DROP INDEX IF EXISTS detections_step;
+DROP INDEX IF EXISTS detections_victim_t;
+DROP INDEX IF EXISTS events_step;
+"""
+
+DETECTION_COLUMNS = ("mission", "robot", "t", "step", "state", "x", "y", "heading", "source", "outcome", "victim",
+                     "score", "latency", "frame_seq", "frames", "priority", "thumbnail", "text", "detail")
+EVENT_COLUMNS = ("mission", "robot", "t", "step", "kind", "data")
+
+_INSERT_DETECTION = (f"INSERT INTO detections ({', '.join(DETECTION_COLUMNS)}) "
+                     f"VALUES ({', '.join('?' * len(DETECTION_COLUMNS))})")
+_INSERT_EVENT = f"INSERT INTO events ({', '.join(EVENT_COLUMNS)}) VALUES ({', '.join('?' * len(EVENT_COLUMNS))})"
+_DETECTION = "detection"
+_EVENT = "event"
+
+
+def connect(path, readonly=False):
+    """A connection with the store's pragmas; read-only connections never create the file."""
+    if readonly:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")   # WAL: a crash loses at most the last batches, never corrupts
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+class EventStore:
+    """Append-only writer: never blocks the caller; a background thread batches inserts."""
+
+    def __init__(self, path, robot="robot", mission=None, batch_rows=BATCH_ROWS, flush_interval=FLUSH_INTERVAL,
+                 max_pending=MAX_PENDING_ROWS, thumbnails=True):
+        self.path = path
+        self.robot = robot
+        self.mission = mission or f"{robot}-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+        self.batch_rows = max(1, batch_rows)
+        self.flush_interval = flush_interval
+        self.thumbnail_dir = os.path.join(os.path.dirname(os.path.abspath(path)), THUMBNAIL_DIR) if thumbnails else None
+        self._pending = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._closed = False
+        conn = connect(path)
+        with conn:
+            conn.executescript(SCHEMA)
+        conn.close()
+
+        # Stats
+        self.queued = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.write_ms = None            # smoothed time one batch transaction takes
+
+    def start(self):
+        if self._thread is not None:
+            return self
+        self._thread = threading.Thread(target=self._run, name="resq-events", daemon=True)
+        self._thread.start()
+        return self
+
+    # --- Producer side (any thread, never blocks) ---
+
+    def _put(self, item):
+        if self._closed:
+            return
+        try:
+            self._pending.put_nowait(item)
+            self.queued += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def record_detection(self, step, source, outcome, victim=False, score=None, latency=None, text=None,
+                         frame=None, state=None, pose=None, frames=None, priority=None, **detail):
+        """
+        One detection attempt. `frame` is the frame_buffer.Frame analyzed (for
+        its seq, and a thumbnail if this was a positive); `pose` is (x, y,
+        heading) or None. Extra keyword arguments go to the `detail` JSON.
+        """
+        x, y, heading = pose if pose is not None else (None, None, None)
+        frame_seq = frame.seq if frame is not None else None
+        thumbnail_frame = frame if victim else None     # don't hold on to every screened frame
+        self._put((_DETECTION, time.time(), step, state, x, y, heading, source, outcome, bool(victim),
+                   score, latency, frame_seq, thumbnail_frame, frames, priority, text, detail))
+
+    def record_event(self, kind, step=None, **data):
+        """A mission milestone (e.g. "start", "victim", "end")."""
+        self._put((_EVENT, time.time(), step, kind, data))
+
+    # --- Writer side ---
+
+    def _run(self):
+        conn = connect(self.path)
+        try:
+            done = False
+            while not done:
+                batch = []
+                try:
+                    item = self._pending.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    continue
+                deadline = time.monotonic() + self.flush_interval
+                while item is not None:
+                    batch.append(item)
+                    if len(batch) >= self.batch_rows:
+                        break
+                    try:
+                        item = self._pending.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                else:
+                    done = True     # close(): write what we have, then stop
+                if batch:
+                    self._write(conn, batch)
+        finally:
+            conn.close()
+
+    def _write(self, conn, batch):
+        start = time.perf_counter()
+        detections, events = [], []
+        for item in batch:
+            if item[0] == _DETECTION:
+                detections.append(self._detection_row(item))
+            else:
+                _, t, step, kind, data = item
+                events.append((self.mission, self.robot, t, step, kind, json.dumps(data) if data else None))
+        try:
+            with conn:
+                if detections:
+                    conn.executemany(_INSERT_DETECTION, detections)
+                if events:
+                    conn.executemany(_INSERT_EVENT, events)
+        except sqlite3.Error as e:
+            print(f"⚠️ Event store write failed ({len(batch)} rows lost): {e}")
+            return
+        self.written += len(batch)
+        self.batches += 1
+        elapsed = (time.perf_counter() - start) * 1000.0
+        self.write_ms = elapsed if self.write_ms is None else 0.8 * self.write_ms + 0.2 * elapsed
+
+    def _detection_row(self, item):
+        (_, t, step, state, x, y, heading, source, outcome, victim, score, latency, frame_seq, frame, frames,
+         priority, text, detail) = item
+        thumbnail = self._save_thumbnail(frame) if frame is not None else None
+        return (self.mission, self.robot, t, step, state, x, y, heading, source, outcome, int(victim),
+                score, latency, frame_seq, frames, priority, thumbnail, text,
+                json.dumps(detail) if detail else None)
+
+    def _save_thumbnail(self, frame):
+        """Detector-sized JPEG of a positive frame (usually cached already); path relative to the database."""
+        if self.thumbnail_dir is None:
+            return None
+        try:
+            from frame_encoder import detector_jpeg
+            os.makedirs(self.thumbnail_dir, exist_ok=True)
+            name = f"{self.mission}-{frame.seq}.jpg"
+            path = os.path.join(self.thumbnail_dir, name)
+            if not os.path.exists(path):
+                with open(path, "wb") as f:
+                    f.write(detector_jpeg(frame))
+            return os.path.join(THUMBNAIL_DIR, name)
+        except Exception as e:
+            print(f"⚠️ Thumbnail not saved: {e}")
+            return None
+
+    def close(self, timeout=5.0):
+        """Write everything queued so far and stop the writer."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None:
+            self._pending.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self):
+        return {"queued": self.queued, "written": self.written, "dropped": self.dropped, "batches": self.batches,
+                "backlog": self._pending.qsize(),
+                "write_ms": round(self.write_ms, 3) if self.write_ms is not None else None}
+
+
+class EventQuery:
+    """Read side: indexed queries over a store, safe to run while a controller writes it."""
+
+    def __init__(self, path):
+        self._conn = connect(path, readonly=True)
+
+    def recent_detections(self, minutes, victim=True, mission=None, limit=1000):
+        """Detections in the last `minutes` (positives only by default; victim=None for all), newest first."""
+        sql = "SELECT * FROM detections WHERE t >= ?"
+        args = [time.time() - minutes * 60.0]
+        if victim is not None:
+            sql += " AND victim = ?"
+            args.append(int(victim))
+        if mission is not None:
+            sql += " AND mission = ?"
+            args.append(mission)
+        sql += " ORDER BY t DESC LIMIT ?"
+        args.append(limit)
+        return [dict(row) for row in self._conn.execute(sql, args)]
+
+    def latest_mission(self):
+        """ID of the mission with the most recent detection, or None for an empty store."""
+        row = self._conn.execute("SELECT mission FROM detections ORDER BY t DESC LIMIT 1").fetchone()
+        return row["mission"] if row is not None else None
+
+    def detections_near(self, step, window=50, mission=None, victim=None):
+        """Detections within `window` steps of `step` in `mission` (default: the latest), in step order."""
+        if mission is None:
+            mission = self.latest_mission()
+            if mission is None:
+                return []
+        sql = "SELECT * FROM detections WHERE mission = ? AND step BETWEEN ? AND ?"
+        args = [mission, step - window, step + window]
+        if victim is not None:
+            sql += " AND victim = ?"
+            args.append(int(victim))
+        sql += " ORDER BY step, t"
+        return [dict(row) for row in self._conn.execute(sql, args)]
+
+    def events(self, mission=None, kind=None):
+        sql = "SELECT * FROM events WHERE 1"
+        args = []
+        if mission is not None:
+            sql += " AND mission = ?"
+            args.append(mission)
+        if kind is not None:
+            sql += " AND kind = ?"
+            args.append(kind)
+        return [dict(row) for row in self._conn.execute(sql + " ORDER BY t", args)]
+
+    def missions(self):
+        """(mission, robot, first t, last t, detections, positives), newest first."""
+        return [dict(row) for row in self._conn.execute(
+            "SELECT mission, robot, MIN(t) AS started, MAX(t) AS last, COUNT(*) AS detections, "
+            "SUM(victim) AS positives FROM detections GROUP BY mission ORDER BY started DESC")]
+
+    def close(self):
+        self._conn.close()
+
+
+def _print_rows(rows):
+    for row in rows:
+        when = time.strftime("%H:%M:%S", time.localtime(row["t"]))
+        pose = f" ({row['x']:.1f}, {row['y']:.1f})" if row["x"] is not None else ""
+        latency = f" {row['latency']:.2f}s" if row["latency"] is not None else ""
+        print(f"{when} step {row['step']:>6} {row['state'] or '':<8}{pose} {row['source']:<7} "
+              f"{row['outcome']:<12}{latency} {row['thumbnail'] or ''} {(row['text'] or '')[:60]}")
+    print(f"({len(rows)} detection(s))")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Query a ResQ event store")
+    parser.add_argument("db", help="event store database (RESQ_EVENTS)")
+    parser.add_argument("--minutes", type=float, help="detections in the last N minutes (positives unless --all)")
+    parser.add_argument("--near-step", type=int, help="detections around this step")
+    parser.add_argument("--window", type=int, default=50, help="steps either side for --near-step")
+    parser.add_argument("--mission", help="only this mission (--near-step: default the latest)")
+    parser.add_argument("--all", action="store_true", help="include negative verdicts and failed attempts")
+    args = parser.parse_args()
+
+    query = EventQuery(args.db)
+    if args.minutes is not None:
+        _print_rows(query.recent_detections(args.minutes, victim=None if args.all else True, mission=args.mission))
+    elif args.near_step is not None:
+        mission = args.mission or query.latest_mission()
+        if mission is not None:
+            print(f"mission {mission}")
+        _print_rows(query.detections_near(args.near_step, args.window, mission, None if args.all else True))
+    else:
+        for m in query.missions():
+            print(f"{m['mission']}: {m['detections']} detections, {m['positives']} positive, "
+                  f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(m['started']))}")
+    query.close()
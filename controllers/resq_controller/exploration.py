@@ -0,0 +1,283 @@
+"""
+ResQ Exploration
+================
+Coverage-driven patrol: instead of wandering at random, the robot steers
+toward the nearest frontier (known-free space next to unexplored space).
+
+    Odometry        - dead-reckoned pose from wheel encoder travel, or from the
+                      commanded wheel velocities when there are no encoders
+    OccupancyGrid   - log-odds grid updated from the 8 sonars each step; every
+                      sonar ray is sampled in one NumPy pass (free along the
+                      ray, occupied at the echo), plus a map of the cells the
+                      robot has driven over
+    FrontierExplorer - owns the two above, picks a frontier target every few
+                      steps and gives the patrol state a steering correction
+                      and a preferred spin direction
+
+Pose and grid are in the robot's own odometry frame (start = origin, facing
++x). Odometry drifts, so the map is only locally accurate, which is all the
+frontier choice needs.
+"""
+
+import math
+
+import numpy as np
+
+# --- Configuration ---
+WHEEL_RADIUS = 0.0975           # Pioneer 3-DX
+AXLE_LENGTH = 0.33
+ROBOT_RADIUS = 0.26
+SONAR_RANGE = 5.0               # Metres at sonar value 0 (linear 1024 -> 0)
+SONAR_MAX_VALUE = 1024.0
+SONAR_ANGLES = np.radians([90, 50, 30, 10, -10, -30, -50, -90])   # so0..so7, CCW from heading
+SONAR_CONE = math.radians(15)
+SONAR_RAYS = 3                  # Rays cleared per sensor across its cone
+FREE_RANGE = 3.0                # Rays only clear cells this far out (sonar gets unreliable beyond)
+GRID_SIZE = 60.0                # Metres per side, centred on the start pose
+GRID_CELL = 0.1                 # Metres per cell
+LOG_ODDS_FREE = -0.4
+LOG_ODDS_OCCUPIED = 0.85
+LOG_ODDS_LIMIT = 4.0
+FREE_BELOW = -0.5               # Cells with log-odds below this count as known free
+OCCUPIED_ABOVE = 0.5
+FRONTIER_BLOCK = 5              # Cells per side of the coarse blocks frontiers are found on
+REPLAN_EVERY_N_STEPS = 16
+TARGET_REACHED = 0.6            # Metres
+TARGET_TIMEOUT = 400            # Steps before an unreached target is given up on
+TARGET_MIN_DISTANCE = 0.8       # Frontier cells closer than this are ignored
+HEADING_COST = 1.5              # Metres of detour one radian of turning is worth
+STEER_GAIN = 0.25               # Wander correction per radian of heading error
+STEER_LIMIT = 0.2               # Max correction (the random wander was +/- 0.05)
+# Sonar thresholds for explore mode unless NavConfig sets them. Steering only happens in
+# PATROL, and at sonar.py's 80/300 an obstacle 4.6 m ahead already ends PATROL, so in a
+# cluttered room the robot hardly ever follows its target. 600/800 = 2.1 m / 1.1 m.
+OBSTACLE_THRESHOLD = 600
+CLOSE_THRESHOLD = 800
+
+
+class Odometry:
+    """Pose (x, y, theta) integrated from wheel velocities in rad/s."""
+
+    __slots__ = ("x", "y", "theta")
+
+    def __init__(self):
+        self.x = self.y = self.theta = 0.0
+
+    def update(self, left_travel, right_travel):
+        """Advance by the radians each wheel turned since the last update."""
+        distance = WHEEL_RADIUS * (left_travel + right_travel) / 2.0
+        turn = WHEEL_RADIUS * (right_travel - left_travel) / AXLE_LENGTH
+        mid = self.theta + turn / 2.0
+        self.x += distance * math.cos(mid)
+        self.y += distance * math.sin(mid)
+        self.theta = (self.theta + turn + math.pi) % (2 * math.pi) - math.pi
+
+
+class OccupancyGrid:
+    """Log-odds occupancy grid in the odometry frame."""
+
+    def __init__(self, size=GRID_SIZE, cell=GRID_CELL):
+        self.cell = cell
+        self.cells = int(size / cell)
+        self.half = self.cells // 2
+        self.log_odds = np.zeros((self.cells, self.cells), dtype=np.float32)
+        self.visited = np.zeros((self.cells, self.cells), dtype=bool)
+        self._samples = np.arange(ROBOT_RADIUS, ROBOT_RADIUS + SONAR_RANGE, cell)
+        self._along = self._samples - ROBOT_RADIUS
+        offsets = np.linspace(-SONAR_CONE / 2, SONAR_CONE / 2, SONAR_RAYS) if SONAR_RAYS > 1 else np.zeros(1)
+        self._ray_angles = (SONAR_ANGLES[:, None] + offsets[None, :]).ravel()
+        reach = int(ROBOT_RADIUS / cell)
+        dr, dc = np.mgrid[-reach:reach + 1, -reach:reach + 1]
+        inside = dr ** 2 + dc ** 2 <= reach ** 2
+        self._disc = (dr[inside], dc[inside])
+        # Bounding box of touched cells, so frontier search scans only the explored area
+        self.bounds = [self.half, self.half, self.half, self.half]
+
+    def to_cell(self, x, y):
+        """(row, col) arrays for metre coordinates, clipped to the grid."""
+        # minimum/maximum rather than np.clip: same result, a fraction of the call overhead
+        top = self.cells - 1
+        cols = np.minimum(np.maximum(np.floor(np.asarray(x) / self.cell).astype(np.intp) + self.half, 0), top)
+        rows = np.minimum(np.maximum(np.floor(np.asarray(y) / self.cell).astype(np.intp) + self.half, 0), top)
+        return rows, cols
+
+    def to_metres(self, rows, cols):
+        return (cols - self.half + 0.5) * self.cell, (rows - self.half + 0.5) * self.cell
+
+    def update(self, pose, sonar_values):
+        """Fold one set of sonar readings taken at `pose` into the grid."""
+        values = np.repeat(np.asarray(sonar_values, dtype=np.float64), len(self._ray_angles) // len(SONAR_ANGLES))
+        ranges = SONAR_RANGE * (1.0 - np.minimum(np.maximum(values, 0.0), SONAR_MAX_VALUE) / SONAR_MAX_VALUE)
+        echo = values > 0.0
+        angles = pose.theta + self._ray_angles
+        samples = self._samples
+        xs = pose.x + np.cos(angles)[:, None] * samples
+        ys = pose.y + np.sin(angles)[:, None] * samples
+        rows, cols = self.to_cell(xs, ys)
+
+        along = self._along
+        free = along[None, :] < np.minimum(ranges, FREE_RANGE)[:, None] - self.cell
+        free_rows, free_cols = rows[free], cols[free]
+        log_odds = self.log_odds
+        log_odds[free_rows, free_cols] = np.maximum(log_odds[free_rows, free_cols] + LOG_ODDS_FREE, -LOG_ODDS_LIMIT)
+
+        hit = echo & (ranges < SONAR_RANGE - self.cell)
+        if hit.any():
+            idx = np.minimum(np.searchsorted(along, ranges[hit]), len(samples) - 1)
+            hit_rows, hit_cols = rows[hit, idx], cols[hit, idx]
+            log_odds[hit_rows, hit_cols] = np.minimum(log_odds[hit_rows, hit_cols] + LOG_ODDS_OCCUPIED, LOG_ODDS_LIMIT)
+
+        # Everything touched lies within sensor reach of the robot
+        reach = int((ROBOT_RADIUS + SONAR_RANGE) / self.cell) + 1
+        row = int(math.floor(pose.y / self.cell)) + self.half
+        col = int(math.floor(pose.x / self.cell)) + self.half
+        r0, r1, c0, c1 = self.bounds
+        self.bounds = [max(min(r0, row - reach), 0), min(max(r1, row + reach + 1), self.cells),
+                       max(min(c0, col - reach), 0), min(max(c1, col + reach + 1), self.cells)]
+
+    def visit(self, pose):
+        top = self.cells - 1
+        row = min(max(int(math.floor(pose.y / self.cell)) + self.half, 0), top)
+        col = min(max(int(math.floor(pose.x / self.cell)) + self.half, 0), top)
+        rows = np.minimum(np.maximum(self._disc[0] + row, 0), top)
+        cols = np.minimum(np.maximum(self._disc[1] + col, 0), top)
+        self.visited[rows, cols] = True
+
+    def frontiers(self, block=FRONTIER_BLOCK, unvisited=False):
+        """
+        (rows, cols) of frontier block centres: coarse blocks that are mostly known
+        free with no obstacle, next to a block nothing is known about. Working on
+        blocks keeps the gaps between sonar rays from counting as frontiers.
+        With `unvisited`, return the open blocks the robot hasn't driven over instead.
+        """
+        r0, r1, c0, c1 = self.bounds
+        r0, c0 = max(r0 - block, 0) // block * block, max(c0 - block, 0) // block * block
+        r1 = min(-(-(r1 + block) // block) * block, self.cells // block * block)
+        c1 = min(-(-(c1 + block) // block) * block, self.cells // block * block)
+        window = self.log_odds[r0:r1, c0:c1]
+        shape = (window.shape[0] // block, block, window.shape[1] // block, block)
+        free = (window < FREE_BELOW).reshape(shape).sum(axis=(1, 3))
+        occupied = (window > OCCUPIED_ABOVE).reshape(shape).any(axis=(1, 3))
+        open_block = (free * 2 >= block * block) & ~occupied
+        if unvisited:
+            visited = self.visited[r0:r1, c0:c1].reshape(shape).any(axis=(1, 3))
+            rows, cols = np.nonzero(open_block & ~visited)
+            return rows * block + r0 + block // 2, cols * block + c0 + block // 2
+        unknown = (free == 0) & ~occupied
+        near_unknown = np.zeros_like(unknown)
+        near_unknown[1:, :] |= unknown[:-1, :]
+        near_unknown[:-1, :] |= unknown[1:, :]
+        near_unknown[:, 1:] |= unknown[:, :-1]
+        near_unknown[:, :-1] |= unknown[:, 1:]
+        rows, cols = np.nonzero(open_block & near_unknown)
+        return rows * block + r0 + block // 2, cols * block + c0 + block // 2
+
+    def known_fraction(self):
+        """Share of the explored box whose cells are known free or occupied."""
+        r0, r1, c0, c1 = self.bounds
+        window = self.log_odds[r0:r1, c0:c1]
+        return float(((window < FREE_BELOW) | (window > OCCUPIED_ABOVE)).mean()) if window.size else 0.0
+
+    def visited_area(self):
+        """Square metres the robot's footprint has covered."""
+        return float(self.visited.sum()) * self.cell * self.cell
+
+
+class FrontierExplorer:
+    """Keeps the map up to date and picks where the patrol should head next."""
+
+    def __init__(self, grid=None, obstacle_threshold=OBSTACLE_THRESHOLD, close_threshold=CLOSE_THRESHOLD):
+        self.grid = grid if grid is not None else OccupancyGrid()
+        self.obstacle_threshold = obstacle_threshold    # Picked up by ResQController (see NavConfig)
+        self.close_threshold = close_threshold
+        self.pose = Odometry()
+        self.target = None
+        self.target_since = 0
+        self.rejected = []
+        self.steps = 0
+        self.next_plan = 0
+
+    def update(self, sonar_values, left, right, dt, wheel_travel=None):
+        """
+        One TIME_STEP: advance odometry by the encoders' `wheel_travel` (radians per
+        wheel) or else by the last command (`left`, `right` rad/s for `dt` s), then
+        map this step's sonar.
+        """
+        self.steps += 1
+        if wheel_travel is not None:
+            self.pose.update(*wheel_travel)
+        else:
+            self.pose.update(left * dt, right * dt)
+        self.grid.update(self.pose, sonar_values)
+        self.grid.visit(self.pose)
+        if self.target is not None:
+            tx, ty = self.target
+            if math.hypot(tx - self.pose.x, ty - self.pose.y) < TARGET_REACHED:
+                self.target = None
+            elif self.steps - self.target_since > TARGET_TIMEOUT:
+                self.rejected.append(self.target)
+                self.target = None
+        if self.steps >= self.next_plan or (self.target is None and self.steps % 4 == 0):
+            self.next_plan = self.steps + REPLAN_EVERY_N_STEPS
+            self._plan()
+
+    def _plan(self):
+        """Head for the cheapest frontier; once there are none, for open space not yet driven over."""
+        target = self._cheapest(*self.grid.frontiers())
+        if target is None:
+            target = self._cheapest(*self.grid.frontiers(unvisited=True))
+        if target is None:
+            self.target = None
+            return
+        if self.target is None or math.hypot(target[0] - self.target[0], target[1] - self.target[1]) > 1.0:
+            self.target_since = self.steps
+        self.target = target
+
+    def _cheapest(self, rows, cols):
+        if len(rows) == 0:
+            return None
+        xs, ys = self.grid.to_metres(rows, cols)
+        dx, dy = xs - self.pose.x, ys - self.pose.y
+        dist = np.hypot(dx, dy)
+        turn = np.abs((np.arctan2(dy, dx) - self.pose.theta + np.pi) % (2 * np.pi) - np.pi)
+        cost = dist + HEADING_COST * turn
+        cost[dist < TARGET_MIN_DISTANCE] = np.inf
+        for rx, ry in self.rejected[-32:]:
+            cost[np.hypot(xs - rx, ys - ry) < 1.0] = np.inf
+        best = int(np.argmin(cost))
+        if not np.isfinite(cost[best]):
+            return None
+        return float(xs[best]), float(ys[best])
+
+    def heading_error(self):
+        """Radians to turn (CCW positive) to face the target, or None without one."""
+        if self.target is None:
+            return None
+        bearing = math.atan2(self.target[1] - self.pose.y, self.target[0] - self.pose.x)
+        return (bearing - self.pose.theta + math.pi) % (2 * math.pi) - math.pi
+
+    def steer(self):
+        """Patrol wander term toward the target (positive turns right, like the random wander)."""
+        error = self.heading_error()
+        if error is None:
+            return 0.0
+        return -max(-STEER_LIMIT, min(STEER_LIMIT, STEER_GAIN * error))
+
+    def spin_direction(self):
+        """1 to spin right, -1 to spin left toward the target; None without one."""
+        error = self.heading_error()
+        if error is None:
+            return None
+        return -1 if error > 0 else 1
+
+
+NAV_MODES = ("explore", "wander")
+
+
+def create_explorer(mode):
+    """FrontierExplorer for "explore", None for "wander" (the random-wander patrol)."""
+    if mode == "explore":
+        return FrontierExplorer()
+    if mode != "wander":
+        raise ValueError(f"unknown navigation mode {mode!r} (one of: {', '.join(NAV_MODES)})")
+    return None
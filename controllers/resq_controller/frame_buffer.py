@@ -0,0 +1,66 @@
+"""
+ResQ Shared Frame Buffer
+========================
+Holds the latest raw camera frame in memory so the streamer and the AI
+detector read the same `camera.getImage()` buffer instead of round-tripping
+through a JPEG file on disk.
+"""
+
+import threading
+import time
+
+
+class Frame:
+    """One captured camera image. The raw BGRA bytes are shared, never copied."""
+
+    __slots__ = ("seq", "data", "width", "height", "timestamp")
+
+    def __init__(self, seq, data, width, height, timestamp):
+        self.seq = seq
+        self.data = data
+        self.width = width
+        self.height = height
+        self.timestamp = timestamp
+
+    def to_image(self):
+        """Decode the raw buffer into an RGB PIL image (Webots returns BGRA)."""
+        import PIL.Image  # deferred: keeps PIL off the controller's startup path
+        img = PIL.Image.frombuffer('RGBA', (self.width, self.height), self.data, 'raw', 'BGRA', 0, 1)
+        return img.convert('RGB')
+
+
+class FrameBuffer:
+    """Single-slot buffer: the controller thread writes, any thread reads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latest = None
+        self._seq = 0
+
+    def capture(self, camera):
+        """Grab the camera's current image and publish it. Returns the Frame (or None)."""
+        data = camera.getImage()
+        if not data:
+            return None
+        with self._lock:
+            self._seq += 1
+            frame = Frame(self._seq, data, camera.getWidth(), camera.getHeight(), time.time())
+            self._latest = frame
+        return frame
+
+    def latest(self):
+        return self._latest
+
+
+# --- Shared instance used by the controller and the streamer ---
+_buffer = FrameBuffer()
+
+
+def capture_frame(camera):
+    """Capture this step's camera image into the shared buffer."""
+    return _buffer.capture(camera)
+
+
+def latest_frame():
+    """The most recently captured Frame, or None."""
+    return _buffer.latest()
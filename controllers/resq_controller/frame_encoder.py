@@ -0,0 +1,140 @@
+"""
+ResQ Frame Encoder
+==================
+Single encoding stage for captured camera frames.
+
+Every representation a consumer needs (stream JPEG, detector-sized JPEG,
+decoded RGB image, optional NumPy array) is produced at most once per frame
+and cached by the frame's sequence number, so the streamer and the AI
+detector never encode the same frame twice.
+"""
+
+import base64
+import io
+import threading
+import time
+from collections import OrderedDict
+
+# --- Configuration ---
+CACHE_FRAMES = 4                  # Recent frames kept in the cache
+DETECTOR_MAX_SIZE = (1024, 1024)  # Longest side sent to Gemini
+DETECTOR_JPEG_QUALITY = 90
+
+
+class FrameEncoder:
+    """Per-frame representation cache with encode-time and hit counters."""
+
+    def __init__(self, cache_frames=CACHE_FRAMES):
+        self._cache_frames = cache_frames
+        self._cache = OrderedDict()     # seq -> {key: value}
+        self._lock = threading.Lock()
+        self._stats = {}                # kind -> [encodes, total_ms, hits]
+
+    def _get(self, frame, key, kind, build):
+        with self._lock:
+            entry = self._cache.get(frame.seq)
+            if entry is not None and key in entry:
+                self._count(kind, hit=True)
+                return entry[key]
+
+        start = time.perf_counter()
+        value = build()
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+
+        with self._lock:
+            entry = self._cache.get(frame.seq)
+            if entry is None:
+                entry = self._cache[frame.seq] = {}
+                while len(self._cache) > self._cache_frames:
+                    self._cache.popitem(last=False)
+            entry[key] = value
+            self._count(kind, elapsed_ms=elapsed_ms)
+        return value
+
+    def _count(self, kind, hit=False, elapsed_ms=0.0):
+        stats = self._stats.setdefault(kind, [0, 0.0, 0])
+        if hit:
+            stats[2] += 1
+        else:
+            stats[0] += 1
+            stats[1] += elapsed_ms
+
+    # --- Representations ---
+
+    def rgb(self, frame):
+        """Decoded RGB PIL image. Shared - callers must not modify it in place."""
+        return self._get(frame, "rgb", "rgb", frame.to_image)
+
+    def stream_jpeg(self, frame, quality, scale=1.0):
+        def build():
+            img = self.rgb(frame)
+            if scale < 1.0:
+                import PIL.Image
+                size = (max(1, int(frame.width * scale)), max(1, int(frame.height * scale)))
+                img = img.resize(size, PIL.Image.BILINEAR)
+            buffer = io.BytesIO()
+            img.save(buffer, format='JPEG', quality=quality)
+            return buffer.getvalue()
+        return self._get(frame, ("stream_jpeg", quality, scale), "stream_jpeg", build)
+
+    def stream_b64(self, frame, quality, scale=1.0):
+        def build():
+            return base64.b64encode(self.stream_jpeg(frame, quality, scale)).decode('utf-8')
+        return self._get(frame, ("stream_b64", quality, scale), "stream_b64", build)
+
+    def detector_jpeg(self, frame):
+        def build():
+            img = self.rgb(frame).copy()
+            img.thumbnail(DETECTOR_MAX_SIZE)
+            buffer = io.BytesIO()
+            img.save(buffer, format='JPEG', quality=DETECTOR_JPEG_QUALITY)
+            return buffer.getvalue()
+        return self._get(frame, "detector_jpeg", "detector_jpeg", build)
+
+    def raw_array(self, frame):
+        """HxWx3 uint8 RGB NumPy array (requires numpy)."""
+        def build():
+            import numpy as np
+            return np.asarray(self.rgb(frame))
+        return self._get(frame, "raw_array", "raw_array", build)
+
+    def stats(self):
+        """Counters per representation: encodes, mean/total encode ms (inclusive), cache hits."""
+        with self._lock:
+            out = {}
+            for kind, (encodes, total_ms, hits) in self._stats.items():
+                out[kind] = {
+                    "encodes": encodes,
+                    "total_ms": round(total_ms, 3),
+                    "mean_ms": round(total_ms / encodes, 3) if encodes else 0.0,
+                    "hits": hits,
+                }
+            return out
+
+
+# --- Shared instance used by the streamer and the detector ---
+_encoder = FrameEncoder()
+
+
+def rgb_image(frame):
+    return _encoder.rgb(frame)
+
+
+def stream_jpeg(frame, quality, scale=1.0):
+    return _encoder.stream_jpeg(frame, quality, scale)
+
+
+def stream_b64(frame, quality, scale=1.0):
+    return _encoder.stream_b64(frame, quality, scale)
+
+
+def detector_jpeg(frame):
+    return _encoder.detector_jpeg(frame)
+
+
+def raw_array(frame):
+    return _encoder.raw_array(frame)
+
+
+def encoder_stats():
+    return _encoder.stats()
@@ -0,0 +1,112 @@
+"""
+ResQ Frame-Change Gate
+======================
+Decides whether a frame is worth a Gemini call.
+
+Each frame gets a 64-bit difference hash (dHash) of its green channel, a
+cheap luminance proxy taken straight from the BGRA buffer. Frames whose hash
+is within a few bits of a recently analyzed one reuse that verdict from an
+LRU cache with TTL eviction. A large hash distance from the last analyzed
+frame means the view changed a lot, so the controller can analyze early.
+"""
+
+import time
+from collections import OrderedDict
+
+# --- Configuration ---
+HASH_SIZE = 8                   # 8x8 gradient bits = 64-bit hash
+MATCH_DISTANCE = 6              # Hamming distance (bits) that still counts as "same view"
+CHANGE_DISTANCE = 20            # Hamming distance that counts as a big scene change
+CACHE_ENTRIES = 64
+CACHE_TTL = 120.0               # Seconds before a cached verdict is re-checked
+
+
+def dhash(frame, size=HASH_SIZE):
+    """64-bit difference hash of a frame_buffer.Frame (row-wise gradient signs)."""
+    import PIL.Image  # deferred: keeps PIL off the controller's startup path
+    image = PIL.Image.frombuffer('RGBA', (frame.width, frame.height), frame.data, 'raw', 'RGBA', 0, 1)
+    pixels = image.getchannel(1).resize((size + 1, size), PIL.Image.BOX).tobytes()
+    bits = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return bits
+
+
+def distance(a, b):
+    """Hamming distance between two hashes."""
+    return bin(a ^ b).count("1")
+
+
+class VerdictCache:
+    """LRU of recent hash -> verdict entries; near-duplicate hashes count as hits."""
+
+    def __init__(self, max_entries=CACHE_ENTRIES, ttl=CACHE_TTL, match_distance=MATCH_DISTANCE):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.match_distance = match_distance
+        self._entries = OrderedDict()   # hash -> (verdict, stored_at)
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, frame_hash, now=None):
+        """Return the cached verdict for a near-identical view, or None."""
+        now = time.monotonic() if now is None else now
+        best, best_distance = None, self.match_distance + 1
+        for key, (verdict, stored_at) in list(self._entries.items()):
+            if now - stored_at > self.ttl:
+                del self._entries[key]
+                self.expired += 1
+                continue
+            d = distance(key, frame_hash)
+            if d < best_distance:
+                best, best_distance = key, d
+        if best is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(best)
+        self.hits += 1
+        return self._entries[best][0]
+
+    def store(self, frame_hash, verdict, now=None):
+        now = time.monotonic() if now is None else now
+        self._entries[frame_hash] = (verdict, now)
+        self._entries.move_to_end(frame_hash)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evicted += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+
+class FrameGate:
+    """Tracks the last analyzed view and scores how much the scene has changed since."""
+
+    def __init__(self, change_distance=CHANGE_DISTANCE, cache=None):
+        self.change_distance = change_distance
+        self.cache = cache if cache is not None else VerdictCache()
+        self.last_hash = None
+
+    def changed_a_lot(self, frame):
+        """True when `frame` differs strongly from the last analyzed view."""
+        if self.last_hash is None:
+            return False
+        return distance(dhash(frame), self.last_hash) >= self.change_distance
+
+    def mark_analyzed(self, frame_hash):
+        self.last_hash = frame_hash
@@ -0,0 +1,158 @@
+"""
+ResQ Shared-Memory Frame Ring
+=============================
+Hands raw camera frames from the controller process to an out-of-process
+streamer through `multiprocessing.shared_memory`.
+
+The controller's cost per frame is one memcpy into the next slot. The reader
+always takes the newest complete frame; each slot carries its own sequence
+number, which is cleared while the slot is being written (a seqlock), so
+torn frames are detected and skipped. A small status area carries the AI
+status JSON, and the reader reports back how many viewers it has so the
+controller can skip copies when nobody is watching.
+"""
+
+import struct
+import time
+from multiprocessing import shared_memory
+
+from frame_buffer import Frame
+
+# --- Configuration ---
+RING_SLOTS = 4
+STATUS_BYTES = 4096
+
+# --- Layout ---
+# header: magic, slots, slot_capacity, viewers, write_seq, status_seq, status_len, closed
+_HEADER = struct.Struct("<4sIIIQQII")
+# slot header: seq, width, height, nbytes, timestamp
+_SLOT = struct.Struct("<QIIId")
+_MAGIC = b"RQFR"
+_OFF_VIEWERS = 12
+_OFF_WRITE_SEQ = 16
+_OFF_STATUS_SEQ = 24
+_OFF_STATUS_LEN = 32
+_OFF_CLOSED = 36
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+
+
+def _attach(name):
+    """Open an existing segment without letting this process's resource tracker unlink it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
+
+
+class FrameRing:
+    """Fixed-size ring of raw frames in shared memory. One writer, one reader."""
+
+    def __init__(self, shm, owner):
+        self._shm = shm
+        self._buf = shm.buf
+        self._owner = owner
+        magic, self.slots, self.slot_capacity = struct.unpack_from("<4sII", self._buf, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"shared memory '{shm.name}' is not a ResQ frame ring")
+        self._status_off = _HEADER.size
+        self._slots_off = self._status_off + STATUS_BYTES
+        self._slot_size = _SLOT.size + self.slot_capacity
+        self._last_status_seq = 0
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    @classmethod
+    def create(cls, slot_capacity, slots=RING_SLOTS):
+        size = _HEADER.size + STATUS_BYTES + slots * (_SLOT.size + slot_capacity)
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        _HEADER.pack_into(shm.buf, 0, _MAGIC, slots, slot_capacity, 0, 0, 0, 0, 0)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        return cls(_attach(name), owner=False)
+
+    def close(self):
+        if self._owner:
+            _U32.pack_into(self._buf, _OFF_CLOSED, 1)
+        self._buf = None
+        self._shm.close()
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    # --- Writer (controller) ---
+
+    def write(self, data, width, height):
+        """Copy one raw frame into the next slot. Returns its sequence number."""
+        nbytes = len(data)
+        if nbytes > self.slot_capacity:
+            raise ValueError(f"frame of {nbytes} bytes exceeds ring slot capacity {self.slot_capacity}")
+        seq = _U64.unpack_from(self._buf, _OFF_WRITE_SEQ)[0] + 1
+        off = self._slots_off + (seq % self.slots) * self._slot_size
+        _U64.pack_into(self._buf, off, 0)                                  # slot busy
+        self._buf[off + _SLOT.size:off + _SLOT.size + nbytes] = data       # the one memcpy
+        _SLOT.pack_into(self._buf, off, seq, width, height, nbytes, time.time())
+        _U64.pack_into(self._buf, _OFF_WRITE_SEQ, seq)
+        return seq
+
+    def write_status(self, payload):
+        payload = payload[:STATUS_BYTES]
+        seq = _U64.unpack_from(self._buf, _OFF_STATUS_SEQ)[0]
+        _U64.pack_into(self._buf, _OFF_STATUS_SEQ, 0)                      # status busy
+        self._buf[self._status_off:self._status_off + len(payload)] = payload
+        _U32.pack_into(self._buf, _OFF_STATUS_LEN, len(payload))
+        _U64.pack_into(self._buf, _OFF_STATUS_SEQ, seq + 1)
+
+    @property
+    def viewers(self):
+        """Viewer count last reported by the reader (0 = skip writing frames)."""
+        return _U32.unpack_from(self._buf, _OFF_VIEWERS)[0]
+
+    # --- Reader (streamer process) ---
+
+    @property
+    def closed(self):
+        return _U32.unpack_from(self._buf, _OFF_CLOSED)[0] == 1
+
+    def set_viewers(self, count):
+        _U32.pack_into(self._buf, _OFF_VIEWERS, count)
+
+    def read_latest(self, after_seq=0):
+        """Return the newest complete Frame newer than `after_seq`, or None."""
+        for _ in range(3):
+            seq = _U64.unpack_from(self._buf, _OFF_WRITE_SEQ)[0]
+            if seq <= after_seq:
+                return None
+            off = self._slots_off + (seq % self.slots) * self._slot_size
+            slot_seq, width, height, nbytes, timestamp = _SLOT.unpack_from(self._buf, off)
+            if slot_seq != seq:
+                continue
+            data = bytes(self._buf[off + _SLOT.size:off + _SLOT.size + nbytes])
+            if _U64.unpack_from(self._buf, off)[0] == seq:
+                return Frame(seq, data, width, height, timestamp)
+        return None
+
+    def read_status(self):
+        """Return new status bytes since the last call, or None."""
+        for _ in range(3):
+            seq = _U64.unpack_from(self._buf, _OFF_STATUS_SEQ)[0]
+            if seq == 0 or seq == self._last_status_seq:
+                return None
+            length = _U32.unpack_from(self._buf, _OFF_STATUS_LEN)[0]
+            payload = bytes(self._buf[self._status_off:self._status_off + length])
+            if _U64.unpack_from(self._buf, _OFF_STATUS_SEQ)[0] == seq:
+                self._last_status_seq = seq
+                return payload
+        return None
@@ -0,0 +1,176 @@
+"""
+ResQ GenAI Session
+==================
+Owns the one `genai.Client` the controller uses and the Gemini model it
+talks to, set up on a background thread so controller startup never waits
+on the network.
+
+The client is created once per process, and every generate_content call goes
+through its HTTP connection pool. The chosen model is cached on disk with a
+TTL, so a controller restart skips `models.list()` entirely. If discovery
+fails, the last known model is used even if stale; with none, setup is
+retried in the background instead of disabling AI for the whole run.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+# --- Configuration ---
+MODEL_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_cache.json")
+MODEL_CACHE_TTL = 24 * 3600     # Seconds before the chosen model is re-discovered
+REQUEST_TIMEOUT_MS = 30000      # Per-request HTTP timeout
+INIT_RETRY_DELAY = 30.0         # First retry after a failed setup (doubles, capped)
+INIT_MAX_RETRY_DELAY = 600.0
+
+
+def choose_model(names):
+    """Pick a Gemini Flash model, else any Gemini model, else None."""
+    fallback = None
+    for name in names:
+        if "gemini" in name:
+            if "flash" in name:
+                return name
+            if fallback is None:
+                fallback = name
+    return fallback
+
+
+class ModelCache:
+    """On-disk {key -> model name} cache with a TTL; keys are hashed API keys."""
+
+    def __init__(self, path=MODEL_CACHE_PATH, ttl=MODEL_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key, allow_stale=False):
+        entry = self._read().get(key)
+        if not entry:
+            return None
+        if not allow_stale and time.time() - entry.get("resolved_at", 0) > self.ttl:
+            return None
+        return entry.get("model")
+
+    def put(self, key, model):
+        entries = self._read()
+        entries[key] = {"model": model, "resolved_at": time.time()}
+        self._write(entries)
+
+    def invalidate(self, key):
+        entries = self._read()
+        if entries.pop(key, None) is not None:
+            self._write(entries)
+
+    def _write(self, entries):
+        """Replace the file atomically; the per-process tmp name keeps concurrent controllers apart."""
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"⚠️ Could not save model cache: {e}")
+
+
+class GenAISession:
+    """
+    Lazily initialized client + model. Pass `client` and `model` to use a
+    ready-made client (e.g. detection_worker.FakeClient); otherwise call start().
+    """
+
+    def __init__(self, api_key="", cache=None, client=None, model=None):
+        self.api_key = api_key
+        self.cache = cache if cache is not None else ModelCache()
+        self.client = client
+        self.model = model
+        self.error = None
+        self._key_id = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+        self._ready = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        if client is not None and model:
+            self._ready.set()
+
+    @property
+    def available(self):
+        return self._ready.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the client and model are ready. Returns availability."""
+        return self._ready.wait(timeout)
+
+    def start(self):
+        """Begin setup on a background thread (no-op if ready or already started)."""
+        with self._lock:
+            if self._ready.is_set() or (self._thread is not None and self._thread.is_alive()):
+                return
+            if not self.api_key:
+                self.error = "no API key"
+                print("⚠️ AI disabled: no API key")
+                return
+            self._thread = threading.Thread(target=self._setup_loop, name="resq-genai-init", daemon=True)
+            self._thread.start()
+
+    def invalidate_model(self):
+        """Forget the chosen model (e.g. it was retired) and re-discover in the background."""
+        with self._lock:
+            self._ready.clear()
+            self.model = None
+        self.cache.invalidate(self._key_id)
+        self.start()
+
+    def _setup_loop(self):
+        delay = INIT_RETRY_DELAY
+        while True:
+            try:
+                self._setup()
+                return
+            except ImportError as e:
+                self.error = str(e)
+                print(f"⚠️ AI disabled: {e} (pip install google-genai)")
+                return
+            except Exception as e:
+                self.error = str(e)
+                print(f"⚠️ AI Setup Error: {e} (retrying in {delay:.0f}s)")
+            time.sleep(delay)
+            delay = min(delay * 2, INIT_MAX_RETRY_DELAY)
+
+    def _setup(self):
+        if self.client is None:
+            from google import genai
+            from google.genai import types
+            self.client = genai.Client(
+                api_key=self.api_key,
+                http_options=types.HttpOptions(timeout=REQUEST_TIMEOUT_MS),
+            )
+
+        model = self.cache.get(self._key_id)
+        if model:
+            print(f"✅ Using cached AI model: {model}")
+        else:
+            print("🔍 Scanning for available AI models...")
+            try:
+                model = choose_model(m.name for m in self.client.models.list())
+            except Exception as e:
+                model = self.cache.get(self._key_id, allow_stale=True)
+                if not model:
+                    raise
+                print(f"⚠️ Model discovery failed ({e}); using last known model {model}")
+            else:
+                if not model:
+                    raise RuntimeError("no Gemini models available for this API key")
+                self.cache.put(self._key_id, model)
+                print(f"✅ FOUND WORKING MODEL: {model}")
+
+        self.model = model
+        self.error = None
+        self._ready.set()
@@ -0,0 +1,315 @@
+"""
+ResQ Metrics
+============
+Counters, gauges and histograms for the controller and streamer hot paths,
+exported two ways:
+
+    Prometheus text  - http://localhost:9108/metrics (start_http_server)
+    ring-buffer log  - a fixed-size, memory-mapped file of JSON lines that
+                       wraps around (RingLog); `python metrics.py <file>` prints it
+
+Recording is a few attribute updates and a bisect, so a histogram observation
+costs on the order of a microsecond. Labelled children are created once with
+`.labels(...)` and then kept by the caller. Values that already exist
+elsewhere (e.g. per-client byte counts) are pulled at scrape time by
+registered collectors rather than pushed on every update.
+"""
+
+import json
+import mmap
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# --- Configuration ---
+METRICS_PORT = 9108
+RING_LOG_RECORDS = 4096
+RING_LOG_RECORD_BYTES = 160
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 0.5, 1.0)
+MODEL_BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0)
+DWELL_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{str(v).replace(chr(34), chr(39))}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+
+    def labels(self, *values):
+        """The child for one label combination (create once, keep the reference)."""
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def clear(self):
+        """Drop all labelled children (e.g. before re-filling from a collector)."""
+        self._children = {}
+
+    def _samples(self):
+        if not self.labelnames:
+            yield from self._child_samples(self, "")
+            return
+        for values, child in list(self._children.items()):
+            yield from self._child_samples(child, _label_text(self.labelnames, values))
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self.value = 0.0
+
+    def _new_child(self):
+        return Counter(self.name, self.help)
+
+    def inc(self, amount=1.0):
+        self.value += amount
+
+    def set_total(self, value):
+        """Copy a running total kept elsewhere (from a scrape-time collector)."""
+        self.value = value
+
+    def _child_samples(self, child, labels):
+        yield f"{self.name}{labels} {child.value:g}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def _new_child(self):
+        return Gauge(self.name, self.help)
+
+    def set(self, value):
+        self.value = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def _new_child(self):
+        return Histogram(self.name, self.help, self.buckets)
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def _child_samples(self, child, labels):
+        inner = labels[1:-1] + "," if labels else ""
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else f"{bound:g}"
+            yield f'{self.name}_bucket{{{inner}le="{le}"}} {cumulative}'
+        yield f"{self.name}_sum{labels} {child.sum:g}"
+        yield f"{self.name}_count{labels} {child.count}"
+
+
+class Registry:
+    """All metrics of one process, plus scrape-time collectors."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+
+    def _get(self, cls, name, *args, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, *args, **kwargs)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._get(Counter, name, help_text, labelnames)
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._get(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS, labelnames=()):
+        return self._get(Histogram, name, help_text, buckets, labelnames)
+
+    def add_collector(self, fn):
+        """`fn()` runs before each scrape, e.g. to copy stats into gauges and counters."""
+        self._collectors.append(fn)
+
+    def render(self):
+        for fn in self._collectors:
+            try:
+                fn()
+            except Exception as e:
+                print(f"⚠️ Metrics collector error: {e}")
+        return "\n".join(m.render() for m in list(self._metrics.values())) + "\n"
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+add_collector = REGISTRY.add_collector
+
+
+# =============================================
+# RING-BUFFER LOG
+# =============================================
+
+class RingLog:
+    """
+    Fixed-size log file of `records` JSON lines, each padded to `record_bytes`,
+    written through mmap so a record is one slice assignment (no syscall).
+    The newest records overwrite the oldest; `seq` gives the order. An
+    existing log (e.g. from a run that crashed) is kept as `<path>.1`. A record
+    too long for its slot keeps t/event/seq and as many of its fields as fit,
+    plus `"truncated": <original length>`, so every line stays valid JSON.
+    """
+
+    def __init__(self, path, records=RING_LOG_RECORDS, record_bytes=RING_LOG_RECORD_BYTES):
+        self.path = path
+        self.records = records
+        self.record_bytes = record_bytes
+        size = records * record_bytes
+        if os.path.exists(path) and os.path.getsize(path):
+            os.replace(path, path + ".1")
+        with open(path, "wb") as f:
+            f.write((b" " * (record_bytes - 1) + b"\n") * records)
+        self._file = open(path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), size)
+        self._lock = threading.Lock()
+        self.seq = 0
+        self.truncated = 0
+
+    def write(self, event, **fields):
+        fields["t"] = round(time.time(), 4)
+        fields["event"] = event
+        with self._lock:
+            fields["seq"] = self.seq
+            line = _json_line(fields)
+            if len(line) > self.record_bytes - 1:
+                line = _fit_record(fields, len(line), self.record_bytes - 1)
+                self.truncated += 1
+            off = (self.seq % self.records) * self.record_bytes
+            self._map[off:off + self.record_bytes] = line.ljust(self.record_bytes - 1) + b"\n"
+            self.seq += 1
+
+    def close(self):
+        self._map.flush()
+        self._map.close()
+        self._file.close()
+
+
+def _json_line(fields):
+    return json.dumps(fields, separators=(",", ":")).encode("utf-8")
+
+
+def _fit_record(fields, length, limit):
+    """t/event/seq, then each other field of `fields` that still fits in `limit` bytes as JSON."""
+    record = {"t": fields["t"], "event": fields["event"], "seq": fields["seq"], "truncated": length}
+    event = str(record["event"])
+    while len(_json_line(record)) > limit and record["event"]:
+        event = event[:-1]
+        record["event"] = event
+    for key, value in fields.items():
+        if key in record:
+            continue
+        record[key] = value
+        if len(_json_line(record)) > limit:
+            del record[key]
+    return _json_line(record)
+
+
+def read_ring_log(path):
+    """Records of a RingLog file, oldest first (unparseable lines are skipped)."""
+    with open(path, "rb") as f:
+        lines = f.read().splitlines()
+    records = []
+    for line in lines:
+        line = line.strip()
+        if line:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                pass
+    return sorted(records, key=lambda r: r.get("seq", 0))
+
+
+_ring_log = None
+
+
+def open_ring_log(path, records=RING_LOG_RECORDS):
+    """Start the process-wide ring log (log_event is a no-op until then)."""
+    global _ring_log
+    _ring_log = RingLog(path, records)
+    return _ring_log
+
+
+def log_event(event, **fields):
+    if _ring_log is not None:
+        _ring_log.write(event, **fields)
+
+
+# =============================================
+# PROMETHEUS ENDPOINT
+# =============================================
+
+def start_http_server(port=METRICS_PORT, host="0.0.0.0", registry=REGISTRY):
+    """Serve GET /metrics from a daemon thread. Returns the server, or None if the port is taken."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer((host, port), Handler)
+    except OSError as e:
+        print(f"⚠️ Metrics endpoint not started on port {port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="resq-metrics", daemon=True).start()
+    print(f"📈 Metrics at http://localhost:{port}/metrics")
+    return server
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) != 2 or not os.path.exists(sys.argv[1]):
+        print("usage: python metrics.py <ring log file>")
+        sys.exit(1)
+    for record in read_ring_log(sys.argv[1]):
+        print(json.dumps(record))
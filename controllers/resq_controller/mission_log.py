@@ -0,0 +1,200 @@
+"""
+ResQ Mission Recorder
+=====================
+Records what the controller saw and did, step by step, so a mission can be
+replayed offline (see replay.py).
+
+A recording is a directory:
+
+    meta.json            camera size, TIME_STEP, random seed, chunk sizes, counts
+    steps_00000.npy ...  structured arrays, one row per robot.step():
+                         time, sonar (8 x f8; f4 before version 3), motors (left, right), frame (index or -1),
+                         wheels (encoder positions, NaN without encoders; version >= 2)
+    frames_00000.npy ... raw BGRA camera buffers, (chunk_frames, height, width, 4) uint8,
+                         stored only when a new frame was captured
+    verdicts.jsonl       AI verdicts as they arrived (step, source, victim, text)
+
+Chunks are plain .npy files written through np.lib.format.open_memmap, so
+recording a step is a row assignment plus one memcpy for a new frame, and
+`np.load(..., mmap_mode="r")` maps them back without reading the whole
+mission into memory. Every chunk except the last of each series is full; the
+last is trimmed on close().
+"""
+
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+# --- Configuration ---
+CHUNK_STEPS = 4096              # Step rows per steps_*.npy
+CHUNK_FRAMES = 64               # Camera frames per frames_*.npy
+FRAME_EVERY = 1                 # Store every Nth step's frame (1 = all; replay holds the last one)
+FORMAT_VERSION = 3
+
+STEP_DTYPE = np.dtype([
+    ("time", "<f8"),
+    ("sonar", "<f8", (8,)),     # f8: a value just above a threshold must stay above it in replay
+    ("motors", "<f4", (2,)),
+    ("frame", "<i4"),
+    ("wheels", "<f8", (2,)),    # f8: the explorer's odometry differences these, replay must match bit for bit
+])
+
+
+def _chunk_path(root, kind, index):
+    return os.path.join(root, f"{kind}_{index:05d}.npy")
+
+
+class MissionRecorder:
+    """Appends steps, frames and verdicts to a recording directory."""
+
+    def __init__(self, path, width, height, time_step, seed=None, robot="robot",
+                 chunk_steps=CHUNK_STEPS, chunk_frames=CHUNK_FRAMES, frame_every=FRAME_EVERY):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.width = width
+        self.height = height
+        self.frame_every = max(1, frame_every)
+        self.meta = {
+            "version": FORMAT_VERSION,
+            "robot": robot,
+            "width": width,
+            "height": height,
+            "time_step": time_step,
+            "seed": seed,
+            "chunk_steps": chunk_steps,
+            "chunk_frames": chunk_frames,
+            "frame_every": frame_every,
+            "started": time.time(),
+            "steps": 0,
+            "frames": 0,
+        }
+        self.steps = 0
+        self.frames = 0
+        self._steps_chunk = None
+        self._frames_chunk = None
+        self._last_frame_seq = None
+        self._verdicts = open(os.path.join(path, "verdicts.jsonl"), "a")
+        self._verdict_lock = threading.Lock()
+        self._write_meta()
+
+    def _write_meta(self):
+        self.meta["steps"] = self.steps
+        self.meta["frames"] = self.frames
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump(self.meta, f, indent=1)
+
+    def _open_chunk(self, kind, index, shape, dtype):
+        return np.lib.format.open_memmap(_chunk_path(self.path, kind, index), mode="w+", dtype=dtype, shape=shape)
+
+    def record_step(self, sonar, left, right, frame=None, wheels=None):
+        """
+        One robot.step(): sonar values, motor velocities, wheel encoder positions
+        and, if it is a new capture, the frame_buffer.Frame (same frame twice is
+        stored once).
+        """
+        frame_index = -1
+        if frame is not None and frame.seq != self._last_frame_seq and self.steps % self.frame_every == 0:
+            self._last_frame_seq = frame.seq
+            frame_index = self._record_frame(frame)
+
+        chunk_steps = self.meta["chunk_steps"]
+        row = self.steps % chunk_steps
+        if row == 0:
+            if self._steps_chunk is not None:
+                self._steps_chunk.flush()
+            self._steps_chunk = self._open_chunk("steps", self.steps // chunk_steps, (chunk_steps,), STEP_DTYPE)
+        self._steps_chunk[row] = (time.time(), sonar, (left, right), frame_index,
+                                  wheels if wheels is not None else (np.nan, np.nan))
+        self.steps += 1
+
+    def _record_frame(self, frame):
+        if frame.width != self.width or frame.height != self.height:
+            return -1
+        chunk_frames = self.meta["chunk_frames"]
+        slot = self.frames % chunk_frames
+        if slot == 0:
+            if self._frames_chunk is not None:
+                self._frames_chunk.flush()
+            self._frames_chunk = self._open_chunk(
+                "frames", self.frames // chunk_frames, (chunk_frames, self.height, self.width, 4), np.uint8)
+        self._frames_chunk[slot] = np.frombuffer(frame.data, np.uint8).reshape(self.height, self.width, 4)
+        self.frames += 1
+        return self.frames - 1
+
+    def record_verdict(self, step, source, victim, text):
+        """Log a detector verdict (thread-safe; called from detection workers)."""
+        line = json.dumps({"step": step, "t": time.time(), "source": source, "victim": bool(victim), "text": text})
+        with self._verdict_lock:
+            self._verdicts.write(line + "\n")
+            self._verdicts.flush()
+
+    def close(self):
+        """Trim the last chunks to their used length and finalize meta.json."""
+        for kind, chunk, used, per_chunk in (
+            ("steps", self._steps_chunk, self.steps, self.meta["chunk_steps"]),
+            ("frames", self._frames_chunk, self.frames, self.meta["chunk_frames"]),
+        ):
+            if chunk is None:
+                continue
+            rows = used - (used - 1) // per_chunk * per_chunk
+            chunk.flush()
+            if rows < per_chunk:
+                trimmed = np.array(chunk[:rows])
+                del chunk
+                np.save(_chunk_path(self.path, kind, (used - 1) // per_chunk), trimmed)
+        self._steps_chunk = self._frames_chunk = None
+        self._verdicts.close()
+        self._write_meta()
+        print(f"💾 Mission recorded: {self.steps} steps, {self.frames} frames -> {self.path}")
+
+
+class Mission:
+    """Read-only view of a recording; chunks are memory-mapped on first use."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.width = self.meta["width"]
+        self.height = self.meta["height"]
+        self.time_step = self.meta["time_step"]
+        self.seed = self.meta.get("seed")
+        self._chunks = {}
+        self.verdicts = []
+        verdict_path = os.path.join(path, "verdicts.jsonl")
+        if os.path.exists(verdict_path):
+            with open(verdict_path) as f:
+                self.verdicts = [json.loads(line) for line in f if line.strip()]
+
+    def __len__(self):
+        return self.meta["steps"]
+
+    @property
+    def frame_count(self):
+        return self.meta["frames"]
+
+    def _chunk(self, kind, index):
+        key = (kind, index)
+        chunk = self._chunks.get(key)
+        if chunk is None:
+            chunk = self._chunks[key] = np.load(_chunk_path(self.path, kind, index), mmap_mode="r")
+        return chunk
+
+    def step(self, i):
+        """The i-th step row (fields: time, sonar, motors, frame[, wheels])."""
+        per = self.meta["chunk_steps"]
+        return self._chunk("steps", i // per)[i % per]
+
+    def frame(self, n):
+        """Raw BGRA bytes of the n-th recorded frame (a view into the mapped chunk)."""
+        per = self.meta["chunk_frames"]
+        return memoryview(self._chunk("frames", n // per)[n % per]).cast("B")
+
+    def steps_array(self):
+        """All step rows as one array (copies; fine for the small per-step fields)."""
+        per = self.meta["chunk_steps"]
+        count = -(-len(self) // per) if len(self) else 0
+        return np.concatenate([self._chunk("steps", i) for i in range(count)]) if count else np.empty(0, STEP_DTYPE)
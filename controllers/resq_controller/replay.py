@@ -0,0 +1,225 @@
+"""
+ResQ Mission Replay
+===================
+Runs the unmodified controller script against a recording made with
+RESQ_RECORD=<dir> (see mission_log.py), with no Webots:
+
+    ReplayRobot   - step() advances through the recorded steps and returns -1 at
+                    the end; it never sleeps, so a replay runs as fast as the
+                    controller can (use --realtime to pace it at TIME_STEP)
+    ReplayCamera  - getImage() returns the recorded camera buffer for the step
+    ReplaySensor  - getValue() returns the recorded sonar value (or wheel encoder
+                    position, for recordings that have them)
+    StubMotor     - remembers the velocity it was given
+
+The controller runs in offline test mode (FakeClient with no latency) with the
+recorded seed and local detector, and with the camera streamer, metrics and
+event store off, so replays bind no ports and can run side by side. The motor
+command of every step is compared with the recorded one, so a change to
+navigation, sonar processing or the step loop shows up as the first step
+where the two differ.
+
+Replay is open loop: recorded sonar is fed back regardless of what the
+replayed controller does with the motors. AI verdicts arrive on a worker
+thread, so the step a victim verdict lands on can differ from the recording;
+motors are compared up to that point.
+
+    python replay.py <recording dir> [--realtime] [--tolerance 1e-4]
+"""
+
+import argparse
+import os
+import runpy
+import sys
+import time
+import types
+
+import numpy as np
+
+from mission_log import Mission
+
+CONTROLLER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resq_controller.py")
+SONAR_NAMES = ['so0', 'so1', 'so2', 'so3', 'so4', 'so5', 'so6', 'so7']
+WHEEL_SENSOR_NAMES = ['left wheel sensor', 'right wheel sensor']
+
+
+class ReplayRobot:
+    def __init__(self, mission, realtime=False):
+        self.mission = mission
+        self.steps = mission.steps_array()
+        self.realtime = realtime
+        self.index = 0
+        # Frame to show at each step: the last one recorded at or before it
+        self.frame_at = np.maximum.accumulate(self.steps["frame"]) if len(self.steps) else self.steps["frame"]
+        self.camera = ReplayCamera(self)
+        self.left = StubMotor()
+        self.right = StubMotor()
+        self.commands = np.zeros((len(self.steps), 2), dtype=np.float32)
+        self._devices = {"camera": self.camera, "left wheel": self.left, "right wheel": self.right}
+        for i, name in enumerate(SONAR_NAMES):
+            self._devices[name] = ReplaySensor(self, i)
+        if "wheels" in self.steps.dtype.names and not np.isnan(self.steps["wheels"]).all():
+            for i, name in enumerate(WHEEL_SENSOR_NAMES):
+                self._devices[name] = ReplaySensor(self, i, "wheels")
+
+    def getName(self):
+        return self.mission.meta.get("robot", "replay")
+
+    def getDevice(self, name):
+        # Devices the recording has no data for (e.g. wheel encoders) are absent, as on a robot without them
+        return self._devices.get(name)
+
+    def step(self, time_step):
+        # Commands given before this step correspond to the recorded row for it
+        if self.index < len(self.commands):
+            self.commands[self.index] = (self.left.velocity, self.right.velocity)
+        self.index += 1
+        if self.index >= len(self.steps):
+            return -1
+        if self.realtime:
+            time.sleep(time_step / 1000.0)
+        return 0
+
+
+class ReplayCamera:
+    def __init__(self, robot):
+        self.robot = robot
+
+    def enable(self, time_step):
+        pass
+
+    def getWidth(self):
+        return self.robot.mission.width
+
+    def getHeight(self):
+        return self.robot.mission.height
+
+    def getImage(self):
+        index = min(self.robot.index, len(self.robot.frame_at) - 1)
+        frame = self.robot.frame_at[index] if index >= 0 else -1
+        if frame < 0:
+            return bytes(self.getWidth() * self.getHeight() * 4)
+        return self.robot.mission.frame(int(frame))
+
+    def saveImage(self, path, quality):
+        return 0
+
+
+class ReplaySensor:
+    def __init__(self, robot, index, field="sonar"):
+        self.robot = robot
+        self.index = index
+        self.field = field
+
+    def enable(self, time_step):
+        pass
+
+    def getValue(self):
+        return float(self.robot.steps[self.field][min(self.robot.index, len(self.robot.steps) - 1), self.index])
+
+
+class StubMotor:
+    def __init__(self):
+        self.position = 0.0
+        self.velocity = 0.0
+
+    def setPosition(self, position):
+        self.position = position
+
+    def setVelocity(self, velocity):
+        self.velocity = velocity
+
+    def getVelocity(self):
+        return self.velocity
+
+
+def install_controller_module(robot):
+    """Make `from controller import Robot, Camera, Motor` return the replay stubs."""
+    module = types.ModuleType("controller")
+    module.Robot = lambda: robot
+    module.Camera = ReplayCamera
+    module.Motor = StubMotor
+    sys.modules["controller"] = module
+
+
+def first_victim_call(mission):
+    """1-based index of the first recorded Gemini answer that reported a victim (0 = none)."""
+    for i, verdict in enumerate(mission.verdicts, 1):
+        if verdict["victim"]:
+            return i
+    return 0
+
+
+def replay(path, realtime=False):
+    """Run the controller over a recording. Returns (robot, wall seconds)."""
+    mission = Mission(path)
+    robot = ReplayRobot(mission, realtime)
+    install_controller_module(robot)
+
+    os.environ["RESQ_FAKE_MODEL_DELAY"] = "0"
+    os.environ["RESQ_METRICS_PORT"] = "0"
+    os.environ["RESQ_METRICS_LOG"] = ""
+    os.environ["RESQ_EVENTS"] = ""
+    os.environ["RESQ_STREAM"] = "0"           # no ports to collide on when replays run side by side
+    os.environ.pop("RESQ_RECORD", None)
+    if mission.seed is not None:
+        os.environ["RESQ_SEED"] = str(mission.seed)
+    # Recordings made before the explorer existed patrolled with the random walk
+    os.environ["RESQ_NAV"] = mission.meta.get("nav", "wander")
+    # Screen with the detector the mission ran with; older recordings don't say, so skip HOG (and cv2)
+    os.environ["RESQ_LOCAL_DETECTOR"] = mission.meta.get("local_detector", "none")
+
+    import camera_streamer
+    camera_streamer.STREAM_ENABLED = False    # in case it was imported before RESQ_STREAM was set
+
+    # Answer like the recording did: clear until the call that found the victim
+    import detection_worker
+    fake_client = detection_worker.FakeClient
+    victim_after = first_victim_call(mission)
+    detection_worker.FakeClient = lambda delay=0.0: fake_client(delay, victim_after=victim_after)
+
+    sys.path.insert(0, os.path.dirname(CONTROLLER_SCRIPT))
+    start = time.perf_counter()
+    try:
+        controller = runpy.run_path(CONTROLLER_SCRIPT, run_name="__main__")
+    finally:
+        detection_worker.FakeClient = fake_client
+    for worker in (controller.get("detector"), controller.get("screener")):
+        if worker is not None:
+            worker.stop()
+    return robot, time.perf_counter() - start
+
+
+def compare(robot, tolerance):
+    """Index of the first step whose motor command differs from the recording, or None."""
+    recorded = robot.steps["motors"]
+    # Row 0 is recorded before the first step, so only rows 1.. reflect controller decisions
+    diff = np.abs(robot.commands[1:] - recorded[1:]).max(axis=1) > tolerance
+    mismatches = np.flatnonzero(diff)
+    return int(mismatches[0]) + 1 if len(mismatches) else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording")
+    parser.add_argument("--realtime", action="store_true", help="pace steps at TIME_STEP like Webots")
+    parser.add_argument("--tolerance", type=float, default=1e-4, help="max motor velocity difference")
+    args = parser.parse_args()
+
+    robot, wall = replay(args.recording, args.realtime)
+    steps = robot.index
+    sim_seconds = steps * robot.mission.time_step / 1000.0
+    print("=" * 50)
+    print(f"🎞️ Replayed {steps} steps in {wall:.2f}s ({steps / wall:.0f} steps/s, "
+          f"{sim_seconds / wall:.1f}x real time)")
+    mismatch = compare(robot, args.tolerance)
+    if mismatch is None:
+        print("✅ Motor commands match the recording")
+    else:
+        print(f"❌ Motor commands diverge at step {mismatch}: "
+              f"recorded {robot.steps['motors'][mismatch].tolist()}, replayed {robot.commands[mismatch].tolist()}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
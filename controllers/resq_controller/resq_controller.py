@@ -2,15 +2,26 @@ from controller import Robot, Camera, Motor
 import os
 import time as pytime
 import random
-from google import genai
-from google.genai import types
-import PIL.Image
-from camera_streamer import start_streaming, update_frame, set_ai_status
-
-# --- CONFIGURATION ---
-TIME_STEP = 64
-MAX_SPEED = 6.28
+from api_scheduler import (
+    PRIORITY_CONFIRM, PRIORITY_EARLY, PRIORITY_ROUTINE, REQUESTS_PER_DAY, REQUESTS_PER_MINUTE,
+    ApiScheduler, RateLimited, RequestDeferred,
+)
+from camera_streamer import METRICS_PORT, start_streaming, update_frame, set_ai_status
+from detection_worker import DetectionWorker, FakeClient
+from detectors import BATCH_MODE_MULTI, GeminiDetector, create_local_detector
+from engine import TIME_STEP, NavConfig, ResQController, ScanPlanner
+from event_store import EventStore
+from exploration import create_explorer
+from frame_buffer import capture_frame, latest_frame
+from frame_gate import FrameGate, dhash
+from genai_session import GenAISession
+import metrics
+from mission_log import MissionRecorder
+
+# --- CONFIGURATION (navigation and scan tuning live in engine.py) ---
 IMAGE_PATH = "rescue_view.jpg"
+# Debug/audit: also write each analyzed frame to IMAGE_PATH (set RESQ_SAVE_SNAPSHOTS=1)
+SAVE_SNAPSHOTS = os.environ.get("RESQ_SAVE_SNAPSHOTS") == "1"
 
 # --- API KEY (loaded from api_key.txt so it's never committed to git) ---
 _key_file = os.path.join(os.path.dirname(__file__), "api_key.txt")
@@ -22,35 +33,17 @@ else:
     print(f"⚠️ No api_key.txt found! Create it in: {_key_file}")
 
 # --- AI SETUP (new google.genai SDK) ---
-AI_AVAILABLE = False
-client = None
+# The client and model are set up on a background thread (genai_session.py); the
+# chosen model is cached in model_cache.json so restarts skip model discovery.
+# --- TEST MODE: set RESQ_FAKE_MODEL_DELAY=<seconds> to use a fake, offline model ---
+FAKE_MODEL_DELAY = os.environ.get("RESQ_FAKE_MODEL_DELAY")
 
-try:
-    client = genai.Client(api_key=API_KEY)
-    
-    print("🔍 Scanning for available AI models...")
-    chosen_model = None
-    for m in client.models.list():
-        name = m.name
-        if "flash" in name and "gemini" in name:
-            chosen_model = name
-            break
-    
-    if not chosen_model:
-        for m in client.models.list():
-            name = m.name
-            if "gemini" in name:
-                chosen_model = name
-                break
-    
-    if chosen_model:
-        print(f"✅ FOUND WORKING MODEL: {chosen_model}")
-        AI_AVAILABLE = True
-    else:
-        print("❌ NO MODELS FOUND.")
-        
-except Exception as e:
-    print(f"⚠️ AI Setup Error: {e}")
+if FAKE_MODEL_DELAY is not None:
+    genai_session = GenAISession(client=FakeClient(delay=float(FAKE_MODEL_DELAY)), model="fake-model")
+    print(f"🧪 TEST MODE: fake model with {float(FAKE_MODEL_DELAY):.1f}s latency")
+else:
+    genai_session = GenAISession(API_KEY)
+    genai_session.start()
 
 # --- ROBOT SETUP ---
 robot = Robot()
@@ -72,271 +65,325 @@ for name in ds_names:
     sensor.enable(TIME_STEP)
     ds.append(sensor)
 
-# --- API RATE LIMITING (Exponential Backoff) ---
-api_cooldown_until = 0
-api_backoff = 60
-MAX_BACKOFF = 600
-API_CALL_INTERVAL = 120
-api_consecutive_fails = 0
+# Wheel encoders feed the explorer's odometry; without them it integrates the motor commands
+wheel_sensors = [robot.getDevice('left wheel sensor'), robot.getDevice('right wheel sensor')]
+if None in wheel_sensors:
+    wheel_sensors = None
+else:
+    for sensor in wheel_sensors:
+        sensor.enable(TIME_STEP)
 
-def analyze_image():
-    """Analyze the saved camera image using Gemini AI."""
-    global api_cooldown_until, api_backoff, api_consecutive_fails
-    
-    if not AI_AVAILABLE or not client:
+# --- MISSION RECORDING / DETERMINISM ---
+# RESQ_RECORD=<dir> records sonar, motor commands, camera frames and AI verdicts for
+# offline replay (replay.py). RESQ_SEED fixes the navigation random source; a recording
+# always stores the seed it ran with so a replay makes the same choices.
+RECORD_DIR = os.environ.get("RESQ_RECORD")
+RECORD_FRAME_EVERY = int(os.environ.get("RESQ_RECORD_FRAME_EVERY", "1"))
+RANDOM_SEED = os.environ.get("RESQ_SEED")
+RANDOM_SEED = int(RANDOM_SEED) if RANDOM_SEED else (random.randrange(2 ** 31) if RECORD_DIR else None)
+rng = random.Random(RANDOM_SEED)
+
+recorder = None
+if RECORD_DIR:
+    recorder = MissionRecorder(RECORD_DIR, camera.getWidth(), camera.getHeight(), TIME_STEP,
+                               seed=RANDOM_SEED, robot=robot.getName(), frame_every=RECORD_FRAME_EVERY)
+    print(f"💾 Recording mission to {RECORD_DIR} (seed {RANDOM_SEED})")
+
+# --- PATROL MODE ---
+# RESQ_NAV=wander (default): the original random walk | explore: steer toward the nearest
+# unexplored frontier of an occupancy grid built from sonar + odometry (exploration.py)
+NAV_MODE = os.environ.get("RESQ_NAV", "wander")
+explorer = create_explorer(NAV_MODE)
+if recorder:
+    recorder.meta["nav"] = NAV_MODE
+
+# --- EVENT STORE (event_store.py) ---
+# Every detection attempt and mission milestone goes to an append-only SQLite database
+# (WAL), written in batches by a background thread. RESQ_EVENTS=<path>, "" = off.
+# Query it with `python event_store.py resq_events.db --minutes 10`.
+EVENTS_DB = os.environ.get("RESQ_EVENTS", os.path.join(os.path.dirname(__file__), "resq_events.db"))
+events = None
+if EVENTS_DB:
+    try:
+        events = EventStore(EVENTS_DB, robot=robot.getName()).start()
+        events.record_event("start", step=0, nav=NAV_MODE, seed=RANDOM_SEED, record=RECORD_DIR)
+    except Exception as e:
+        print(f"⚠️ Event store not started ({EVENTS_DB}): {e}")
+
+# --- API RATE LIMITING (token-bucket scheduler, see api_scheduler.py) ---
+# Requests are paced against the RPM/RPD budget up front instead of waiting for 429s.
+# Quota use survives restarts in api_quota.json (not used in test mode).
+API_RPM = int(os.environ.get("RESQ_GEMINI_RPM", REQUESTS_PER_MINUTE))
+API_RPD = int(os.environ.get("RESQ_GEMINI_RPD", REQUESTS_PER_DAY))
+API_QUOTA_STATE = None if FAKE_MODEL_DELAY is not None else os.path.join(os.path.dirname(__file__), "api_quota.json")
+
+scheduler = ApiScheduler(API_RPM, API_RPD, state_path=API_QUOTA_STATE)
+
+# --- DETECTORS ---
+# A cheap local detector screens frames on the CPU; only candidate frames (plus a
+# rare safety-net scan) are escalated to Gemini for confirmation.
+# RESQ_LOCAL_DETECTOR=hog (default) | none
+LOCAL_DETECTOR = os.environ.get("RESQ_LOCAL_DETECTOR", "hog")
+if recorder:
+    recorder.meta["local_detector"] = LOCAL_DETECTOR
+
+# --- FRAME-CHANGE GATE ---
+# Near-identical views reuse a cached verdict instead of spending quota (e.g. while
+# stuck or spinning); a big scene change while patrolling triggers an analysis before
+# the next scheduled scan.
+frame_gate = FrameGate()
+
+# --- BATCHED SCANS ---
+# With RESQ_GEMINI_BATCH=N > 1, routine scans send the last N frames sampled across the
+# scan interval (e.g. different headings during a spin) in one request, with one verdict
+# per frame. RESQ_GEMINI_BATCH_MODE = multi (N images) | mosaic (one tiled image).
+GEMINI_BATCH_SIZE = max(1, int(os.environ.get("RESQ_GEMINI_BATCH", "1")))
+GEMINI_BATCH_MODE = os.environ.get("RESQ_GEMINI_BATCH_MODE", BATCH_MODE_MULTI)
+local_detector = create_local_detector(None if LOCAL_DETECTOR == "none" else LOCAL_DETECTOR)
+if local_detector:
+    print(f"👀 Local detector '{local_detector.name}' screening frames; Gemini confirms candidates")
+
+# --- METRICS (Prometheus text on METRICS_PORT, ring-buffer log in METRICS_LOG; see metrics.py) ---
+METRICS_LOG = os.environ.get("RESQ_METRICS_LOG", os.path.join(os.path.dirname(__file__), "metrics_ring.log"))
+
+STEP_SECONDS = metrics.histogram("resq_step_seconds", "Controller work per step, between robot.step() calls")
+STEP_INTERVAL_SECONDS = metrics.histogram(
+    "resq_step_interval_seconds", "Wall time between robot.step() returns",
+    (0.016, 0.032, 0.048, 0.064, 0.08, 0.1, 0.15, 0.25, 0.5, 1.0))
+STEP_OVERRUNS = metrics.counter("resq_step_overruns_total", "Steps whose controller work exceeded TIME_STEP")
+MODEL_CALL_SECONDS = metrics.histogram(
+    "resq_model_call_seconds", "Gemini request latency by outcome (incl. retries)", metrics.MODEL_BUCKETS, ("outcome",))
+MODEL_CALLS = metrics.counter("resq_model_calls_total", "Detection attempts by outcome", ("outcome",))
+
+
+def robot_context():
+    """Step, navigation state and odometry pose to file a detection under (read from any thread)."""
+    state = resq.state
+    pose = explorer.pose if explorer is not None else None
+    return {"step": state.step, "state": resq.state_name,
+            "pose": (pose.x, pose.y, pose.theta) if pose is not None else None}
+
+
+def record_model_call(outcome, started=None, verdict=None, frame=None, **fields):
+    """Count one detection attempt (and its latency if a request was made), and file it in the event store."""
+    MODEL_CALLS.labels(outcome).inc()
+    if started is not None:
+        elapsed = pytime.perf_counter() - started
+        MODEL_CALL_SECONDS.labels(outcome).observe(elapsed)
+        fields["latency"] = round(elapsed, 3)
+    metrics.log_event("model", outcome=outcome, **fields)
+    if events:
+        events.record_detection(
+            source=verdict.source if verdict is not None else "gemini", outcome=outcome,
+            victim=verdict is not None and verdict.victim, score=verdict.score if verdict is not None else None,
+            text=verdict.text if verdict is not None else None, frame=frame, **robot_context(), **fields)
+
+
+def record_screen(result):
+    """Local detector result (screener thread) -> event store."""
+    verdict = result.verdict
+    if result.error:
+        outcome, detail = "error", {"error": type(result.error).__name__}
+    else:
+        outcome, detail = "candidate" if result.victim else "clear", {}
+    events.record_detection(
+        source=getattr(verdict, "source", local_detector.name), outcome=outcome, victim=result.victim,
+        score=getattr(verdict, "score", None), latency=round(result.latency, 4), frame=result.frame,
+        **robot_context(), **detail)
+
+
+def analyze_image(frames, priority=PRIORITY_ROUTINE):
+    """
+    Analyze a camera frame, or a list of frames in one batched request, using Gemini AI.
+    Runs on the detection worker thread. Returns the victim Verdict if any frame shows a person.
+    """
+    if not genai_session.available:
         return False
+    gemini = GeminiDetector(genai_session.client, genai_session.model)
+    if not isinstance(frames, list):
+        frames = [frames]
     
-    current_time = pytime.time()
-    if current_time < api_cooldown_until:
-        wait_remaining = int(api_cooldown_until - current_time)
-        if wait_remaining % 15 == 0:
-            print(f"⏳ API cooldown: {wait_remaining}s remaining...")
-        set_ai_status("cooldown")
-        return False
+    # Views analyzed recently reuse their cached verdict; only the rest go to Gemini
+    hashes = [dhash(frame) for frame in frames]
+    verdicts = [frame_gate.cache.lookup(h) for h in hashes]
+    pending = [i for i, verdict in enumerate(verdicts) if verdict is None]
+    if not pending:
+        print("♻️ View unchanged since a recent analysis, reusing its verdict")
+        frame_gate.mark_analyzed(hashes[-1])
+        index = next((i for i, v in enumerate(verdicts) if v.victim), len(verdicts) - 1)
+        record_model_call("cached", verdict=verdicts[index], frame=frames[index], frames=len(frames))
+        return verdicts[index]
     
-    print("📸 Analyzing scene...")
-    set_ai_status("scanning")
+    def request():
+        if len(pending) > 1:
+            print(f"📸 Analyzing scene ({len(pending)} frames in one {GEMINI_BATCH_MODE} request)...")
+        else:
+            print("📸 Analyzing scene...")
+        set_ai_status("scanning")
+        return gemini.detect_batch([frames[i] for i in pending], GEMINI_BATCH_MODE)
     
+    started = pytime.perf_counter()
     try:
-        if not os.path.exists(IMAGE_PATH):
-            print("  ❌ No image file found")
-            return False
-        
-        img = PIL.Image.open(IMAGE_PATH)
-        img.thumbnail((1024, 1024))
-        
-        prompt = (
-            "You are a rescue robot's vision system. "
-            "Look carefully at this image. "
-            "Is there ANY person or human figure visible ANYWHERE in the image? "
-            "This includes standing, sitting, lying down, partially hidden, or far away. "
-            "Even a small figure of a person counts. "
-            "Answer with ONLY 'YES' or 'NO', then a brief reason."
-        )
-        
-        response = client.models.generate_content(
-            model=chosen_model,
-            contents=[prompt, img]
-        )
-        
-        if not response.text:
-            print("  ⚠️ Empty response from AI")
-            set_ai_status("scanning")
-            return False
-        
-        text = response.text.strip()
-        print(f"🤖 AI Full Response: {text}")
-        result = text.upper()
-        
-        # Reset backoff on success
-        api_backoff = 60
-        api_consecutive_fails = 0
-        
-        if "YES" in result:
-            set_ai_status("detected", victim=True, response=text)
-            return True
-        else:
-            set_ai_status("scanning", victim=False, response=text)
-            return False
-        
-    except Exception as e:
-        error_str = str(e)
-        if "429" in error_str or "quota" in error_str.lower() or "rate" in error_str.lower():
-            api_consecutive_fails += 1
-            api_backoff = min(api_backoff * 2, MAX_BACKOFF)
-            api_cooldown_until = pytime.time() + api_backoff
-            print(f"⚠️ Rate limited! Backing off for {api_backoff}s (attempt #{api_consecutive_fails})")
+        fresh = scheduler.call(request, priority)
+    except RequestDeferred as e:
+        record_model_call("deferred", frame=frames[-1], reason=e.reason, priority=priority)
+        if e.reason == "cooldown":
+            print(f"⏳ API cooldown: {int(e.wait)}s remaining...")
             set_ai_status("cooldown")
-            if api_consecutive_fails >= 3:
-                print(f"   💡 Your daily API quota may be exhausted.")
         else:
-            print(f"  Analysis Error: {e}")
-            set_ai_status("scanning")
+            print(f"⏸️ Scan deferred to stay within the API budget: {e}")
         return False
-
-# =============================================
-# SENSOR THRESHOLDS
-# =============================================
-OBSTACLE_THRESHOLD = 80
-CLOSE_THRESHOLD = 300
-
-# =============================================
-# NAVIGATION STATE MACHINE
-# =============================================
-STATE_PATROL = 0
-STATE_AVOID = 1
-STATE_REVERSE = 2
-STATE_SPIN = 3
-
-state = STATE_PATROL
-state_timer = 0
-avoid_counter = 0
-spin_direction = 1
-patrol_speed = 0.5
-spin_retry_count = 0
-
-AVOID_STUCK_LIMIT = 50
-REVERSE_DURATION = 25
-SPIN_DURATION = 30
-
-def has_obstacle(value):
-    return value > OBSTACLE_THRESHOLD
-
-def is_close(value):
-    return value > CLOSE_THRESHOLD
+    except RateLimited as e:
+        record_model_call("rate_limited", started, frame=frames[-1], backoff=round(e.backoff))
+        print(f"⚠️ Rate limited! Backing off for {e.backoff:.0f}s (attempt #{e.consecutive})")
+        set_ai_status("cooldown")
+        if e.consecutive >= 3:
+            print(f"   💡 Your daily API quota may be exhausted.")
+        return False
+    except Exception as e:
+        record_model_call("error", started, frame=frames[-1], error=type(e).__name__)
+        print(f"  Analysis Error: {e}")
+        if getattr(e, "code", None) == 404:   # model retired/renamed: re-discover
+            genai_session.invalidate_model()
+        set_ai_status("scanning")
+        return False
+    
+    answered = [v for v in fresh if v is not None and v.text]
+    if not answered:
+        record_model_call("empty", started, frame=frames[-1])
+        print("  ⚠️ Empty response from AI")
+        return False
+    
+    for verdict in answered:
+        print(f"🤖 AI Full Response: {verdict.text}")
+    
+    for i, verdict in zip(pending, fresh):
+        if verdict is not None:
+            verdicts[i] = verdict
+            frame_gate.cache.store(hashes[i], verdict)
+    frame_gate.mark_analyzed(hashes[-1])
+    
+    victim = next((v for v in verdicts if v is not None and v.victim), None)
+    verdict = victim or answered[-1]
+    if recorder:
+        recorder.record_verdict(recorder.steps, verdict.source, verdict.victim, verdict.text)
+    record_model_call("victim" if victim else "clear", started, verdict=verdict, frame=frames[verdicts.index(verdict)],
+                      frames=len(pending), priority=priority)
+    if victim:
+        set_ai_status("detected", victim=True, response=victim.text)
+        return victim
+    set_ai_status("scanning", victim=False, response=answered[-1].text)
+    return answered[-1]
 
 # --- START CAMERA STREAM ---
-start_streaming()
+# Returns at once; the server comes up in the background (see camera_streamer.StreamReadiness)
+start_streaming(robot_id=robot.getName())
+
+# --- START METRICS ---
+if METRICS_PORT:
+    metrics.start_http_server(METRICS_PORT)
+if METRICS_LOG:
+    metrics.open_ring_log(METRICS_LOG)
+
+# --- START DETECTION WORKER (Gemini calls run off the control loop) ---
+detector = DetectionWorker(analyze_image)
+detector.start()
+screener = None
+if local_detector:
+    screener = DetectionWorker(local_detector.detect, name="resq-screener",
+                               on_result=record_screen if events else None)
+    screener.start()
+planner = ScanPlanner(detector, scheduler, frame_gate, screener, batch_size=GEMINI_BATCH_SIZE,
+                      snapshot=(lambda: camera.saveImage(IMAGE_PATH, 100)) if SAVE_SNAPSHOTS else None)
+
+# --- NAVIGATION + VICTIM HANDLING (engine.py) ---
+def on_victim():
+    set_ai_status("detected", victim=True, response="VICTIM CONFIRMED - Robot stopped")
+    if events:
+        events.record_event("victim", **robot_context())
+
+
+resq = ResQController(NavConfig(), rng, planner, on_victim=on_victim, explorer=explorer)
+sonar_values = [0.0] * len(ds)
+wheel_positions = None
+
+
+def read_wheel_travel():
+    """Wheel rotation (rad) since the last step, or None without two encoder readings."""
+    global wheel_positions
+    if wheel_sensors is None:
+        return None
+    previous, wheel_positions = wheel_positions, [sensor.getValue() for sensor in wheel_sensors]
+    if previous is None or any(p != p for p in previous + wheel_positions):  # NaN before the first sample
+        return None
+    return (wheel_positions[0] - previous[0], wheel_positions[1] - previous[1])
 
 # Tell the dashboard we're alive
 set_ai_status("scanning")
 
+API_USED_TODAY = metrics.gauge("resq_api_requests_today", "Gemini requests counted against today's quota")
+API_DEFERRED = metrics.counter("resq_api_deferred_total", "Requests held back by the API scheduler")
+CACHE_LOOKUPS = metrics.counter("resq_verdict_cache_lookups_total", "Verdict cache lookups by result", ("result",))
+DETECTOR_DROPPED = metrics.counter("resq_detector_frames_dropped_total", "Frames replaced while waiting for a worker", ("worker",))
+EVENT_ROWS = metrics.counter("resq_event_rows_total", "Event store rows written, or dropped with the writer behind", ("result",))
+
+
+def collect_controller_metrics():
+    quota = scheduler.stats()
+    API_USED_TODAY.set(quota["used_today"])
+    API_DEFERRED.set_total(quota["deferred"])
+    cache = frame_gate.cache.stats()
+    CACHE_LOOKUPS.labels("hit").set_total(cache["hits"])
+    CACHE_LOOKUPS.labels("miss").set_total(cache["misses"])
+    for worker in (detector, screener):
+        if worker is not None:
+            DETECTOR_DROPPED.labels(worker.name).set_total(worker.dropped)
+    if events:
+        EVENT_ROWS.labels("written").set_total(events.written)
+        EVENT_ROWS.labels("dropped").set_total(events.dropped)
+
+
+metrics.add_collector(collect_controller_metrics)
+
+_step_returned = None
+
+
+def step_robot():
+    """robot.step() plus loop timing: work done since the last step, and the step-to-step interval."""
+    global _step_returned
+    called = pytime.perf_counter()
+    if _step_returned is not None:
+        work = called - _step_returned
+        STEP_SECONDS.observe(work)
+        if work > TIME_STEP / 1000.0:
+            STEP_OVERRUNS.inc()
+    if recorder:
+        recorder.record_step(sonar_values, left_motor.getVelocity(), right_motor.getVelocity(), latest_frame(),
+                             wheel_positions)
+    result = robot.step(TIME_STEP)
+    if result == -1 and recorder:
+        recorder.close()
+    if result == -1 and events:
+        events.record_event("end", step=resq.state.step, victim=resq.victim_found)
+        events.close()
+    now = pytime.perf_counter()
+    if _step_returned is not None:
+        STEP_INTERVAL_SECONDS.observe(now - _step_returned)
+    _step_returned = now
+    return result
+
 # --- MAIN LOOP ---
 print("🤖 ResQ Agent Patrol Started...")
-step_counter = 0
-victim_found = False
 
-while robot.step(TIME_STEP) != -1:
-    
-    if victim_found:
-        left_motor.setVelocity(0)
-        right_motor.setVelocity(0)
+while step_robot() != -1:
+    sonar_values = [sensor.getValue() for sensor in ds]
+    wheel_travel = read_wheel_travel()
+    if resq.victim_found:
+        left_speed, right_speed = resq.step(sonar_values, wheel_travel=wheel_travel)
         update_frame(camera)  # Keep streaming even when stopped
-        continue
-
-    step_counter += 1
-    update_frame(camera)
-    
-    # --- AI ANALYSIS (periodic) ---
-    if step_counter % API_CALL_INTERVAL == 0:
-        camera.saveImage(IMAGE_PATH, 100)
-        if analyze_image():
-            print("=" * 50)
-            print("🚨🚨🚨 VICTIM LOCATED! STOPPING ROBOT! 🚨🚨🚨")
-            print("=" * 50)
-            victim_found = True
-            set_ai_status("detected", victim=True, response="VICTIM CONFIRMED - Robot stopped")
-            continue
-
-    # --- READ SENSORS ---
-    sv = [ds[i].getValue() for i in range(8)]
-    
-    if step_counter % 500 == 0:
-        readable = ', '.join(f'{v:.0f}' for v in sv)
-        state_name = ['PATROL', 'AVOID', 'REVERSE', 'SPIN'][state]
-        print(f"📡 Sensors: [{readable}]  State: {state_name}  Step: {step_counter}")
-    
-    obstacle_left = has_obstacle(sv[0]) or has_obstacle(sv[1])
-    obstacle_front_left = has_obstacle(sv[2]) or has_obstacle(sv[3])
-    obstacle_front_right = has_obstacle(sv[4]) or has_obstacle(sv[5])
-    obstacle_right = has_obstacle(sv[6]) or has_obstacle(sv[7])
-    obstacle_front = obstacle_front_left or obstacle_front_right
-    
-    close_front = is_close(sv[2]) or is_close(sv[3]) or is_close(sv[4]) or is_close(sv[5])
-    
-    left_blocked = sv[0] + sv[1] + sv[2] + sv[3]
-    right_blocked = sv[4] + sv[5] + sv[6] + sv[7]
-    
-    front_all_clear = not obstacle_front
-
-    # =============================================
-    # STATE MACHINE
-    # =============================================
-    
-    if state == STATE_PATROL:
-        if front_all_clear and not close_front:
-            wander = random.uniform(-0.05, 0.05)
-            left_speed = MAX_SPEED * (patrol_speed + wander)
-            right_speed = MAX_SPEED * (patrol_speed - wander)
-            avoid_counter = 0
-        elif obstacle_front or close_front:
-            state = STATE_AVOID
-            avoid_counter = 0
-            spin_direction = -1 if left_blocked < right_blocked else 1
-            continue
-        elif obstacle_left and not obstacle_right:
-            left_speed = MAX_SPEED * 0.5
-            right_speed = MAX_SPEED * 0.3
-        elif obstacle_right and not obstacle_left:
-            left_speed = MAX_SPEED * 0.3
-            right_speed = MAX_SPEED * 0.5
-        else:
-            left_speed = MAX_SPEED * patrol_speed
-            right_speed = MAX_SPEED * patrol_speed
-        
-        left_motor.setVelocity(left_speed)
-        right_motor.setVelocity(right_speed)
-    
-    elif state == STATE_AVOID:
-        avoid_counter += 1
-        
-        if avoid_counter > AVOID_STUCK_LIMIT:
-            print("🚧 Stuck! Reversing...")
-            state = STATE_REVERSE
-            state_timer = REVERSE_DURATION
-            spin_direction = random.choice([-1, 1])
-            continue
-        
-        if front_all_clear and not close_front:
-            state = STATE_PATROL
-            avoid_counter = 0
-            continue
-        
-        if close_front:
-            turn_speed = MAX_SPEED * 0.5
-            if spin_direction == 1:
-                left_speed = turn_speed
-                right_speed = -turn_speed
-            else:
-                left_speed = -turn_speed
-                right_speed = turn_speed
-        else:
-            if spin_direction == 1:
-                left_speed = MAX_SPEED * 0.4
-                right_speed = -MAX_SPEED * 0.1
-            else:
-                left_speed = -MAX_SPEED * 0.1
-                right_speed = MAX_SPEED * 0.4
-        
-        left_motor.setVelocity(left_speed)
-        right_motor.setVelocity(right_speed)
-    
-    elif state == STATE_REVERSE:
-        state_timer -= 1
-        left_motor.setVelocity(-MAX_SPEED * 0.4)
-        right_motor.setVelocity(-MAX_SPEED * 0.4)
-        
-        if state_timer <= 0:
-            print(f"🔄 Reversing done, spinning {'left' if spin_direction == -1 else 'right'}...")
-            state = STATE_SPIN
-            state_timer = SPIN_DURATION + random.randint(0, 20)
-            spin_retry_count = 0
-    
-    elif state == STATE_SPIN:
-        state_timer -= 1
-        
-        spin_speed = MAX_SPEED * 0.5
-        if spin_direction == 1:
-            left_motor.setVelocity(spin_speed)
-            right_motor.setVelocity(-spin_speed)
-        else:
-            left_motor.setVelocity(-spin_speed)
-            right_motor.setVelocity(spin_speed)
-        
-        if state_timer <= 0:
-            if front_all_clear and not close_front:
-                print("✅ Path clear, resuming patrol!")
-                state = STATE_PATROL
-                avoid_counter = 0
-                spin_retry_count = 0
-            else:
-                spin_retry_count += 1
-                if spin_retry_count > 3:
-                    print("⚡ Forcing patrol to escape spin loop!")
-                    state = STATE_PATROL
-                    avoid_counter = 0
-                    spin_retry_count = 0
-                else:
-                    spin_direction *= -1
-                    state_timer = SPIN_DURATION + random.randint(0, 15)
-                    print(f"🔄 Still blocked, trying other direction... (retry {spin_retry_count}/3)")
+    else:
+        frame = capture_frame(camera)  # One getImage() per step, shared by stream + AI
+        update_frame(camera, frame)
+        left_speed, right_speed = resq.step(sonar_values, frame, wheel_travel)
+    left_motor.setVelocity(left_speed)
+    right_motor.setVelocity(right_speed)
@@ -0,0 +1,213 @@
+"""
+ResQ Headless Simulator
+=======================
+A 2D grid world with a Pioneer 3-DX-like robot, for running the controller
+engine (engine.py) without Webots:
+
+    GridWorld   - occupancy grid (True = wall/obstacle), differential-drive
+                  kinematics, collision check against the robot's footprint,
+                  8 ray-marched sonars at the so0..so7 headings, and a map of
+                  the cells the robot has driven over (coverage)
+    run_headless - drive a ResQController in a world for N steps
+
+The sonar model is an approximation of the Webots one: each sensor casts
+SONAR_RAYS rays across its cone and reports the nearest hit through the same
+linear lookup table (1024 at contact, 0 at SONAR_RANGE). All rays are marched
+in one NumPy pass, so a step costs tens of microseconds and a controller runs
+thousands of steps per second.
+
+    python sim_world.py --steps 20000 --seed 1 [--nav explore]
+"""
+
+import argparse
+import math
+import random
+import time
+
+import numpy as np
+
+from exploration import AXLE_LENGTH, ROBOT_RADIUS, SONAR_ANGLES, SONAR_MAX_VALUE, SONAR_RANGE, WHEEL_RADIUS
+
+# --- Configuration ---
+CELL_SIZE = 0.1                 # Metres per grid cell
+SONAR_CONE = math.radians(15)
+SONAR_RAYS = 3                  # Rays per sensor across its cone
+ARENA_SIZE = (20.0, 20.0)       # Metres
+OBSTACLE_DENSITY = 0.04         # Fraction of the arena covered by random blocks
+
+
+class GridWorld:
+    """Occupancy grid plus one robot pose (x, y in metres, theta in radians)."""
+
+    def __init__(self, grid, cell_size=CELL_SIZE):
+        self.grid = np.asarray(grid, dtype=bool)
+        self.cell_size = cell_size
+        self.rows, self.cols = self.grid.shape
+        self._padded = np.pad(self.grid, 1, constant_values=True)
+        self._inv_cell = 1.0 / cell_size
+        self.x = self.y = self.theta = 0.0
+        self.collisions = 0             # Blocked steps
+        self.collision_events = 0       # Runs of blocked steps (bumps)
+        self.distance = 0.0
+        self.wheel_travel = (0.0, 0.0)   # Radians per wheel in the last drive() (ideal encoders)
+        self.visited = np.zeros_like(self.grid)
+        self._free_cells = max(1, int((~self.grid).sum()))
+        self._blocked = False
+        # Ray geometry relative to the robot: (sensors * rays) angles, samples along each ray
+        offsets = np.linspace(-SONAR_CONE / 2, SONAR_CONE / 2, SONAR_RAYS) if SONAR_RAYS > 1 else np.zeros(1)
+        self._ray_angles = (SONAR_ANGLES[:, None] + offsets[None, :]).ravel()
+        self._samples = np.arange(ROBOT_RADIUS, ROBOT_RADIUS + SONAR_RANGE, cell_size)
+        ring = np.linspace(0, 2 * math.pi, 16, endpoint=False)
+        self._footprint = np.stack([np.cos(ring), np.sin(ring)], axis=1) * ROBOT_RADIUS
+        reach = int(ROBOT_RADIUS / cell_size)
+        dr, dc = np.mgrid[-reach:reach + 1, -reach:reach + 1]
+        inside = dr ** 2 + dc ** 2 <= reach ** 2
+        self._disc_rows, self._disc_cols = dr[inside], dc[inside]
+
+    @classmethod
+    def random(cls, size=ARENA_SIZE, density=OBSTACLE_DENSITY, cell_size=CELL_SIZE, rng=None):
+        """Walled arena with random rectangular blocks; the robot is placed on a free spot."""
+        rng = rng if rng is not None else random.Random()
+        cols, rows = int(size[0] / cell_size), int(size[1] / cell_size)
+        grid = np.zeros((rows, cols), dtype=bool)
+        grid[0, :] = grid[-1, :] = grid[:, 0] = grid[:, -1] = True
+        target = density * rows * cols
+        covered = 0
+        while covered < target:
+            h, w = rng.randint(3, 15), rng.randint(3, 15)
+            r, c = rng.randint(1, rows - h - 1), rng.randint(1, cols - w - 1)
+            covered += w * h - grid[r:r + h, c:c + w].sum()
+            grid[r:r + h, c:c + w] = True
+        world = cls(grid, cell_size)
+        world.place_randomly(rng)
+        return world
+
+    def place_randomly(self, rng, attempts=1000):
+        for _ in range(attempts):
+            x = rng.uniform(0, self.cols * self.cell_size)
+            y = rng.uniform(0, self.rows * self.cell_size)
+            if not self.collides(x, y):
+                self.x, self.y, self.theta = x, y, rng.uniform(-math.pi, math.pi)
+                self._visit()
+                return
+        raise RuntimeError("no free spot for the robot")
+
+    def _occupied(self, xs, ys):
+        """Occupancy at metre coordinates; outside the grid counts as occupied."""
+        # Index a copy of the grid with a one-cell occupied border, so clipping replaces bounds checks
+        # (np.minimum/np.maximum: np.clip's dispatch overhead dominates at these array sizes)
+        cols = np.minimum(np.maximum(xs * self._inv_cell + 1.0, 0), self.cols + 1).astype(np.intp)
+        rows = np.minimum(np.maximum(ys * self._inv_cell + 1.0, 0), self.rows + 1).astype(np.intp)
+        return self._padded[rows, cols]
+
+    def collides(self, x, y):
+        points = self._footprint + (x, y)
+        return bool(self._occupied(np.append(points[:, 0], x), np.append(points[:, 1], y)).any())
+
+    def _visit(self):
+        rows = np.minimum(np.maximum(self._disc_rows + int(self.y * self._inv_cell), 0), self.rows - 1)
+        cols = np.minimum(np.maximum(self._disc_cols + int(self.x * self._inv_cell), 0), self.cols - 1)
+        self.visited[rows, cols] = True
+
+    def coverage(self):
+        """Fraction of the free cells the robot's footprint has passed over."""
+        return float((self.visited & ~self.grid).sum()) / self._free_cells
+
+    def sonar(self):
+        """The 8 sonar values at the current pose."""
+        angles = self.theta + self._ray_angles
+        xs = self.x + np.cos(angles)[:, None] * self._samples
+        ys = self.y + np.sin(angles)[:, None] * self._samples
+        hits = self._occupied(xs, ys)
+        first = hits.argmax(axis=1)
+        dist = np.where(hits[np.arange(len(first)), first], self._samples[first] - ROBOT_RADIUS, SONAR_RANGE)
+        nearest = dist.reshape(len(SONAR_ANGLES), -1).min(axis=1)
+        return np.clip(SONAR_MAX_VALUE * (1.0 - nearest / SONAR_RANGE), 0.0, SONAR_MAX_VALUE)
+
+    def drive(self, left, right, dt):
+        """Apply wheel velocities (rad/s) for dt seconds. Returns False if the move was blocked."""
+        v = WHEEL_RADIUS * (left + right) / 2.0
+        w = WHEEL_RADIUS * (right - left) / AXLE_LENGTH
+        theta = self.theta + w * dt
+        mid = self.theta + w * dt / 2.0
+        x = self.x + v * dt * math.cos(mid)
+        y = self.y + v * dt * math.sin(mid)
+        self.theta = (theta + math.pi) % (2 * math.pi) - math.pi
+        if self.collides(x, y):
+            # Blocked: the robot still turns in place, the translation is lost
+            spin = w * dt * AXLE_LENGTH / (2.0 * WHEEL_RADIUS)
+            self.wheel_travel = (-spin, spin)
+            self.collisions += 1
+            if not self._blocked:
+                self.collision_events += 1
+                self._blocked = True
+            return False
+        self._blocked = False
+        self.wheel_travel = (left * dt, right * dt)
+        self.distance += math.hypot(x - self.x, y - self.y)
+        self.x, self.y = x, y
+        self._visit()
+        return True
+
+
+def run_headless(controller, world, steps, time_step=None, coverage_every=0):
+    """
+    Step `controller` in `world` for `steps` steps. Returns run statistics; with
+    `coverage_every` they include "coverage_trace", the coverage every that many steps.
+    """
+    from engine import STATE_REVERSE, TIME_STEP
+    dt = (time_step or TIME_STEP) / 1000.0
+    state = controller.state
+    stuck_events = 0
+    trace = []
+    start = time.perf_counter()
+    for step in range(steps):
+        if coverage_every and step % coverage_every == 0:
+            trace.append(world.coverage())
+        before = state.state
+        left, right = controller.step(world.sonar(), wheel_travel=world.wheel_travel)
+        if state.state == STATE_REVERSE and before != STATE_REVERSE:
+            stuck_events += 1
+        world.drive(left, right, dt)
+    wall = time.perf_counter() - start
+    stats = {
+        "steps": steps,
+        "sim_seconds": steps * dt,
+        "wall_seconds": wall,
+        "steps_per_second": steps / wall if wall else float("inf"),
+        "coverage": world.coverage(),
+        "stuck_events": stuck_events,
+        "collisions": world.collision_events,
+        "blocked_steps": world.collisions,
+        "distance_m": world.distance,
+    }
+    if coverage_every:
+        stats["coverage_trace"] = trace
+    return stats
+
+
+def main():
+    from engine import NavConfig, ResQController
+    from exploration import NAV_MODES, create_explorer
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--density", type=float, default=OBSTACLE_DENSITY)
+    parser.add_argument("--nav", choices=NAV_MODES, default="wander", help="patrol mode")
+    parser.add_argument("--verbose", action="store_true", help="print the controller's state changes")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    world = GridWorld.random(density=args.density, rng=rng)
+    controller = ResQController(NavConfig(), rng=random.Random(args.seed), verbose=args.verbose,
+                                explorer=create_explorer(args.nav))
+    stats = run_headless(controller, world, args.steps)
+    print(f"{stats['steps']} steps ({stats['sim_seconds'] / 60:.1f} simulated min) in {stats['wall_seconds']:.2f}s: "
+          f"{stats['steps_per_second']:.0f} steps/s, {stats['sim_seconds'] / stats['wall_seconds']:.0f}x real time")
+    print(f"coverage {stats['coverage']:.1%}, distance {stats['distance_m']:.1f} m, {stats['collisions']} collisions "
+          f"({stats['blocked_steps']} blocked steps), {stats['stuck_events']} stuck, final state {controller.state_name}")
+
+
+if __name__ == "__main__":
+    main()
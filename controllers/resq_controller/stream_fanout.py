@@ -0,0 +1,159 @@
+"""
+ResQ Stream Fan-out
+===================
+Per-client send slots for the camera WebSocket servers.
+
+Each connected dashboard gets its own sender task and a small "latest frames
+only" queue. The broadcaster just drops messages into every client's slot
+and never awaits a send, so one slow viewer on a bad link only loses frames
+itself instead of stalling everyone else.
+"""
+
+import asyncio
+import itertools
+import time
+from collections import OrderedDict
+
+import metrics
+
+# --- Configuration ---
+MAX_CLIENT_QUEUE = 1          # Frames waiting per client; older ones are dropped
+RTT_PROBE_INTERVAL = 5.0      # Seconds between WebSocket ping probes
+RTT_PROBE_TIMEOUT = 5.0
+
+_SEND_SECONDS = metrics.histogram("resq_stream_send_seconds", "Time one WebSocket send takes to complete")
+
+
+class StreamClient:
+    """One viewer: its negotiated protocol, pending messages, sender task and stats."""
+
+    def __init__(self, websocket, protocol=1, max_queue=MAX_CLIENT_QUEUE):
+        self.websocket = websocket
+        self.protocol = protocol
+        self.subscriptions = None     # optional per-client filter (used by the hub)
+        self.codec = None             # inter-frame codec the viewer decodes (None = JPEG frames)
+        self.video_index = None       # last video frame index queued, to spot gaps a decoder can't skip
+        self._frames = OrderedDict()  # key -> message; one pending frame per key
+        self._max_queue = max(1, max_queue)
+        self._statuses = OrderedDict()  # key -> latest status; never queued behind frames
+        self._keys = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+        self._sending = False
+        self.closed = False
+        self.connected_at = time.time()
+
+        # Stats
+        self.sent = 0
+        self.dropped = 0
+        self.bytes_sent = 0
+        self.send_ms = None           # smoothed time one send() takes to complete
+        self.rtt_ms = None            # last WebSocket ping round trip
+
+    # --- Producer side (called by the broadcaster, never blocks) ---
+
+    def push_frame(self, message, key=None):
+        """
+        Queue a frame. Frames pushed with the same `key` (e.g. a robot ID)
+        replace each other, so each source keeps only its newest frame.
+        """
+        if self.closed:
+            return
+        if key is None:
+            key = next(self._keys)
+        elif key in self._frames:
+            del self._frames[key]
+            self.dropped += 1
+        while len(self._frames) >= self._max_queue:
+            self._frames.popitem(last=False)
+            self.dropped += 1
+        self._frames[key] = message
+        self._wakeup.set()
+
+    def push_status(self, message, key=None):
+        if self.closed:
+            return
+        self._statuses.pop(key, None)
+        self._statuses[key] = message
+        self._wakeup.set()
+
+    def discard(self, key):
+        """Drop the pending frame and status queued under `key` (e.g. a robot unsubscribed from)."""
+        self._frames.pop(key, None)
+        self._statuses.pop(key, None)
+
+    @property
+    def pending_frames(self):
+        return len(self._frames)
+
+    @property
+    def backlog(self):
+        return len(self._frames) + len(self._statuses)
+
+    @property
+    def idle(self):
+        return not self._sending and self.backlog == 0
+
+    # --- Consumer side ---
+
+    def start(self):
+        self._tasks.append(asyncio.ensure_future(self._send_loop()))
+        if hasattr(self.websocket, "ping"):
+            self._tasks.append(asyncio.ensure_future(self._probe_loop()))
+
+    def stop(self):
+        self.closed = True
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    async def _send_loop(self):
+        while not self.closed:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while not self.closed and (self._statuses or self._frames):
+                if self._statuses:
+                    _, message = self._statuses.popitem(last=False)
+                else:
+                    _, message = self._frames.popitem(last=False)
+                self._sending = True
+                start = time.perf_counter()
+                try:
+                    await self.websocket.send(message)
+                except Exception:
+                    self.closed = True
+                    break
+                finally:
+                    self._sending = False
+                elapsed = (time.perf_counter() - start) * 1000.0
+                _SEND_SECONDS.observe(elapsed / 1000.0)
+                self.send_ms = elapsed if self.send_ms is None else 0.8 * self.send_ms + 0.2 * elapsed
+                self.sent += 1
+                self.bytes_sent += len(message)
+
+    async def _probe_loop(self):
+        while not self.closed:
+            await asyncio.sleep(RTT_PROBE_INTERVAL)
+            start = time.perf_counter()
+            try:
+                pong = await self.websocket.ping()
+                await asyncio.wait_for(pong, RTT_PROBE_TIMEOUT)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                continue
+            self.rtt_ms = (time.perf_counter() - start) * 1000.0
+
+    def stats(self):
+        address = getattr(self.websocket, "remote_address", None)
+        return {
+            "address": f"{address[0]}:{address[1]}" if address else None,
+            "protocol": self.protocol,
+            "codec": self.codec or "jpeg",
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "bytes": self.bytes_sent,
+            "backlog": self.backlog,
+            "send_ms": round(self.send_ms, 2) if self.send_ms is not None else None,
+            "rtt_ms": round(self.rtt_ms, 2) if self.rtt_ms is not None else None,
+        }
@@ -0,0 +1,112 @@
+"""
+ResQ Plain-HTTP Stream Endpoints
+================================
+HTTP/1.1 plumbing for the camera streamer's MJPEG and snapshot endpoints,
+for viewers that cannot speak the dashboard WebSocket protocol (wall
+monitors, <img> tags, ffmpeg/VLC, curl polling):
+
+    GET /stream.mjpg    multipart/x-mixed-replace; one JPEG part per frame
+    GET /snapshot.jpg   the latest frame; ETag + If-None-Match -> 304
+
+Both send the JPEG bytes the streamer already encoded, unchanged: no
+re-encode, no base64, no JSON. The routes themselves live in
+camera_streamer.py; this module only parses requests and frames responses.
+"""
+
+import asyncio
+
+# --- Configuration ---
+BOUNDARY = "resqframe"
+MAX_HEADER_BYTES = 8192
+REQUEST_TIMEOUT = 10.0          # Seconds to wait for a (next) request on a connection
+
+REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 503: "Service Unavailable"}
+
+
+class HttpRequest:
+    __slots__ = ("method", "path", "version", "headers")
+
+    def __init__(self, method, path, version, headers):
+        self.method = method
+        self.path = path
+        self.version = version
+        self.headers = headers      # lower-cased names
+
+    @property
+    def keep_alive(self):
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+
+async def read_request(reader, timeout=REQUEST_TIMEOUT):
+    """Next request on the connection, or None on EOF/timeout/garbage. Bodies are not read."""
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout)
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+        return None
+    if len(head) > MAX_HEADER_BYTES:
+        return None
+    lines = head.decode("latin-1").split("\r\n")
+    parts = lines[0].split()
+    if len(parts) != 3:
+        return None
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    method, target, version = parts
+    return HttpRequest(method.upper(), target.split("?", 1)[0], version, headers)
+
+
+def response_head(status, headers=(), keep_alive=False):
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+    lines += [f"{name}: {value}" for name, value in headers]
+    lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def etag_matches(if_none_match, etag):
+    """RFC 9110 weak comparison of an If-None-Match header against one ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+
+MJPEG_HEAD = [
+    ("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}"),
+    ("Cache-Control", "no-cache, no-store"),
+    ("Pragma", "no-cache"),
+]
+
+
+class MjpegViewer:
+    """
+    Looks like a WebSocket to stream_fanout.StreamClient, but writes each
+    frame as one multipart part; status text messages are not sent.
+    """
+
+    def __init__(self, writer):
+        self._writer = writer
+        self.remote_address = writer.get_extra_info("peername")
+
+    async def send(self, message):
+        if isinstance(message, str):
+            return
+        self._writer.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(message)}\r\n\r\n"
+                           .encode("latin-1"))
+        self._writer.write(message)
+        self._writer.write(b"\r\n")
+        await self._writer.drain()
@@ -0,0 +1,299 @@
+"""
+ResQ Streaming Hub
+==================
+One server for many robots. Controllers publish already-encoded frames and
+AI status to the hub over a local TCP socket; dashboards open a single
+WebSocket to the hub and subscribe to one or more robot IDs.
+
+    python stream_hub.py [--ws-port 8765] [--publish-port 8766]
+
+(defaults from RESQ_HUB_WS_PORT / RESQ_HUB_PUBLISH_PORT). The controllers'
+own MJPEG port (RESQ_HTTP_PORT) defaults to 8767, so they don't collide.
+
+Then start each controller with RESQ_HUB=127.0.0.1:8766 (and optionally
+RESQ_ROBOT_ID=<name>; the Webots robot name is used by default).
+
+Publisher wire format (controller -> hub), one message per record:
+    !BBI header (kind, robot-id length, payload length) + robot id + payload
+    kind 1 = JPEG frame bytes, kind 2 = status JSON (UTF-8)
+
+Dashboard protocol (hub -> browser), chosen by the hello message
+    {"type": "hello", "protocol": N, "robots": ["robot1", ...]}
+(`robots` omitted = all robots; {"type": "subscribe", "robots": [...]} changes it later):
+    v1 (default): JSON per frame {"robot", "frame": <base64>, "victim", "ai_status", ...}
+    v3: binary frames prefixed with [1-byte id length][robot id], status as
+        {"type": "status", "robot", ...} JSON, and a {"type": "robots"} list on change.
+    Other versions fall back to v1.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import struct
+import time
+
+from stream_fanout import StreamClient
+
+# --- Configuration ---
+HUB_WS_PORT = int(os.environ.get("RESQ_HUB_WS_PORT", "8765"))            # dashboards
+HUB_PUBLISH_PORT = int(os.environ.get("RESQ_HUB_PUBLISH_PORT", "8766"))  # controllers (RESQ_HUB)
+HUB_CLIENT_QUEUE_DEPTH = 64      # pending frames per dashboard (one per robot at most)
+
+# --- Publisher wire format ---
+MSG_FRAME = 1
+MSG_STATUS = 2
+_HEADER = struct.Struct("!BBI")
+
+# --- Dashboard protocol ---
+PROTOCOL_JSON = 1
+PROTOCOL_MULTI_BINARY = 3
+
+
+def pack_message(kind, robot_id, payload):
+    """Encode one publisher record."""
+    rid = robot_id.encode('utf-8')
+    return _HEADER.pack(kind, len(rid), len(payload)) + rid + payload
+
+
+async def read_message(reader):
+    """Read one publisher record -> (kind, robot_id, payload). Raises IncompleteReadError on EOF."""
+    kind, rid_len, size = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    rid = await reader.readexactly(rid_len)
+    payload = await reader.readexactly(size)
+    return kind, rid.decode('utf-8'), payload
+
+
+class RobotFeed:
+    """Latest frame and status published by one robot."""
+
+    __slots__ = ("robot_id", "jpeg", "status", "frames", "online", "last_seen")
+
+    def __init__(self, robot_id):
+        self.robot_id = robot_id
+        self.jpeg = None
+        self.status = {}
+        self.frames = 0
+        self.online = True
+        self.last_seen = time.time()
+
+
+class StreamHub:
+    """Routes robot feeds to subscribed dashboards."""
+
+    def __init__(self, client_queue_depth=HUB_CLIENT_QUEUE_DEPTH, verbose=True):
+        self.verbose = verbose
+        self.robots = {}              # robot_id -> RobotFeed
+        self.clients = {}             # websocket -> StreamClient
+        self.client_queue_depth = client_queue_depth
+        self.frames_in = 0
+        self.bytes_in = 0
+
+    # --- Publisher side ---
+
+    async def handle_publisher(self, reader, writer):
+        robot_ids = set()
+        try:
+            while True:
+                kind, robot_id, payload = await read_message(reader)
+                self.frames_in += kind == MSG_FRAME
+                self.bytes_in += len(payload)
+                if robot_id not in robot_ids:
+                    robot_ids.add(robot_id)
+                    self._robot_online(robot_id)
+                feed = self.robots[robot_id]
+                feed.last_seen = time.time()
+                if kind == MSG_FRAME:
+                    feed.jpeg = payload
+                    feed.frames += 1
+                    self.publish_frame(feed)
+                elif kind == MSG_STATUS:
+                    status = json.loads(payload)
+                    status.pop("type", None)
+                    status.pop("protocol", None)
+                    feed.status = status
+                    self.publish_status(feed)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            print(f"⚠️ Hub publisher error: {e}")
+        finally:
+            writer.close()
+            for robot_id in robot_ids:
+                self.robots[robot_id].online = False
+                if self.verbose:
+                    print(f"🤖 Robot '{robot_id}' disconnected from hub")
+            if robot_ids:
+                self._publish_robot_list()
+
+    def _robot_online(self, robot_id):
+        feed = self.robots.get(robot_id)
+        if feed is None:
+            feed = self.robots[robot_id] = RobotFeed(robot_id)
+        feed.online = True
+        if self.verbose:
+            print(f"🤖 Robot '{robot_id}' publishing to hub ({len(self.robots)} robot(s))")
+        self._publish_robot_list()
+
+    # --- Dashboard side ---
+
+    def add_client(self, websocket, client):
+        self.clients[websocket] = client
+
+    def remove_client(self, websocket):
+        client = self.clients.pop(websocket, None)
+        if client is not None:
+            client.stop()
+
+    def _wants(self, client, robot_id):
+        return client.subscriptions is None or robot_id in client.subscriptions
+
+    def publish_frame(self, feed):
+        legacy = binary = None
+        for websocket, client in list(self.clients.items()):
+            if client.closed:
+                self.remove_client(websocket)
+                continue
+            if not self._wants(client, feed.robot_id):
+                continue
+            if client.protocol >= PROTOCOL_MULTI_BINARY:
+                if binary is None:
+                    binary = _binary_frame(feed)
+                client.push_frame(binary, key=feed.robot_id)
+            else:
+                if legacy is None:
+                    legacy = _legacy_message(feed)
+                client.push_frame(legacy, key=feed.robot_id)
+
+    def publish_status(self, feed):
+        message = None
+        for client in list(self.clients.values()):
+            if client.protocol >= PROTOCOL_MULTI_BINARY and self._wants(client, feed.robot_id):
+                if message is None:
+                    message = _status_message(feed)
+                client.push_status(message, key=feed.robot_id)
+
+    def _publish_robot_list(self):
+        message = self.robot_list_message()
+        for client in list(self.clients.values()):
+            if client.protocol >= PROTOCOL_MULTI_BINARY:
+                client.push_status(message, key="robots")
+
+    def robot_list_message(self):
+        return json.dumps({
+            "type": "robots",
+            "robots": [
+                {"robot": f.robot_id, "online": f.online, "frames": f.frames}
+                for f in self.robots.values()
+            ],
+        })
+
+    def apply_hello(self, client, data):
+        """Apply a hello/subscribe message and queue the catch-up messages."""
+        if data.get("type") == "hello":
+            try:
+                requested = int(data.get("protocol", PROTOCOL_JSON))
+            except (TypeError, ValueError):
+                requested = PROTOCOL_JSON
+            client.protocol = PROTOCOL_MULTI_BINARY if requested >= PROTOCOL_MULTI_BINARY else PROTOCOL_JSON
+        robots = data.get("robots")
+        client.subscriptions = set(robots) if robots else None
+        for robot_id in list(self.robots):
+            if not self._wants(client, robot_id):
+                client.discard(robot_id)   # queued before the change
+
+        # Catch the client up with the latest state of everything it watches
+        if client.protocol >= PROTOCOL_MULTI_BINARY:
+            client.push_status(self.robot_list_message(), key="robots")
+        for feed in list(self.robots.values()):
+            if not self._wants(client, feed.robot_id):
+                continue
+            if client.protocol >= PROTOCOL_MULTI_BINARY:
+                client.push_status(_status_message(feed), key=feed.robot_id)
+                if feed.jpeg:
+                    client.push_frame(_binary_frame(feed), key=feed.robot_id)
+            elif feed.jpeg:
+                client.push_frame(_legacy_message(feed), key=feed.robot_id)
+
+    async def ws_handler(self, websocket):
+        client = StreamClient(websocket, PROTOCOL_JSON, max_queue=self.client_queue_depth)
+        self.add_client(websocket, client)
+        client.start()
+        try:
+            print(f"📡 Dashboard connected to hub! ({len(self.clients)} client(s))")
+            async for message in websocket:
+                if not isinstance(message, str):
+                    continue
+                try:
+                    data = json.loads(message)
+                except ValueError:
+                    continue
+                if isinstance(data, dict) and data.get("type") in ("hello", "subscribe"):
+                    self.apply_hello(client, data)
+        except Exception:
+            pass
+        finally:
+            self.remove_client(websocket)
+            print(f"📡 Dashboard disconnected from hub. ({len(self.clients)} client(s))")
+
+    def stats(self):
+        return {
+            "robots": len(self.robots),
+            "online": sum(1 for f in self.robots.values() if f.online),
+            "frames_in": self.frames_in,
+            "bytes_in": self.bytes_in,
+            "clients": [c.stats() for c in list(self.clients.values())],
+        }
+
+
+def _binary_frame(feed):
+    rid = feed.robot_id.encode('utf-8')
+    return bytes((len(rid),)) + rid + feed.jpeg
+
+
+def _status_message(feed):
+    message = {"type": "status", "robot": feed.robot_id, "online": feed.online}
+    message.update(feed.status)
+    return json.dumps(message)
+
+
+def _legacy_message(feed):
+    message = {"robot": feed.robot_id, "frame": base64.b64encode(feed.jpeg).decode('utf-8')}
+    message.update(feed.status)
+    return json.dumps(message)
+
+
+async def run_hub(ws_port=HUB_WS_PORT, publish_port=HUB_PUBLISH_PORT, host="0.0.0.0"):
+    """Serve publishers on `publish_port` (localhost only) and dashboards on `ws_port`."""
+    try:
+        from websockets.asyncio.server import serve
+    except ImportError:
+        try:
+            import websockets
+            serve = websockets.serve
+        except ImportError:
+            print("❌ 'websockets' not installed! Run: pip install websockets")
+            return
+
+    hub = StreamHub()
+    publishers = await asyncio.start_server(hub.handle_publisher, "127.0.0.1", publish_port)
+    print(f"🛰️ Hub accepting robots on tcp://127.0.0.1:{publish_port}")
+    async with publishers, serve(hub.ws_handler, host, ws_port):
+        print(f"✅ Hub stream server READY on ws://localhost:{ws_port}")
+        await asyncio.Future()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ResQ multi-robot streaming hub")
+    parser.add_argument("--ws-port", type=int, default=HUB_WS_PORT)
+    parser.add_argument("--publish-port", type=int, default=HUB_PUBLISH_PORT)
+    args = parser.parse_args()
+    try:
+        asyncio.run(run_hub(args.ws_port, args.publish_port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
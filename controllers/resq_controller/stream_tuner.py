@@ -0,0 +1,103 @@
+"""
+ResQ Adaptive Stream Tuner
+==========================
+Adjusts stream JPEG quality, resolution and frame skip from measured send
+latency, client backlog/drops and encode time.
+
+When the link is congested it degrades in this order: quality, then
+resolution, then frame rate. When there is headroom it restores them in
+reverse order. The configured quality and frame skip are the limits: the
+tuner never streams better or faster than them.
+"""
+
+import time
+
+# --- Configuration ---
+MIN_QUALITY = 30
+QUALITY_STEP = 10
+MIN_SCALE = 0.5               # Smallest downscale factor (0.5 = half width/height)
+SCALE_STEP = 0.75             # Multiply/divide the scale by this per adjustment
+MAX_EVERY_N_STEPS = 8         # Slowest frame rate: one frame every N steps
+TARGET_SEND_MS = 40.0         # Slowest client's send time we consider healthy
+ENCODE_BUDGET_MS = 8.0        # Encode time per frame we are willing to spend
+ADJUST_INTERVAL = 1.0         # Seconds between adjustments
+
+
+class StreamTuner:
+    """Picks quality / scale / frame skip; starts from the defaults and never goes above them."""
+
+    def __init__(self, quality, every_n_steps, min_quality=MIN_QUALITY, max_quality=None,
+                 min_scale=MIN_SCALE, max_every_n=MAX_EVERY_N_STEPS):
+        self.min_quality = min(min_quality, quality)
+        self.max_quality = quality if max_quality is None else min(max_quality, quality)
+        self.min_scale = min_scale
+        self.base_every_n = every_n_steps
+        self.max_every_n = max(max_every_n, every_n_steps)
+
+        self.quality = quality
+        self.scale = 1.0
+        self.every_n = every_n_steps
+        self.reason = "default"
+        self._last_adjust = 0.0
+        self._last_dropped = 0
+
+    def settings(self):
+        return {
+            "adaptive": True,
+            "quality": self.quality,
+            "scale": round(self.scale, 3),
+            "every_n_steps": self.every_n,
+            "reason": self.reason,
+        }
+
+    def update(self, send_ms, backlog, dropped, encode_ms, now=None):
+        """
+        Feed the latest measurements; adjusts at most once per ADJUST_INTERVAL.
+        `send_ms` is the slowest client's send time, `backlog` its queued messages,
+        `dropped` the total frames dropped so far. Returns True if settings changed.
+        """
+        now = time.monotonic() if now is None else now
+        if now - self._last_adjust < ADJUST_INTERVAL:
+            return False
+        self._last_adjust = now
+
+        new_drops = dropped - self._last_dropped
+        self._last_dropped = dropped
+        send_ms = send_ms or 0.0
+        encode_ms = encode_ms or 0.0
+
+        if send_ms > TARGET_SEND_MS or new_drops > 0 or backlog > 1:
+            return self._degrade("network")
+        if encode_ms > ENCODE_BUDGET_MS:
+            return self._degrade("encode")
+        if send_ms < TARGET_SEND_MS / 2 and encode_ms < ENCODE_BUDGET_MS / 2:
+            return self._improve()
+        return False
+
+    def _degrade(self, reason):
+        before = (self.quality, self.scale, self.every_n)
+        if reason == "network" and self.quality > self.min_quality:
+            self.quality = max(self.min_quality, self.quality - QUALITY_STEP)
+        elif self.scale > self.min_scale:
+            self.scale = max(self.min_scale, self.scale * SCALE_STEP)
+        elif self.every_n < self.max_every_n:
+            self.every_n += 1
+        elif self.quality > self.min_quality:
+            self.quality = max(self.min_quality, self.quality - QUALITY_STEP)
+        if (self.quality, self.scale, self.every_n) == before:
+            return False
+        self.reason = reason
+        return True
+
+    def _improve(self):
+        before = (self.quality, self.scale, self.every_n)
+        if self.every_n > self.base_every_n:
+            self.every_n -= 1
+        elif self.scale < 1.0:
+            self.scale = min(1.0, self.scale / SCALE_STEP)
+        elif self.quality < self.max_quality:
+            self.quality = min(self.max_quality, self.quality + QUALITY_STEP)
+        if (self.quality, self.scale, self.every_n) == before:
+            return False
+        self.reason = "headroom"
+        return True
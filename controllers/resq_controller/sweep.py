@@ -0,0 +1,144 @@
+"""
+ResQ Navigation Parameter Sweep
+===============================
+Runs the navigation state machine (engine.py) headless in random grid worlds
+(sim_world.py) for every combination of the given NavConfig parameters, on
+a process pool across all cores.
+
+    python sweep.py --param obstacle_threshold=60,80,120,200 \\
+                    --param spin_duration=15,30,45 --episodes 64 --steps 3000
+
+Every parameter set runs the same episode seeds (same worlds and start poses),
+so differences between sets come from the parameters and not from the luck
+of the draw. Each episode reports coverage per simulated minute, stuck events
+(AVOID -> REVERSE), collisions and distance. One row per episode is written
+to a columnar .npz file (one array per column; `np.load` or
+`pandas.DataFrame(dict(np.load(path)))` reads it back), and a per-set summary
+is printed, best coverage first.
+"""
+
+import argparse
+import itertools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from engine import NavConfig, ResQController
+from exploration import NAV_MODES, create_explorer
+from sim_world import ARENA_SIZE, OBSTACLE_DENSITY, GridWorld, run_headless
+from sonar import OBSTACLE_THRESHOLD
+
+# --- Configuration ---
+EPISODE_STEPS = 3000            # ~3.2 simulated minutes at TIME_STEP=64
+EPISODES = 32                   # Episodes (worlds) per parameter set
+RESULTS_PATH = "sweep_results.npz"
+METRICS = ("coverage", "coverage_per_min", "stuck_events", "collisions", "blocked_steps", "distance_m")
+
+_INT_PARAMS = {"avoid_stuck_limit", "reverse_duration", "spin_duration"}
+
+
+def parse_param(text):
+    """'name=v1,v2,...' -> (name, [values]) for a NavConfig field."""
+    name, _, values = text.partition("=")
+    name = name.strip()
+    if name not in NavConfig.__slots__:
+        raise argparse.ArgumentTypeError(f"unknown parameter {name!r} (one of: {', '.join(NavConfig.__slots__)})")
+    cast = int if name in _INT_PARAMS else float
+    try:
+        return name, [cast(v) for v in values.split(",") if v.strip()]
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"bad value for {name}: {e}")
+
+
+def parameter_sets(params):
+    """Cartesian product of {name: [values]} as a list of dicts."""
+    names = list(params)
+    return [dict(zip(names, combo)) for combo in itertools.product(*(params[n] for n in names))]
+
+
+def run_episode(task):
+    """Worker: one episode. `task` is (set index, params, seed, steps, size, density, nav mode)."""
+    index, params, seed, steps, size, density, nav = task
+    world = GridWorld.random(size=size, density=density, rng=random.Random(seed))
+    controller = ResQController(NavConfig(**params), rng=random.Random(seed + 1), verbose=False,
+                                explorer=create_explorer(nav))
+    stats = run_headless(controller, world, steps)
+    stats["coverage_per_min"] = stats["coverage"] / (stats["sim_seconds"] / 60.0)
+    return index, seed, stats
+
+
+def run_sweep(params, episodes=EPISODES, steps=EPISODE_STEPS, size=ARENA_SIZE, density=OBSTACLE_DENSITY,
+              seed=0, workers=None, nav="wander"):
+    """Run every parameter set for `episodes` seeds. Returns (parameter sets, column dict)."""
+    sets = parameter_sets(params)
+    tasks = [(i, p, seed + e * 7919, steps, size, density, nav) for i, p in enumerate(sets) for e in range(episodes)]
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(tasks) // (workers * 8))
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for done, row in enumerate(pool.map(run_episode, tasks, chunksize=chunksize), 1):
+            rows.append(row)
+            if done % max(1, len(tasks) // 10) == 0:
+                print(f"  {done}/{len(tasks)} episodes")
+
+    columns = {"set": np.array([r[0] for r in rows], dtype=np.int32),
+               "seed": np.array([r[1] for r in rows], dtype=np.int64)}
+    for name in params:
+        columns[name] = np.array([sets[r[0]][name] for r in rows])
+    for metric in METRICS:
+        columns[metric] = np.array([r[2][metric] for r in rows], dtype=np.float64)
+    return sets, columns
+
+
+def summarize(sets, columns):
+    """Per-set means, best coverage per minute first."""
+    summary = []
+    for i, params in enumerate(sets):
+        mask = columns["set"] == i
+        summary.append((params, {m: float(columns[m][mask].mean()) for m in METRICS}))
+    summary.sort(key=lambda item: -item[1]["coverage_per_min"])
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--param", action="append", type=parse_param, default=[],
+                        help="NavConfig field and values, e.g. obstacle_threshold=60,80,120 (repeatable)")
+    parser.add_argument("--episodes", type=int, default=EPISODES, help="episodes per parameter set")
+    parser.add_argument("--steps", type=int, default=EPISODE_STEPS, help="steps per episode")
+    parser.add_argument("--arena", default=f"{ARENA_SIZE[0]:g}x{ARENA_SIZE[1]:g}", help="arena size in metres, WxH")
+    parser.add_argument("--density", type=float, default=OBSTACLE_DENSITY, help="fraction of the arena blocked")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--nav", choices=NAV_MODES, default="wander", help="patrol mode")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--out", default=RESULTS_PATH, help="columnar results file (.npz)")
+    args = parser.parse_args()
+
+    explorer = create_explorer(args.nav)
+    default_threshold = explorer.obstacle_threshold if explorer is not None else OBSTACLE_THRESHOLD
+    params = dict(args.param) or {"obstacle_threshold": [default_threshold]}
+    size = tuple(float(v) for v in args.arena.split("x"))
+    sets = parameter_sets(params)
+    workers = args.workers or os.cpu_count() or 1
+    print(f"🧪 {len(sets)} parameter sets x {args.episodes} episodes x {args.steps} steps on {workers} processes")
+
+    start = time.perf_counter()
+    sets, columns = run_sweep(params, args.episodes, args.steps, size, args.density, args.seed, workers, args.nav)
+    wall = time.perf_counter() - start
+    np.savez(args.out, **columns)
+    total_steps = len(columns["set"]) * args.steps
+    print(f"✅ {len(columns['set'])} episodes in {wall:.1f}s ({total_steps / wall:,.0f} steps/s), results in {args.out}")
+
+    names = list(params)
+    print(" ".join(f"{n:>18}" for n in names) + f" {'cover/min':>9} {'stuck':>6} {'collide':>7} {'dist m':>7}")
+    for params_set, means in summarize(sets, columns):
+        print(" ".join(f"{params_set[n]:>18g}" for n in names)
+              + f" {means['coverage_per_min']:>9.2%} {means['stuck_events']:>6.1f}"
+              f" {means['collisions']:>7.1f} {means['distance_m']:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
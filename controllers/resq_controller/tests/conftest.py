@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The controller modules import each other by bare name, as Webots runs them from this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,158 @@
+import json
+
+import pytest
+
+from api_scheduler import (
+    BASE_BACKOFF, PACE_BURST, PRIORITY_CONFIRM, PRIORITY_ROUTINE,
+    ApiScheduler, FakeClock, RateLimited, RequestDeferred,
+)
+
+
+class ApiError(Exception):
+    def __init__(self, code, message=""):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+def _scheduler(clock, **kwargs):
+    # rng=0.5 makes the backoff jitter zero
+    return ApiScheduler(clock=clock, sleep=clock.sleep, rng=lambda: 0.5, **kwargs)
+
+
+def test_minute_bucket_refills_over_time():
+    clock = FakeClock()
+    scheduler = _scheduler(clock, rpm=6, rpd=1000)
+    for _ in range(6):
+        scheduler.acquire(PRIORITY_CONFIRM)
+    with pytest.raises(RequestDeferred) as deferred:
+        scheduler.acquire(PRIORITY_CONFIRM)
+    assert deferred.value.reason == "minute budget"
+    assert deferred.value.wait == pytest.approx(10.0)
+
+    clock.advance(9.0)
+    assert not scheduler.ready(PRIORITY_CONFIRM)
+    clock.advance(1.0)
+    scheduler.acquire(PRIORITY_CONFIRM)
+    assert scheduler.stats()["granted"] == 7
+
+
+def test_routine_requests_leave_the_last_token_for_confirmations():
+    clock = FakeClock()
+    scheduler = _scheduler(clock, rpm=2, rpd=1000)
+    scheduler.acquire(PRIORITY_ROUTINE)
+    assert not scheduler.ready(PRIORITY_ROUTINE)
+    scheduler.acquire(PRIORITY_CONFIRM)
+
+
+def test_pace_bucket_limits_routine_bursts():
+    clock = FakeClock()
+    scheduler = _scheduler(clock, rpm=1000, rpd=360, spread_hours=1.0)  # one pace token per 10 s
+    for _ in range(PACE_BURST):
+        scheduler.acquire(PRIORITY_ROUTINE)
+    with pytest.raises(RequestDeferred) as deferred:
+        scheduler.acquire(PRIORITY_ROUTINE)
+    assert deferred.value.reason == "daily pacing"
+    assert deferred.value.wait == pytest.approx(10.0)
+    scheduler.acquire(PRIORITY_CONFIRM)     # confirmations skip the pace bucket
+    clock.advance(10.0)
+    scheduler.acquire(PRIORITY_ROUTINE)
+
+
+def test_daily_reserve_is_kept_for_confirmations():
+    clock = FakeClock()
+    scheduler = _scheduler(clock, rpm=1000, rpd=10, spread_hours=0.001)
+    for _ in range(9):
+        scheduler.acquire(PRIORITY_ROUTINE)
+        clock.advance(1.0)
+    assert not scheduler.ready(PRIORITY_ROUTINE)
+    scheduler.acquire(PRIORITY_CONFIRM)
+    with pytest.raises(RequestDeferred) as deferred:
+        scheduler.acquire(PRIORITY_CONFIRM)
+    assert deferred.value.reason == "daily quota used"
+
+
+def test_rate_limit_starts_a_doubling_cooldown():
+    clock = FakeClock()
+    scheduler = _scheduler(clock, rpm=1000, rpd=1000)
+
+    def rejected():
+        raise ApiError(429, "RESOURCE_EXHAUSTED")
+
+    with pytest.raises(RateLimited) as limited:
+        scheduler.call(rejected, PRIORITY_CONFIRM)
+    assert limited.value.backoff == pytest.approx(2 * BASE_BACKOFF)
+    assert scheduler.cooldown_remaining() == pytest.approx(2 * BASE_BACKOFF)
+    with pytest.raises(RequestDeferred) as deferred:
+        scheduler.acquire(PRIORITY_CONFIRM)
+    assert deferred.value.reason == "cooldown"
+
+    clock.advance(2 * BASE_BACKOFF)
+    with pytest.raises(RateLimited) as limited:
+        scheduler.call(rejected, PRIORITY_CONFIRM)
+    assert limited.value.consecutive == 2
+    assert limited.value.backoff == pytest.approx(4 * BASE_BACKOFF)
+
+    clock.advance(4 * BASE_BACKOFF)
+    assert scheduler.call(lambda: "ok", PRIORITY_CONFIRM) == "ok"
+    assert scheduler.consecutive_fails == 0
+
+
+def test_rate_limit_honours_server_retry_delay():
+    clock = FakeClock()
+    scheduler = _scheduler(clock, rpm=1000, rpd=1000)
+
+    def rejected():
+        raise ApiError(429, "{'retryDelay': '900s'}")
+
+    with pytest.raises(RateLimited) as limited:
+        scheduler.call(rejected, PRIORITY_CONFIRM)
+    assert limited.value.backoff == pytest.approx(900.0)
+
+
+def test_transient_errors_are_retried_with_fake_sleep():
+    clock = FakeClock()
+    scheduler = _scheduler(clock, rpm=1000, rpd=1000)
+    outcomes = [ApiError(503), ApiError(503), "ok"]
+
+    def flaky():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    start = clock()
+    assert scheduler.call(flaky, PRIORITY_CONFIRM) == "ok"
+    assert scheduler.retries == 2
+    assert scheduler.used_today == 3
+    assert clock() - start == pytest.approx(1.0 + 2.0)
+
+
+def test_quota_state_survives_a_restart(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "quota.json")
+    scheduler = _scheduler(clock, rpm=1000, rpd=100, state_path=path)
+    for _ in range(3):
+        scheduler.acquire(PRIORITY_ROUTINE)
+    scheduler.record_rate_limited()
+    cooldown = scheduler.cooldown_until
+
+    clock.advance(30.0)
+    restarted = _scheduler(clock, rpm=1000, rpd=100, state_path=path)
+    assert restarted.used_today == 3
+    assert restarted.cooldown_until == cooldown
+    assert restarted.consecutive_fails == 1
+    assert restarted.cooldown_remaining() == pytest.approx(2 * BASE_BACKOFF - 30.0)
+    assert restarted.stats()["pace_tokens"] < PACE_BURST
+
+    clock.advance(86400.0)
+    next_day = _scheduler(clock, rpm=1000, rpd=100, state_path=path)
+    assert next_day.used_today == 0
+
+
+def test_unreadable_quota_state_is_ignored(tmp_path):
+    path = tmp_path / "quota.json"
+    path.write_text("{not json")
+    scheduler = _scheduler(FakeClock(), state_path=str(path))
+    assert scheduler.used_today == 0
+    scheduler.acquire(PRIORITY_CONFIRM)
+    assert json.loads(path.read_text())["used_today"] == 1
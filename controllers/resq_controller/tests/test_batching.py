@@ -0,0 +1,82 @@
+import io
+import time
+
+import PIL.Image
+import pytest
+
+from detection_worker import FakeClient, _FakeResponse
+from detectors import BATCH_MODE_MOSAIC, BATCH_MODE_MULTI, GeminiDetector, parse_batch_answer
+from frame_buffer import Frame
+
+
+def _frame(seq, brightness):
+    width, height = 64, 48
+    return Frame(seq, bytes([brightness, brightness, brightness, 255]) * (width * height), width, height, time.time())
+
+
+def _jpeg(part):
+    inline = getattr(part, "inline_data", None)
+    return inline.data if inline is not None else part
+
+
+class _LookingModels:
+    """Answers from the images it was sent: a bright image shows a 'person'."""
+
+    def generate_content(self, model, contents, **kwargs):
+        images = [_jpeg(part) for part in contents[1:] if not isinstance(part, str)]
+        return _FakeResponse("\n".join(
+            f"{i}: YES - bright" if PIL.Image.open(io.BytesIO(jpeg)).convert("L").getpixel((0, 0)) > 128
+            else f"{i}: NO - dark"
+            for i, jpeg in enumerate(images, 1)
+        ))
+
+
+class _LookingClient:
+    def __init__(self):
+        self.models = _LookingModels()
+
+
+class _ShortClient(FakeClient):
+    """Answers only the listed frames (1-based), in the order given."""
+
+    def __init__(self, answers):
+        super().__init__(delay=0.0)
+        self.answers = answers
+
+    def batch_answer_for(self, call_number, count):
+        return "\n".join(f"{i}: {answer} - fake" for i, answer in self.answers)
+
+
+def _victims(verdicts):
+    return [None if v is None else v.victim for v in verdicts]
+
+
+@pytest.mark.parametrize("bright", [0, 2, 4])
+def test_each_verdict_belongs_to_the_frame_it_judged(bright):
+    frames = [_frame(i, 230 if i == bright else 20) for i in range(5)]
+    verdicts = GeminiDetector(_LookingClient(), "fake").detect_batch(frames, BATCH_MODE_MULTI)
+    assert _victims(verdicts) == [i == bright for i in range(5)]
+
+
+@pytest.mark.parametrize("mode", [BATCH_MODE_MULTI, BATCH_MODE_MOSAIC])
+def test_fake_client_victim_lands_on_the_last_frame(mode):
+    client = FakeClient(delay=0.0, victim_after=1)
+    verdicts = GeminiDetector(client, "fake").detect_batch([_frame(i, 20) for i in range(4)], mode)
+    assert _victims(verdicts) == [False, False, False, True]
+    assert client.calls == 1
+
+
+def test_missing_answers_leave_their_frames_unjudged():
+    client = _ShortClient([(3, "YES"), (1, "NO")])
+    verdicts = GeminiDetector(client, "fake").detect_batch([_frame(i, 20) for i in range(4)])
+    assert _victims(verdicts) == [False, None, True, None]
+    assert verdicts[2].text.startswith("3: YES")
+
+
+def test_answers_beyond_the_batch_and_repeats_are_ignored():
+    verdicts = parse_batch_answer("1: NO\n1: YES\n5: YES\n2: YES", 2)
+    assert _victims(verdicts) == [False, True]
+
+
+def test_unanswered_batch():
+    assert parse_batch_answer("I cannot tell.", 3) == [None, None, None]
@@ -0,0 +1,65 @@
+import asyncio
+import os
+import sys
+import types
+
+import pytest
+
+import camera_streamer
+
+
+@pytest.fixture
+def readiness(monkeypatch):
+    handle = camera_streamer.StreamReadiness()
+    monkeypatch.setattr(camera_streamer, "_readiness", handle)
+    monkeypatch.setattr(camera_streamer, "_ring", None)
+    monkeypatch.setattr(camera_streamer, "_ring_process", None)
+    return handle
+
+
+def test_stream_process_sets_readiness_once_the_child_listens(monkeypatch, readiness):
+    pytest.importorskip("websockets")
+    monkeypatch.setenv("RESQ_WS_PORT", "0")             # any free port
+    monkeypatch.setenv("RESQ_HTTP_PORT", "0")
+    monkeypatch.setenv("RESQ_METRICS_PORT", "0")
+    monkeypatch.delenv("RESQ_HUB", raising=False)
+    camera_streamer._start_stream_process(64 * 48 * 4)
+    try:
+        assert readiness.wait(30)
+        assert readiness.address == ("0.0.0.0", 0)
+        assert camera_streamer._ring_process.poll() is None
+    finally:
+        camera_streamer._stop_stream_process()
+        camera_streamer._ring_process.wait(10)
+
+
+def test_stream_process_that_dies_early_fails_readiness(readiness):
+    ready_read, ready_write = os.pipe()
+    os.close(ready_write)                               # the child exited without a word
+    camera_streamer._await_stream_process(ready_read)
+    assert not readiness.wait(0)
+    assert "exited" in readiness.error
+
+
+def test_legacy_server_path_warms_up_the_encoder(monkeypatch, readiness):
+    websockets = pytest.importorskip("websockets")
+    from websockets.asyncio.server import serve
+
+    def no_context_manager(*args, **kwargs):
+        raise TypeError("'serve' object does not support the asynchronous context manager protocol")
+
+    asyncio_server = types.ModuleType("websockets.asyncio.server")
+    asyncio_server.serve = no_context_manager
+    monkeypatch.setitem(sys.modules, "websockets.asyncio.server", asyncio_server)
+    monkeypatch.setattr(websockets, "serve", serve, raising=False)
+
+    async def no_broadcast():
+        pass
+
+    warm_ups = []
+    monkeypatch.setattr(camera_streamer, "_warm_up_encoder", lambda: warm_ups.append(readiness.ready))
+    monkeypatch.setattr(camera_streamer, "_broadcast_loop", no_broadcast)
+    monkeypatch.setattr(camera_streamer, "WS_PORT", 0)
+    monkeypatch.setattr(camera_streamer, "HTTP_PORT", 0)
+    asyncio.run(camera_streamer._run_server())
+    assert warm_ups == [True]
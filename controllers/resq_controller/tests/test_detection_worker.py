@@ -0,0 +1,92 @@
+import queue
+import sys
+import time
+
+import pytest
+
+from detection_worker import DetectionWorker
+
+
+@pytest.fixture
+def fast_switching():
+    """Switch threads as often as possible so submit() and the worker interleave."""
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def _wait_idle(worker, timeout=2.0):
+    deadline = time.perf_counter() + timeout
+    while worker.busy:
+        if time.perf_counter() > deadline:
+            return False
+        time.sleep(0)
+    return True
+
+
+class _PreemptedQueue(queue.Queue):
+    """put_nowait() returns only after the worker has finished the item, as if preempted right after queuing."""
+
+    def __init__(self, worker, maxsize):
+        super().__init__(maxsize)
+        self._worker = worker
+
+    def put_nowait(self, item):
+        done = self._worker.completed
+        super().put_nowait(item)
+        deadline = time.perf_counter() + 2.0
+        while self._worker.completed == done and time.perf_counter() < deadline:
+            time.sleep(0.001)
+        time.sleep(0.02)  # let the worker finish its bookkeeping too
+
+
+def test_busy_clears_when_worker_finishes_before_submit_returns():
+    worker = DetectionWorker(lambda frame: False)
+    worker._frames = _PreemptedQueue(worker, maxsize=1)
+    worker.start()
+    try:
+        worker.submit("frame")
+        assert worker.completed == 1
+        assert _wait_idle(worker, timeout=0.5), "busy stuck with nothing queued: the planner would never submit again"
+    finally:
+        worker.stop()
+
+
+def test_busy_clears_after_every_submit(fast_switching):
+    worker = DetectionWorker(lambda frame: frame % 2 == 0)
+    worker.start()
+    try:
+        for i in range(3000):
+            worker.submit(i)
+            assert _wait_idle(worker), f"busy stuck after submit #{i} with nothing queued"
+            worker.poll()
+    finally:
+        worker.stop()
+    assert worker.completed == worker.submitted - worker.dropped
+
+
+def test_busy_clears_after_bursts_with_drops(fast_switching):
+    worker = DetectionWorker(lambda frame: False)
+    worker.start()
+    try:
+        for burst in range(300):
+            for i in range(5):
+                worker.submit(i)
+            assert _wait_idle(worker), f"busy stuck after burst #{burst}"
+    finally:
+        worker.stop()
+    assert worker.dropped > 0
+    assert worker.completed + worker.dropped == worker.submitted
+
+
+def test_result_is_ready_when_no_longer_busy():
+    worker = DetectionWorker(lambda frame: True)
+    worker.start()
+    try:
+        worker.submit("frame")
+        assert _wait_idle(worker)
+        results = worker.poll()
+        assert [r.frame for r in results] == ["frame"] and results[0].victim
+    finally:
+        worker.stop()
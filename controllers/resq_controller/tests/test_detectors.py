@@ -0,0 +1,34 @@
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+
+from detectors import HogPersonDetector
+from frame_buffer import Frame
+
+
+def _frame(width, height):
+    data = np.random.default_rng(0).integers(0, 256, size=(height, width, 4), dtype=np.uint8).tobytes()
+    return Frame(1, data, width, height, time.time())
+
+
+@pytest.fixture(scope="module")
+def hog():
+    try:
+        return HogPersonDetector()
+    except ImportError as e:
+        pytest.skip(str(e))
+
+
+@pytest.mark.parametrize("size", [(64, 48), (80, 60), (128, 96), (32, 200), (1, 1)])
+def test_hog_handles_frames_smaller_than_its_window(hog, size):
+    verdict = hog.detect(_frame(*size))
+    assert verdict.source == "hog"
+    assert verdict.victim in (True, False)
+
+
+def test_hog_full_size_frame(hog):
+    verdict = hog.detect(_frame(640, 480))
+    assert verdict.victim in (True, False)
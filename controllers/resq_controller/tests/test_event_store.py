@@ -0,0 +1,37 @@
+import time
+
+from event_store import EventQuery, EventStore
+
+
+def _mission(path, mission, steps, victim_step):
+    store = EventStore(path, robot="r1", mission=mission, thumbnails=False).start()
+    for step in range(steps):
+        store.record_detection(step, "hog", "candidate" if step == victim_step else "clear",
+                               victim=step == victim_step, state="PATROL")
+    store.close()
+
+
+def test_detections_near_defaults_to_the_latest_mission(tmp_path):
+    path = str(tmp_path / "events.db")
+    _mission(path, "first", 200, victim_step=100)
+    time.sleep(0.01)
+    _mission(path, "second", 200, victim_step=105)
+
+    query = EventQuery(path)
+    assert query.latest_mission() == "second"
+    near = query.detections_near(100, 10)
+    assert {row["mission"] for row in near} == {"second"}
+    assert [row["step"] for row in near] == list(range(90, 111))
+    assert [row["step"] for row in query.detections_near(100, 10, victim=True)] == [105]
+    assert [row["step"] for row in query.detections_near(100, 10, mission="first", victim=True)] == [100]
+    assert len(query.recent_detections(10)) == 2
+    query.close()
+
+
+def test_empty_store(tmp_path):
+    path = str(tmp_path / "events.db")
+    EventStore(path, thumbnails=False).close()
+    query = EventQuery(path)
+    assert query.latest_mission() is None
+    assert query.detections_near(10) == []
+    query.close()
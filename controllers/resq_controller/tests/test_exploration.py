@@ -0,0 +1,30 @@
+import random
+
+from engine import NavConfig, ResQController
+from exploration import CLOSE_THRESHOLD, OBSTACLE_THRESHOLD, FrontierExplorer, create_explorer
+from sim_world import GridWorld, run_headless
+
+STEPS = 3000
+
+
+def _coverage(nav, seed=1000, config=None):
+    world = GridWorld.random(rng=random.Random(seed))
+    controller = ResQController(config or NavConfig(), rng=random.Random(seed + 1), verbose=False,
+                                explorer=create_explorer(nav))
+    run_headless(controller, world, STEPS)
+    return world.coverage()
+
+
+def test_explore_covers_more_than_wander_at_default_settings():
+    explored, wandered = _coverage("explore"), _coverage("wander")
+    assert explored > 2 * wandered
+
+
+def test_explorer_thresholds_apply_unless_the_config_sets_them():
+    default = ResQController(NavConfig(), verbose=False, explorer=FrontierExplorer())
+    assert (default.sonar.obstacle_threshold, default.sonar.close_threshold) == (OBSTACLE_THRESHOLD, CLOSE_THRESHOLD)
+    wander = ResQController(NavConfig(), verbose=False)
+    assert wander.sonar.obstacle_threshold < OBSTACLE_THRESHOLD
+    tuned = ResQController(NavConfig(obstacle_threshold=120), verbose=False, explorer=FrontierExplorer())
+    assert (tuned.sonar.obstacle_threshold, tuned.sonar.close_threshold) == (120, CLOSE_THRESHOLD)
+
@@ -0,0 +1,93 @@
+import pytest
+
+import frame_ring
+from frame_ring import FrameRing
+
+
+@pytest.fixture
+def ring():
+    writer = FrameRing.create(slot_capacity=64, slots=4)
+    reader = FrameRing.attach(writer.name)
+    yield writer, reader
+    reader.close()
+    writer.close()
+
+
+def _frame_bytes(seq):
+    return bytes([seq % 256]) * 48
+
+
+def test_reader_gets_the_newest_frame_once(ring):
+    writer, reader = ring
+    assert reader.read_latest() is None
+    for seq in range(1, 7):                 # wraps the 4 slots
+        assert writer.write(_frame_bytes(seq), 4, 3) == seq
+    frame = reader.read_latest()
+    assert (frame.seq, frame.width, frame.height, frame.data) == (6, 4, 3, _frame_bytes(6))
+    assert reader.read_latest(after_seq=frame.seq) is None
+
+
+class _WrapAfterHeader:
+    """Stands in for frame_ring._SLOT: after the reader's first header read, the writer laps the ring."""
+
+    def __init__(self, real, writer, writes):
+        self._real = real
+        self._writer = writer
+        self._writes = writes
+        self.size = real.size
+        self.pack_into = real.pack_into
+        self.fired = False
+
+    def unpack_from(self, buf, offset=0):
+        header = self._real.unpack_from(buf, offset)
+        if not self.fired:
+            self.fired = True
+            for _ in range(self._writes):
+                seq = frame_ring._U64.unpack_from(buf, frame_ring._OFF_WRITE_SEQ)[0] + 1
+                self._writer.write(_frame_bytes(seq), 4, 3)
+        return header
+
+
+def test_torn_read_is_retried_when_the_writer_wraps_mid_copy(ring, monkeypatch):
+    writer, reader = ring
+    writer.write(_frame_bytes(1), 4, 3)
+    # The reader sees frame 1's header, then copies slot 1 after frame 5 replaced it
+    hook = _WrapAfterHeader(frame_ring._SLOT, writer, writes=4)
+    monkeypatch.setattr(frame_ring, "_SLOT", hook)
+    frame = reader.read_latest()
+    assert hook.fired
+    assert frame.seq == 5
+    assert frame.data == _frame_bytes(5)
+
+
+def test_slot_being_written_is_not_returned(ring):
+    writer, reader = ring
+    seq = writer.write(_frame_bytes(1), 4, 3)
+    off = reader._slots_off + (seq % reader.slots) * reader._slot_size
+    frame_ring._U64.pack_into(writer._buf, off, 0)   # writer stopped between "busy" and the new header
+    assert reader.read_latest() is None
+
+
+def test_status_and_viewers(ring):
+    writer, reader = ring
+    assert reader.read_status() is None
+    writer.write_status(b'{"ai_status":"scanning"}')
+    assert reader.read_status() == b'{"ai_status":"scanning"}'
+    assert reader.read_status() is None
+    reader.set_viewers(3)
+    assert writer.viewers == 3
+
+
+def test_oversized_frame_is_rejected(ring):
+    writer, _ = ring
+    with pytest.raises(ValueError):
+        writer.write(b"x" * 65, 1, 1)
+
+
+def test_reader_sees_the_writer_close():
+    writer = FrameRing.create(slot_capacity=16, slots=2)
+    reader = FrameRing.attach(writer.name)
+    assert not reader.closed
+    writer.close()
+    assert reader.closed
+    reader.close()
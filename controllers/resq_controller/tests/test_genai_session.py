@@ -0,0 +1,33 @@
+import json
+import os
+
+from genai_session import ModelCache
+
+
+def test_model_cache_put_get_invalidate(tmp_path):
+    path = str(tmp_path / "models.json")
+    cache = ModelCache(path, ttl=60)
+    cache.put("a", "gemini-flash")
+    cache.put("b", "gemini-pro")
+    assert cache.get("a") == "gemini-flash"
+
+    cache.invalidate("a")
+    assert cache.get("a") is None
+    assert json.loads(open(path).read()).keys() == {"b"}
+    assert os.listdir(tmp_path) == ["models.json"]
+
+
+def test_model_cache_ttl(tmp_path):
+    cache = ModelCache(str(tmp_path / "models.json"), ttl=-1)
+    cache.put("a", "gemini-flash")
+    assert cache.get("a") is None
+    assert cache.get("a", allow_stale=True) == "gemini-flash"
+
+
+def test_unreadable_cache_is_empty(tmp_path):
+    path = tmp_path / "models.json"
+    path.write_text('{"a": {"model": "gem')
+    cache = ModelCache(str(path))
+    assert cache.get("a") is None
+    cache.put("a", "gemini-flash")
+    assert cache.get("a") == "gemini-flash"
@@ -0,0 +1,59 @@
+import json
+
+from metrics import Registry, RingLog, read_ring_log
+
+
+def test_oversized_records_stay_valid_json(tmp_path):
+    path = str(tmp_path / "ring.log")
+    ring = RingLog(path, records=8, record_bytes=160)
+    ring.write("step", state="PATROL", latency=0.012)
+    ring.write("model_call", outcome="ok", text="Ä person lying down " * 20, frames=4)
+    ring.write("x" * 400)
+    ring.close()
+
+    with open(path, "rb") as f:
+        lines = f.read().splitlines()
+    assert all(len(line) == 159 for line in lines)
+
+    records = read_ring_log(path)
+    assert [r["seq"] for r in records] == [0, 1, 2]
+    assert records[0]["state"] == "PATROL" and "truncated" not in records[0]
+    call = records[1]
+    assert call["event"] == "model_call" and call["outcome"] == "ok" and call["frames"] == 4
+    assert "text" not in call
+    assert call["truncated"] > 160
+    assert records[2]["event"].startswith("xxx") and records[2]["truncated"] > 400
+    assert ring.truncated == 2
+
+
+def test_ring_wraps_around(tmp_path):
+    path = str(tmp_path / "ring.log")
+    ring = RingLog(path, records=4)
+    for i in range(10):
+        ring.write("tick", i=i)
+    ring.close()
+    assert [r["i"] for r in read_ring_log(path)] == [6, 7, 8, 9]
+    for line in open(path, "rb").read().splitlines():
+        json.loads(line)
+
+
+def test_restart_keeps_the_previous_log(tmp_path):
+    path = str(tmp_path / "ring.log")
+    ring = RingLog(path, records=4)
+    ring.write("crash", reason="before restart")
+    ring.close()
+
+    ring = RingLog(path, records=4)
+    ring.write("start")
+    ring.close()
+    assert [r["event"] for r in read_ring_log(path)] == ["start"]
+    assert [r["event"] for r in read_ring_log(path + ".1")] == ["crash"]
+
+
+def test_totals_copied_from_elsewhere_are_exported_as_counters():
+    registry = Registry()
+    dropped = registry.counter("resq_test_dropped_total", "Dropped", ("worker",))
+    registry.add_collector(lambda: dropped.labels("hog").set_total(7))
+    text = registry.render()
+    assert "# TYPE resq_test_dropped_total counter" in text
+    assert 'resq_test_dropped_total{worker="hog"} 7' in text
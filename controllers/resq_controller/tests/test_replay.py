@@ -0,0 +1,131 @@
+import os
+import runpy
+import sys
+import types
+
+import numpy as np
+import pytest
+
+import camera_streamer
+import replay
+from mission_log import Mission
+
+STEPS = 300
+
+
+class _Motor:
+    def __init__(self):
+        self.velocity = 0.0
+
+    def setPosition(self, position):
+        pass
+
+    def setVelocity(self, velocity):
+        self.velocity = velocity
+
+    def getVelocity(self):
+        return self.velocity
+
+
+class _Sonar:
+    def __init__(self, robot, values):
+        self.robot = robot
+        self.values = values
+
+    def enable(self, time_step):
+        pass
+
+    def getValue(self):
+        return float(self.values[min(self.robot.index, len(self.values) - 1)])
+
+
+class _Camera:
+    def __init__(self, robot):
+        self.robot = robot
+
+    def enable(self, time_step):
+        pass
+
+    def getWidth(self):
+        return 64
+
+    def getHeight(self):
+        return 48
+
+    def getImage(self):
+        return bytes([self.robot.index % 256]) * (64 * 48 * 4)
+
+    def saveImage(self, path, quality):
+        return 0
+
+
+class _StubRobot:
+    """Plays a fixed sonar trace. Half the readings sit 1e-6 either side of a threshold."""
+
+    def __init__(self, seed):
+        rng = np.random.default_rng(seed)
+        walk = np.cumsum(rng.normal(0, 60, size=(STEPS, 8)), axis=0) % 600
+        edge = np.where(rng.random((STEPS, 8)) < 0.5, 80.0, 300.0) + rng.choice([-1e-6, 1e-6], size=(STEPS, 8))
+        self.sonar = np.where(rng.random((STEPS, 8)) < 0.5, walk, edge)
+        self.index = 0
+        self.left, self.right = _Motor(), _Motor()
+        self._devices = {"camera": _Camera(self), "left wheel": self.left, "right wheel": self.right}
+        for i in range(8):
+            self._devices[f"so{i}"] = _Sonar(self, self.sonar[:, i])
+
+    def getName(self):
+        return "stub"
+
+    def getDevice(self, name):
+        return self._devices.get(name)
+
+    def step(self, time_step):
+        self.index += 1
+        return -1 if self.index >= STEPS else 0
+
+
+@pytest.fixture
+def isolated(monkeypatch):
+    """Restore the environment, the `controller` module and the streamer switch afterwards."""
+    monkeypatch.setattr(camera_streamer, "STREAM_ENABLED", False)
+    monkeypatch.setitem(sys.modules, "controller", types.ModuleType("controller"))
+    saved = dict(os.environ)
+    yield
+    os.environ.clear()
+    os.environ.update(saved)
+
+
+def _record(path, nav):
+    robot = _StubRobot(seed=3)
+    controller_module = sys.modules["controller"]
+    controller_module.Robot, controller_module.Camera, controller_module.Motor = lambda: robot, _Camera, _Motor
+    os.environ.update({
+        "RESQ_RECORD": path, "RESQ_SEED": "7", "RESQ_NAV": nav, "RESQ_FAKE_MODEL_DELAY": "0",
+        "RESQ_LOCAL_DETECTOR": "none", "RESQ_STREAM": "0", "RESQ_METRICS_PORT": "0",
+        "RESQ_METRICS_LOG": "", "RESQ_EVENTS": "",
+    })
+    controller = runpy.run_path(replay.CONTROLLER_SCRIPT, run_name="__main__")
+    for worker in (controller.get("detector"), controller.get("screener")):
+        if worker is not None:
+            worker.stop()
+    return robot
+
+
+@pytest.mark.parametrize("nav", ["wander", "explore"])
+def test_replay_reproduces_every_recorded_motor_command(tmp_path, isolated, nav):
+    path = str(tmp_path / "mission")
+    live = _record(path, nav)
+
+    mission = Mission(path)
+    assert mission.seed == 7
+    assert mission.meta["nav"] == nav
+    assert mission.meta["local_detector"] == "none"
+    steps = mission.steps_array()
+    assert len(steps) == STEPS
+    np.testing.assert_array_equal(steps["sonar"][1:], live.sonar[1:])
+
+    replayed, _ = replay.replay(path)
+    assert replayed.index == STEPS
+    assert len(np.unique(steps["motors"], axis=0)) > 2        # the robot did more than drive straight
+    np.testing.assert_array_equal(replayed.commands[1:], steps["motors"][1:])
+    assert replay.compare(replayed, 0.0) is None
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from sonar import SonarProcessor, process_batch
+
+
+def _reference_ema(values, alpha):
+    smoothed = np.empty_like(values)
+    smoothed[0] = values[0]
+    for t in range(1, values.shape[0]):
+        smoothed[t] = alpha * smoothed[t - 1] + (1.0 - alpha) * values[t]
+    return smoothed
+
+
+@pytest.mark.parametrize("alpha", [0.05, 0.5, 0.9, 0.999, 1.0])
+def test_batch_smoothing_matches_step_by_step_ema(alpha):
+    values = np.random.default_rng(0).uniform(0, 1024, size=(3000, 3, 8))
+    result = process_batch(values, smoothing=alpha)
+    np.testing.assert_allclose(result["smoothed"], _reference_ema(values, alpha), rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize("smoothing", [0.0, 0.5])
+def test_processor_matches_batch(smoothing):
+    trace = np.random.default_rng(1).uniform(0, 500, size=(500, 8))
+    batch = process_batch(trace, smoothing=smoothing)
+    processor = SonarProcessor(smoothing=smoothing)
+    for t, values in enumerate(trace):
+        reading = processor.update(values)
+        assert reading.obstacle == batch["obstacle"][t].tolist()
+        assert reading.close == batch["close"][t].tolist()
+        sectors = batch["sectors"][t]
+        assert (reading.obstacle_left, reading.obstacle_front_left,
+                reading.obstacle_front_right, reading.obstacle_right) == tuple(sectors.tolist())
+        assert reading.obstacle_front == bool(batch["obstacle_front"][t])
+        assert reading.close_front == bool(batch["close_front"][t])
+        assert reading.left_blocked == pytest.approx(batch["left_blocked"][t])
+        assert reading.right_blocked == pytest.approx(batch["right_blocked"][t])
+    assert processor.last_values == trace[-1].tolist()
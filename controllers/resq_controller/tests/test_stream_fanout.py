@@ -0,0 +1,113 @@
+import asyncio
+
+from stream_fanout import StreamClient
+
+
+class _GatedSocket:
+    """Records sends; each send() waits until the test opens the gate."""
+
+    def __init__(self):
+        self.sent = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def send(self, message):
+        await self.gate.wait()
+        self.sent.append(message)
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+async def _drain(client, socket):
+    socket.gate.set()
+    for _ in range(100):
+        if client.idle:
+            return
+        await asyncio.sleep(0.001)
+
+
+def test_unkeyed_frames_keep_only_the_newest():
+    async def main():
+        socket = _GatedSocket()
+        client = StreamClient(socket, max_queue=2)
+        for i in range(5):
+            client.push_frame(f"f{i}")
+        assert client.pending_frames == 2 and client.dropped == 3
+        client.start()
+        await _drain(client, socket)
+        client.stop()
+        return socket.sent
+
+    assert _run(main()) == ["f3", "f4"]
+
+
+def test_each_key_keeps_its_newest_frame():
+    async def main():
+        socket = _GatedSocket()
+        client = StreamClient(socket, max_queue=8)
+        client.push_frame("a1", key="alpha")
+        client.push_frame("b1", key="beta")
+        client.push_frame("a2", key="alpha")
+        client.push_frame("b2", key="beta")
+        client.push_frame("a3", key="alpha")
+        assert client.pending_frames == 2 and client.dropped == 3
+        client.start()
+        await _drain(client, socket)
+        client.stop()
+        return socket.sent
+
+    assert _run(main()) == ["b2", "a3"]
+
+
+def test_statuses_jump_the_frame_queue_and_replace_per_key():
+    async def main():
+        socket = _GatedSocket()
+        client = StreamClient(socket, max_queue=4)
+        client.push_frame("frame", key="alpha")
+        client.push_status("s-alpha-1", key="alpha")
+        client.push_status("s-beta", key="beta")
+        client.push_status("s-alpha-2", key="alpha")
+        client.start()
+        await _drain(client, socket)
+        client.stop()
+        return socket.sent
+
+    assert _run(main()) == ["s-beta", "s-alpha-2", "frame"]
+
+
+def test_a_slow_send_only_delays_the_newest_frame():
+    async def main():
+        socket = _GatedSocket()
+        socket.gate.clear()
+        client = StreamClient(socket)
+        client.start()
+        client.push_frame("f0")
+        await asyncio.sleep(0.01)              # f0 is now stuck in send()
+        assert not client.idle
+        for i in range(1, 6):
+            client.push_frame(f"f{i}")
+        await _drain(client, socket)
+        client.stop()
+        return socket.sent, client.dropped
+
+    sent, dropped = _run(main())
+    assert sent == ["f0", "f5"] and dropped == 4
+
+
+def test_discard_drops_a_keys_pending_messages():
+    async def main():
+        socket = _GatedSocket()
+        client = StreamClient(socket, max_queue=4)
+        client.push_frame("a", key="alpha")
+        client.push_frame("b", key="beta")
+        client.push_status("sa", key="alpha")
+        client.discard("alpha")
+        assert client.backlog == 1
+        client.start()
+        await _drain(client, socket)
+        client.stop()
+        return socket.sent
+
+    assert _run(main()) == ["b"]
@@ -0,0 +1,118 @@
+import asyncio
+import time
+
+import pytest
+
+import camera_streamer
+from stream_http import MAX_HEADER_BYTES, etag_matches, read_request
+
+
+def _parse(data):
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await read_request(reader, timeout=1.0)
+    return asyncio.run(run())
+
+
+def test_read_request_parses_request_line_and_headers():
+    request = _parse(b"get /snapshot.jpg?t=123 HTTP/1.1\r\nHost: robot\r\nIf-None-Match:  \"a-1\" \r\n\r\n")
+    assert (request.method, request.path, request.version) == ("GET", "/snapshot.jpg", "HTTP/1.1")
+    assert request.headers == {"host": "robot", "if-none-match": '"a-1"'}
+    assert request.keep_alive
+
+
+@pytest.mark.parametrize("version, connection, keep_alive", [
+    ("HTTP/1.1", None, True), ("HTTP/1.1", "close", False),
+    ("HTTP/1.0", None, False), ("HTTP/1.0", "Keep-Alive", True),
+])
+def test_keep_alive_follows_version_and_connection_header(version, connection, keep_alive):
+    header = f"Connection: {connection}\r\n" if connection else ""
+    assert _parse(f"GET / {version}\r\n{header}\r\n".encode()).keep_alive is keep_alive
+
+
+@pytest.mark.parametrize("data", [
+    b"",                                                    # EOF
+    b"GET /snapshot.jpg HTTP/1.1\r\nHost: robot\r\n",       # head never finished
+    b"GET /snapshot.jpg\r\n\r\n",                           # no version
+    b"GET / HTTP/1.1\r\nX-Pad: " + b"a" * MAX_HEADER_BYTES + b"\r\n\r\n",
+])
+def test_read_request_rejects_eof_truncation_and_garbage(data):
+    assert _parse(data) is None
+
+
+@pytest.mark.parametrize("header, etag, expected", [
+    (None, '"a-1"', False),
+    ("", '"a-1"', False),
+    ('"a-1"', '"a-1"', True),
+    ('"a-2"', '"a-1"', False),
+    ('"a-0", "a-1"', '"a-1"', True),
+    ('W/"a-1"', '"a-1"', True),                             # weak comparison ignores W/
+    ('"a-1"', 'W/"a-1"', True),
+    ("*", '"a-1"', True),
+    ('"a-11"', '"a-1"', False),
+])
+def test_etag_matches(header, etag, expected):
+    assert etag_matches(header, etag) is expected
+
+
+async def _exchange(port, requests):
+    """Send each request on one keep-alive connection; returns [(status line, headers, body)]."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    responses = []
+    for request in requests:
+        writer.write(request)
+        head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        headers = dict(line.split(": ", 1) for line in head[1:] if line)
+        if request.startswith(b"HEAD"):
+            body = await reader.read()                      # whatever arrives before the server closes
+        else:
+            body = await reader.readexactly(int(headers.get("Content-Length", 0)))
+        responses.append((head[0], headers, body))
+    writer.close()
+    return responses
+
+
+def _serve(requests):
+    async def run():
+        server = await asyncio.start_server(camera_streamer._http_handler, "127.0.0.1", 0)
+        async with server:
+            return await _exchange(server.sockets[0].getsockname()[1], requests)
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def snapshot(monkeypatch):
+    monkeypatch.setattr(camera_streamer, "_snapshot_demand", 0.0)
+    monkeypatch.setattr(camera_streamer, "_snapshot", (7, b"\xff\xd8jpeg\xff\xd9", time.perf_counter()))
+    return camera_streamer._etag(7)
+
+
+def test_snapshot_answers_304_for_the_etag_the_viewer_has(snapshot):
+    first, second, stale = _serve([
+        b"GET /snapshot.jpg HTTP/1.1\r\n\r\n",
+        f"GET /snapshot.jpg HTTP/1.1\r\nIf-None-Match: {snapshot}\r\n\r\n".encode(),
+        b'GET /snapshot.jpg HTTP/1.1\r\nIf-None-Match: "old-boot-7"\r\n\r\n',
+    ])
+    assert first[0] == "HTTP/1.1 200 OK"
+    assert first[1]["ETag"] == snapshot and first[2] == b"\xff\xd8jpeg\xff\xd9"
+    assert second[0] == "HTTP/1.1 304 Not Modified"
+    assert second[1]["ETag"] == snapshot and second[2] == b""
+    assert "Content-Type" not in second[1]
+    assert stale[0] == "HTTP/1.1 200 OK" and stale[2] == b"\xff\xd8jpeg\xff\xd9"
+
+
+def test_head_snapshot_sends_headers_only(snapshot):
+    (response,) = _serve([b"HEAD /snapshot.jpg HTTP/1.1\r\nConnection: close\r\n\r\n"])
+    assert response[0] == "HTTP/1.1 200 OK"
+    assert response[1]["Content-Length"] == str(len(b"\xff\xd8jpeg\xff\xd9")) and response[2] == b""
+
+
+def test_snapshot_before_any_frame_is_503(monkeypatch):
+    monkeypatch.setattr(camera_streamer, "_snapshot_demand", 0.0)
+    monkeypatch.setattr(camera_streamer, "_snapshot", None)
+    monkeypatch.setattr(camera_streamer, "SNAPSHOT_WAIT", 0.05)
+    (response,) = _serve([b"GET /snapshot.jpg HTTP/1.1\r\n\r\n"])
+    assert response[0] == "HTTP/1.1 503 Service Unavailable"
+    assert response[1]["Retry-After"] == "1"
@@ -0,0 +1,96 @@
+import asyncio
+import base64
+import json
+
+from stream_hub import MSG_FRAME, MSG_STATUS, StreamHub, pack_message
+
+
+async def _serve_hub():
+    from websockets.asyncio.server import serve
+    hub = StreamHub(verbose=False)
+    publishers = await asyncio.start_server(hub.handle_publisher, "127.0.0.1", 0)
+    dashboards = await serve(hub.ws_handler, "127.0.0.1", 0)
+    return hub, publishers, dashboards
+
+
+def _port(server):
+    return server.sockets[0].getsockname()[1]
+
+
+async def _publish(port, robot_id, frames, period=0.02):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(pack_message(MSG_STATUS, robot_id, json.dumps({"ai_status": "scanning"}).encode()))
+    for i in range(frames):
+        writer.write(pack_message(MSG_FRAME, robot_id, f"{robot_id}-{i}".encode()))
+        await writer.drain()
+        await asyncio.sleep(period)
+    writer.close()
+
+
+async def _receive(ws, seconds):
+    messages = []
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + seconds
+    while True:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return messages
+        try:
+            messages.append(json.loads(await asyncio.wait_for(ws.recv(), remaining)))
+        except asyncio.TimeoutError:
+            return messages
+
+
+def _frame_robots(messages):
+    return [base64.b64decode(m["frame"]).decode().split("-")[0] for m in messages if m.get("frame")]
+
+
+def test_two_robots_one_dashboard_watches_one():
+    """The dashboard hook's flow: hello without robots, then subscribe to the first robot heard from."""
+    from websockets.asyncio.client import connect
+
+    async def scenario():
+        hub, publishers, dashboards = await _serve_hub()
+        async with publishers, dashboards:
+            async with connect(f"ws://127.0.0.1:{_port(dashboards)}") as ws:
+                await ws.send(json.dumps({"type": "hello", "protocol": 2}))
+                feeds = [asyncio.ensure_future(_publish(_port(publishers), robot, 40)) for robot in ("alpha", "beta")]
+
+                first = None
+                while first is None:
+                    message = json.loads(await ws.recv())
+                    first = message.get("robot")
+                await ws.send(json.dumps({"type": "subscribe", "robots": [first]}))
+                while hub.clients and next(iter(hub.clients.values())).subscriptions != {first}:
+                    await asyncio.sleep(0.005)
+                await _receive(ws, 0.05)    # frames already on the wire before the subscribe
+                after = await _receive(ws, 0.5)
+                await asyncio.gather(*feeds)
+        return hub, first, after
+
+    hub, first, after = asyncio.run(scenario())
+    assert set(hub.robots) == {"alpha", "beta"}
+    robots = _frame_robots(after)
+    assert robots, "no frames after subscribing"
+    assert set(robots) == {first}
+    assert all(m.get("robot") == first for m in after)
+
+
+def test_hello_with_robot_gets_only_that_robot():
+    from websockets.asyncio.client import connect
+
+    async def scenario():
+        hub, publishers, dashboards = await _serve_hub()
+        async with publishers, dashboards:
+            async with connect(f"ws://127.0.0.1:{_port(dashboards)}") as ws:
+                await ws.send(json.dumps({"type": "hello", "protocol": 2, "robots": ["beta"]}))
+                feeds = [asyncio.ensure_future(_publish(_port(publishers), robot, 20)) for robot in ("alpha", "beta")]
+                messages = await _receive(ws, 0.6)
+                await asyncio.gather(*feeds)
+        return messages
+
+    messages = asyncio.run(scenario())
+    robots = _frame_robots(messages)
+    assert robots and set(robots) == {"beta"}
+    # Every hub message names its robot, which is what the hook filters on
+    assert all(m.get("robot") == "beta" for m in messages)
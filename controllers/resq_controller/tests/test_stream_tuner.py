@@ -0,0 +1,75 @@
+import pytest
+
+from stream_tuner import ADJUST_INTERVAL, ENCODE_BUDGET_MS, MIN_QUALITY, MIN_SCALE, TARGET_SEND_MS, StreamTuner
+
+SLOW = TARGET_SEND_MS * 2
+FAST = TARGET_SEND_MS / 4
+
+
+class _Driver:
+    """Feeds a tuner one measurement per ADJUST_INTERVAL of synthetic time."""
+
+    def __init__(self, tuner):
+        self.tuner = tuner
+        self.now = 0.0
+
+    def tick(self, send_ms=FAST, backlog=0, dropped=0, encode_ms=1.0):
+        self.now += ADJUST_INTERVAL
+        changed = self.tuner.update(send_ms, backlog, dropped, encode_ms, now=self.now)
+        return changed, (self.tuner.quality, round(self.tuner.scale, 3), self.tuner.every_n)
+
+
+def test_congestion_degrades_quality_then_scale_then_frame_rate():
+    driver = _Driver(StreamTuner(70, 2, max_every_n=4))
+    history = [driver.tick(send_ms=SLOW)[1] for _ in range(12)]
+    qualities = [q for q, _, _ in history]
+    assert qualities[:4] == [60, 50, 40, 30]
+    assert all(scale == 1.0 for _, scale, _ in history[:4])
+    scales = [scale for _, scale, _ in history[4:7]]
+    assert scales == [0.75, pytest.approx(0.562, abs=1e-3), MIN_SCALE]
+    assert all(every_n == 2 for _, _, every_n in history[:7])
+    assert [every_n for _, _, every_n in history[7:9]] == [3, 4]
+    changed, settings = driver.tick(send_ms=SLOW)
+    assert not changed and settings == (MIN_QUALITY, MIN_SCALE, 4)
+    assert driver.tuner.reason == "network"
+
+
+def test_headroom_recovers_in_reverse_order_up_to_the_configured_defaults():
+    driver = _Driver(StreamTuner(70, 2, max_every_n=4))
+    for _ in range(12):
+        driver.tick(send_ms=SLOW)
+    history = [driver.tick(send_ms=FAST)[1] for _ in range(12)]
+    assert [every_n for _, _, every_n in history[:2]] == [3, 2]
+    assert [scale for _, scale, _ in history[2:5]] == [pytest.approx(0.667, abs=1e-3), pytest.approx(0.889, abs=1e-3), 1.0]
+    assert [q for q, _, _ in history[5:9]] == [40, 50, 60, 70]
+    assert history[-1] == (70, 1.0, 2)
+    assert driver.tuner.reason == "headroom"
+
+
+def test_never_exceeds_the_configured_quality():
+    driver = _Driver(StreamTuner(70, 2, max_quality=85))
+    for _ in range(5):
+        changed, settings = driver.tick(send_ms=FAST)
+        assert not changed
+    assert settings == (70, 1.0, 2)
+
+
+def test_slow_encoding_lowers_resolution_before_quality():
+    driver = _Driver(StreamTuner(70, 2))
+    _, settings = driver.tick(encode_ms=ENCODE_BUDGET_MS * 2)
+    assert settings == (70, 0.75, 2)
+    assert driver.tuner.reason == "encode"
+
+
+def test_new_drops_and_backlog_count_as_congestion():
+    driver = _Driver(StreamTuner(70, 2))
+    assert driver.tick(dropped=3)[1][0] == 60
+    assert driver.tick(dropped=3)[1][0] == 70      # the same total is no new drops
+    assert driver.tick(backlog=2)[1][0] == 60
+
+
+def test_adjusts_at_most_once_per_interval():
+    tuner = StreamTuner(70, 2)
+    assert tuner.update(SLOW, 0, 0, 1.0, now=10.0)
+    assert not tuner.update(SLOW, 0, 0, 1.0, now=10.0 + ADJUST_INTERVAL / 2)
+    assert tuner.quality == 60
@@ -0,0 +1,166 @@
+"""
+ResQ Inter-frame Video Stream
+=============================
+Optional H.264 / VP8 encoding of the live stream (RESQ_STREAM_CODEC), for
+viewers that can decode video (e.g. WebCodecs in the browser). A mostly
+static or slowly panning view costs a fraction of the bytes of a JPEG per
+frame. Requires PyAV (pip install av); without it the stream stays JPEG.
+
+Each published frame is encoded once, whatever the number of viewers.
+The encoder keeps the packets since the last keyframe (the current GOP),
+so a late joiner, or a viewer that fell behind, gets a self-contained
+catch-up message (keyframe + deltas) and can decode right away instead of
+waiting for the next keyframe.
+
+Wire format (binary WebSocket message; JPEG frames start with FF D8):
+
+    b"RQV1" | flags u8 (bit 0: starts with a keyframe) | frame seq u32 |
+    count u16 | count x (length u32 | packet bytes)
+
+H.264 packets are Annex B with SPS/PPS repeated on every keyframe; VP8
+packets are raw frames.
+"""
+
+import struct
+import time
+from fractions import Fraction
+
+# --- Configuration ---
+VIDEO_BITRATE = 600_000          # Target bits/s
+GOP_SECONDS = 2.0                # Keyframe interval; bounds catch-up message size
+VIDEO_MAGIC = b"RQV1"
+FLAG_KEYFRAME = 0x01
+
+CODECS = {
+    # name -> (PyAV encoder, encoder options)
+    "h264": ("libx264", {"preset": "ultrafast", "tune": "zerolatency"}),
+    "vp8": ("libvpx", {"deadline": "realtime", "cpu-used": "8", "lag-in-frames": "0", "error-resilient": "1"}),
+}
+
+_HEADER = struct.Struct("!4sBIH")
+_LENGTH = struct.Struct("!I")
+
+
+def pack_video(packets, seq, keyframe):
+    """One wire message carrying `packets` (bytes) in decode order."""
+    parts = [_HEADER.pack(VIDEO_MAGIC, FLAG_KEYFRAME if keyframe else 0, seq & 0xFFFFFFFF, len(packets))]
+    for packet in packets:
+        parts.append(_LENGTH.pack(len(packet)))
+        parts.append(packet)
+    return b"".join(parts)
+
+
+def unpack_video(message):
+    """(keyframe, seq, [packets]) from a wire message, or None if it is not one (e.g. a JPEG)."""
+    if len(message) < _HEADER.size or message[:4] != VIDEO_MAGIC:
+        return None
+    _, flags, seq, count = _HEADER.unpack_from(message)
+    offset = _HEADER.size
+    packets = []
+    for _ in range(count):
+        (length,) = _LENGTH.unpack_from(message, offset)
+        offset += _LENGTH.size
+        packets.append(bytes(message[offset:offset + length]))
+        offset += length
+    return bool(flags & FLAG_KEYFRAME), seq, packets
+
+
+def available_codecs():
+    """Codec names usable here (PyAV installed and built with the encoder)."""
+    try:
+        import av
+    except ImportError:
+        return []
+    return [name for name, (encoder, _) in CODECS.items() if encoder in av.codecs_available]
+
+
+class VideoEncoder:
+    """One PyAV encoder for the stream plus the GOP cache for late joiners."""
+
+    def __init__(self, codec, width, height, fps, bitrate=VIDEO_BITRATE, gop_seconds=GOP_SECONDS):
+        import av
+        import numpy as np
+        if codec not in CODECS:
+            raise ValueError(f"unknown codec {codec!r} (one of: {', '.join(CODECS)})")
+        if width % 2 or height % 2:
+            raise ValueError(f"{codec} needs even frame dimensions, got {width}x{height}")
+        encoder, options = CODECS[codec]
+        self.codec = codec
+        self.width = width
+        self.height = height
+        rate = Fraction(fps).limit_denominator(1000)
+        self._ctx = av.CodecContext.create(encoder, "w")
+        self._ctx.width = width
+        self._ctx.height = height
+        self._ctx.pix_fmt = "yuv420p"
+        self._ctx.time_base = 1 / rate
+        self._ctx.framerate = rate
+        self._ctx.bit_rate = bitrate
+        self._ctx.gop_size = max(1, int(round(float(rate) * gop_seconds)))
+        self._ctx.max_b_frames = 0
+        self._ctx.options = dict(options)
+        self._av = av
+        self._np = np
+        self._pts = 0
+        # (frame index, GOP packets, message for the newest frame, its frame seq), replaced as one tuple
+        # because the broadcaster reads it from another thread
+        self._state = (0, (), None, 0)
+        self.encode_ms = None           # smoothed encode time
+        self.keyframes = 0
+        self.bytes = 0
+
+    @property
+    def index(self):
+        """Number of frames encoded so far; consecutive messages differ by one."""
+        return self._state[0]
+
+    def encode(self, frame, seq):
+        """
+        Encode a frame_buffer.Frame (BGRA) published as frame `seq`. Returns
+        the wire message for it, or None if the encoder produced nothing.
+        """
+        start = time.perf_counter()
+        index, gop, _, _ = self._state
+        pixels = self._np.frombuffer(frame.data, self._np.uint8).reshape(frame.height, frame.width, 4)
+        image = self._av.VideoFrame.from_ndarray(pixels, format="bgra")
+        image.pts = self._pts
+        self._pts += 1
+        if not gop:
+            image.pict_type = self._av.video.frame.PictureType.I
+        packets = self._ctx.encode(image)
+        if not packets:
+            return None
+        keyframe = False
+        encoded = []
+        for packet in packets:
+            data = bytes(packet)
+            if packet.is_keyframe:
+                keyframe = True
+                gop = ()
+                self.keyframes += 1
+            gop += (data,)
+            encoded.append(data)
+            self.bytes += len(data)
+        message = pack_video(encoded, seq, keyframe)
+        self._state = (index + 1, gop, message, seq)
+        elapsed = (time.perf_counter() - start) * 1000.0
+        self.encode_ms = elapsed if self.encode_ms is None else 0.8 * self.encode_ms + 0.2 * elapsed
+        return message
+
+    def latest(self):
+        """(frame index, message) for the newest frame alone: decodable after the previous index."""
+        index, _, message, _ = self._state
+        return index, message
+
+    def catch_up(self):
+        """(frame index, message) a fresh decoder can start from: the GOP up to the newest frame."""
+        index, gop, _, seq = self._state
+        if not gop:
+            return index, None
+        return index, pack_video(gop, seq, True)
+
+    def stats(self):
+        index, gop, _, _ = self._state
+        return {"codec": self.codec, "frames": index, "keyframes": self.keyframes, "bytes": self.bytes,
+                "gop_frames": len(gop),
+                "encode_ms": round(self.encode_ms, 3) if self.encode_ms is not None else None}
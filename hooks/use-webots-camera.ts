@@ -5,6 +5,21 @@ import { useEffect, useRef, useState, useCallback } from "react"
 interface UseWebotsCameraOptions {
   url?: string
   reconnectDelay?: number
+  /** Ask the streamer for binary JPEG frames (protocol v2); falls back to JSON (v1). */
+  binary?: boolean
+  /**
+   * Robot ID to watch when connected to a multi-robot stream hub (stream_hub.py).
+   * Without it the hook watches the first robot it hears from, so robots never share the viewport.
+   */
+  robot?: string
+}
+
+export interface StreamSettings {
+  adaptive: boolean
+  quality: number
+  scale: number
+  every_n_steps: number
+  reason?: string
 }
 
 interface UseWebotsCameraReturn {
@@ -14,11 +29,16 @@ interface UseWebotsCameraReturn {
   victimDetected: boolean
   aiStatus: string
   aiResponse: string
+  streamSettings: StreamSettings | null
+  /** Robot being watched on a stream hub (null for a single-robot streamer). */
+  robot: string | null
 }
 
 export function useWebotsCamera({
   url = "ws://localhost:8765",
   reconnectDelay = 2000,
+  binary = true,
+  robot,
 }: UseWebotsCameraOptions = {}): UseWebotsCameraReturn {
   const [frame, setFrame] = useState<string | null>(null)
   const [connected, setConnected] = useState(false)
@@ -26,33 +46,71 @@ export function useWebotsCamera({
   const [victimDetected, setVictimDetected] = useState(false)
   const [aiStatus, setAiStatus] = useState("idle")
   const [aiResponse, setAiResponse] = useState("")
+  const [streamSettings, setStreamSettings] = useState<StreamSettings | null>(null)
+  const [watchedRobot, setWatchedRobot] = useState<string | null>(robot ?? null)
 
   const wsRef = useRef<WebSocket | null>(null)
   const reconnectTimerRef = useRef<ReturnType<typeof setTimeout> | null>(null)
   const frameCountRef = useRef(0)
   const fpsIntervalRef = useRef<ReturnType<typeof setInterval> | null>(null)
   const mountedRef = useRef(true)
+  const frameUrlRef = useRef<string | null>(null)
+  // Robot this hook shows: the `robot` option, or the first one a hub sends (kept across reconnects)
+  const robotRef = useRef<string | null>(robot ?? null)
+
+  const showBinaryFrame = useCallback((data: Blob) => {
+    const nextUrl = URL.createObjectURL(new Blob([data], { type: "image/jpeg" }))
+    if (frameUrlRef.current) URL.revokeObjectURL(frameUrlRef.current)
+    frameUrlRef.current = nextUrl
+    setFrame(nextUrl)
+  }, [])
 
   const connect = useCallback(() => {
     if (!mountedRef.current) return
 
     try {
       const ws = new WebSocket(url)
+      ws.binaryType = "blob"
       wsRef.current = ws
 
       ws.onopen = () => {
         if (!mountedRef.current) return
         setConnected(true)
         console.log("[WebotsCamera] Connected to", url)
+        const watching = robotRef.current
+        if (binary || watching) {
+          // Negotiate protocol v2: binary JPEG frames + status-only JSON messages.
+          // A stream hub answers v2 with JSON frames filtered to the watched robot.
+          ws.send(
+            JSON.stringify({ type: "hello", protocol: binary ? 2 : 1, ...(watching ? { robots: [watching] } : {}) }),
+          )
+        }
       }
 
       ws.onmessage = (event) => {
         if (!mountedRef.current) return
-        frameCountRef.current++
+
+        if (event.data instanceof Blob) {
+          // Protocol v2 frame: raw JPEG bytes
+          frameCountRef.current++
+          showBinaryFrame(event.data)
+          return
+        }
 
         try {
-          // Try to parse as JSON (new format with AI status)
+          // Try to parse as JSON (v1 frame + AI status, or v2 status-only message)
           const data = JSON.parse(event.data)
+          if (typeof data.robot === "string") {
+            // From a stream hub: stick to one robot, or every robot's frames would alternate here
+            if (robotRef.current === null) {
+              robotRef.current = data.robot
+              setWatchedRobot(data.robot)
+              ws.send(JSON.stringify({ type: "subscribe", robots: [data.robot] }))
+            } else if (data.robot !== robotRef.current) {
+              return
+            }
+          }
+          if (data.type !== "status") frameCountRef.current++
           if (data.frame) {
             setFrame(`data:image/jpeg;base64,${data.frame}`)
           }
@@ -65,8 +123,12 @@ export function useWebotsCamera({
           if (data.ai_response !== undefined) {
             setAiResponse(data.ai_response)
           }
+          if (data.stream) {
+            setStreamSettings(data.stream)
+          }
         } catch {
           // Fallback: raw base64 string (old format)
+          frameCountRef.current++
           setFrame(`data:image/jpeg;base64,${event.data}`)
         }
       }
@@ -86,7 +148,14 @@ export function useWebotsCamera({
         reconnectTimerRef.current = setTimeout(connect, reconnectDelay)
       }
     }
-  }, [url, reconnectDelay])
+  }, [url, reconnectDelay, binary, showBinaryFrame])
+
+  useEffect(() => {
+    // A new `robot` option (or none: pick again) applies from the next hello
+    robotRef.current = robot ?? null
+    setWatchedRobot(robot ?? null)
+    wsRef.current?.close()
+  }, [robot])
 
   useEffect(() => {
     mountedRef.current = true
@@ -103,8 +172,9 @@ export function useWebotsCamera({
       wsRef.current?.close()
       if (reconnectTimerRef.current) clearTimeout(reconnectTimerRef.current)
       if (fpsIntervalRef.current) clearInterval(fpsIntervalRef.current)
+      if (frameUrlRef.current) URL.revokeObjectURL(frameUrlRef.current)
     }
   }, [connect])
 
-  return { frame, connected, fps, victimDetected, aiStatus, aiResponse }
+  return { frame, connected, fps, victimDetected, aiStatus, aiResponse, streamSettings, robot: watchedRobot }
 }